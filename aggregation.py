@@ -0,0 +1,266 @@
+# aggregation.py
+#
+# One dense contingency cube over the categorical columns the count charts use.
+# Building it is a single bincount over the combined integer codes; every
+# per-chart `groupby([...]).size()` then becomes a sum over the other axes.
+import numpy as np
+import pandas as pd
+
+from countries import COUNTRY_ISO3
+from distributions import group_fits, group_histograms, merge_histograms, quantiles, stratified_sample
+from metrics import timed
+
+COUNTRY_MEASURES = ['capital.gain', 'capital.loss']
+CUBE_DIMS = ['workclass', 'education', 'marital.status', 'occupation', 'race', 'sex', 'income']
+# Census sampling weight: the number of people a row stands for.  Weighted
+# aggregates are population estimates instead of counts of sampled rows.
+WEIGHT = 'fnlwgt'
+
+
+def encode(col):
+    # Integer codes plus their labels, in sorted label order like groupby uses.
+    # Categoricals already carry both; missing values get code -1.
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy(), col.cat.categories
+    return pd.factorize(col, sort=True)
+
+
+class ContingencyCube:
+
+    def __init__(self, counts, dims, labels):
+        self.counts = counts  # ndarray, one axis per dimension
+        self.dims = list(dims)
+        self.labels = labels  # dimension -> Index of labels along its axis
+
+    @classmethod
+    def from_frame(cls, df, dims=CUBE_DIMS, weights=None):
+        # With `weights` (one per row) each cell holds the summed weight of its rows
+        codes, labels = [], {}
+        for dim in dims:
+            dim_codes, labels[dim] = encode(df[dim])
+            codes.append(dim_codes)
+        shape = tuple(len(labels[dim]) for dim in dims)
+
+        # groupby drops rows with a missing key, so the cube does too
+        valid = np.logical_and.reduce([c >= 0 for c in codes])
+        if not valid.all():
+            codes = [c[valid] for c in codes]
+            weights = None if weights is None else weights[valid]
+        flat = np.ravel_multi_index(codes, shape)
+        counts = np.bincount(flat, weights, minlength=int(np.prod(shape))).reshape(shape)
+        if weights is not None and np.issubdtype(weights.dtype, np.integer):
+            counts = np.rint(counts).astype(np.int64)  # bincount sums weights as floats
+        return cls(counts, dims, labels)
+
+    def merge(self, other):
+        # The cube of both cubes' rows, over the union of their labels
+        labels = {dim: self.labels[dim].union(other.labels[dim]) for dim in self.dims}
+        counts = np.zeros(tuple(len(labels[dim]) for dim in self.dims),
+                          dtype=np.result_type(self.counts, other.counts))
+        for cube in (self, other):
+            counts[np.ix_(*[labels[dim].get_indexer(cube.labels[dim]) for dim in self.dims])] += cube.counts
+        return ContingencyCube(counts, self.dims, labels)
+
+    @timed('aggregation')
+    def marginal(self, dims):
+        # Counts over `dims` only, axes in the order given
+        axes = [self.dims.index(dim) for dim in dims]
+        other = tuple(i for i in range(len(self.dims)) if i not in axes)
+        summed = self.counts.sum(axis=other)
+        kept = sorted(axes)
+        return summed.transpose([kept.index(axis) for axis in axes])
+
+    @timed('aggregation')
+    def size(self, dims):
+        # Same result as df.groupby(dims).size(): observed combinations only,
+        # sorted by label
+        table = self.marginal(dims)
+        cells = np.nonzero(table)
+        levels = [np.asarray(self.labels[dim], dtype=object)[idx] for dim, idx in zip(dims, cells)]
+        if len(dims) == 1:
+            index = pd.Index(levels[0], name=dims[0])
+        else:
+            index = pd.MultiIndex.from_arrays(levels, names=dims)
+        return pd.Series(table[cells], index=index)
+
+    def restrict(self, selection):
+        # The cube of the rows whose labels are in `selection` (column -> values):
+        # the selected cells are copied into an otherwise empty cube
+        index = np.ix_(*[np.flatnonzero(self.labels[dim].isin(selection[dim])) if dim in selection
+                         else np.arange(len(self.labels[dim])) for dim in self.dims])
+        counts = np.zeros_like(self.counts)
+        counts[index] = self.counts[index]
+        return ContingencyCube(counts, self.dims, self.labels)
+
+    def slice(self, dim, values):
+        # Restricted to `values` of `dim`, and that axis summed away
+        axis = self.dims.index(dim)
+        codes = np.flatnonzero(self.labels[dim].isin(values))
+        dims = [d for d in self.dims if d != dim]
+        return ContingencyCube(np.take(self.counts, codes, axis=axis).sum(axis=axis), dims,
+                               {d: self.labels[d] for d in dims})
+
+
+def fold_rare(col, threshold, other='Other'):
+    # Relabel every value seen fewer than `threshold` times (and missing values)
+    # as `other`.  Works on the label table and one gather over the codes, so
+    # the column is never copied row by row.
+    codes, labels = encode(col)
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    kept = labels[counts >= threshold]
+    new_labels = kept.union([other])  # sorted, and merges with an existing `other`
+
+    remap = new_labels.get_indexer(np.where(counts >= threshold, labels, other))
+    # the trailing entry is picked by code -1, sending missing values to `other`
+    remap = np.append(remap, new_labels.get_loc(other))
+    folded = pd.Categorical.from_codes(remap[codes], categories=new_labels)
+    return pd.Series(folded, index=col.index, name=col.name)
+
+
+_last = (None, None)
+
+
+def cube_for(df):
+    # The cube of the frame it was last asked about; a new frame rebuilds it
+    global _last
+    frame, cube = _last
+    if frame is not df:
+        cube = ContingencyCube.from_frame(df)
+        _last = (df, cube)
+    return cube
+
+
+def _weights(df, weight):
+    return None if weight is None else df[weight].to_numpy()
+
+
+def _weight_column(df, weight):
+    # Widened, so products with the narrow stored columns cannot overflow
+    col = df[weight]
+    return col.astype(np.int64 if np.issubdtype(col.dtype, np.integer) else np.float64)
+
+
+def histograms(df, group, measure, weight=None):
+    # (group labels, [(distinct values, counts)] per group); counts are summed
+    # `weight` when given, so quantiles read off them are weighted quantiles
+    codes, groups = encode(df[group])
+    return groups, group_histograms(codes, df[measure].to_numpy(), len(groups), _weights(df, weight))
+
+
+def merge_group_histograms(first, second):
+    # Two results of histograms() for the same columns, of different rows, as
+    # the one result of all their rows
+    groups = first[0].union(second[0])
+    parts = [dict(zip(labels, hists)) for labels, hists in (first, second)]
+    return groups, [merge_histograms(*[part[g] for part in parts if g in part]) for g in groups]
+
+
+def sample(df, group, measure, budget, seed=0, weight=None):
+    # Values of `measure` for a stratified sample of at most `budget` rows,
+    # one array per group, in row order
+    codes, groups = encode(df[group])
+    values = df[measure].to_numpy()
+    rows = stratified_sample(codes, len(groups), budget, seed, _weights(df, weight))
+    return [values[rows[codes[rows] == g]] for g in range(len(groups))]
+
+
+def linear_fits(df, x, y, group=None, weight=None):
+    # Least-squares line of `y` on `x` per value of `group` (one line over all
+    # rows without): (group labels, slopes, intercepts)
+    if group is None:
+        codes, groups = np.zeros(len(df), dtype=np.int64), pd.Index(['All'])
+    else:
+        codes, groups = encode(df[group])
+    slopes, intercepts = group_fits(codes, df[x].to_numpy(), df[y].to_numpy(), len(groups),
+                                    _weights(df, weight))
+    return groups, slopes, intercepts
+
+
+def histogram2d(df, x, y, bins, weight=None):
+    # (counts, x edges, y edges) of `x` against `y`; counts are summed `weight` when given
+    return np.histogram2d(df[x].to_numpy(), df[y].to_numpy(), bins, weights=_weights(df, weight))
+
+
+def totals(df, path, measure, weight=None):
+    # Sum of `measure` (times `weight`) per combination of `path`, in order of
+    # first appearance, with plain string labels (px's hierarchical charts
+    # cannot aggregate categorical columns themselves)
+    values = df[measure] if weight is None else (df[measure] * _weight_column(df, weight)).rename(measure)
+    totals = values.groupby([df[col] for col in path], observed=True, sort=False).sum().reset_index()
+    return totals.astype({col: str for col in path})
+
+
+_folded = (None, {})
+
+
+def folded(df, dim, threshold):
+    # fold_rare(df[dim], threshold), remembered for as long as the same frame is passed in
+    global _folded
+    frame, by_key = _folded
+    if frame is not df:
+        by_key = {}
+        _folded = (df, by_key)
+    if (dim, threshold) not in by_key:
+        by_key[dim, threshold] = fold_rare(df[dim], threshold)
+    return by_key[dim, threshold]
+
+
+def group_means(df, dims, measure, fold=None, weight=None):
+    # Mean of `measure` per combination of `dims`; columns listed in `fold`
+    # (column -> threshold) have their rare values grouped as 'Other' first
+    fold = fold or {}
+    keys = [folded(df, dim, fold[dim]) if dim in fold else dim for dim in dims]
+    if weight is None:
+        return df.groupby(keys, observed=True).agg({measure: 'mean'}).reset_index()
+    keys = [df[key] if isinstance(key, str) else key for key in keys]
+    values, weights = df[measure], _weight_column(df, weight).where(df[measure].notna())
+    sums = pd.DataFrame({'sum': values * weights, 'weight': weights}).groupby(keys, observed=True).sum()
+    return (sums['sum'] / sums['weight']).rename(measure).reset_index()
+
+
+def country_table(countries, histograms_by_measure):
+    # One row per native.country with the count, sum, mean and median of each
+    # measure, plus the country's ISO-3 code.  Columns are '<measure>_<stat>'.
+    table = pd.DataFrame({'native.country': np.asarray(countries, dtype=object)})
+    table['iso3'] = [COUNTRY_ISO3.get(c) for c in table['native.country']]
+    count = None
+    for measure, hists in histograms_by_measure.items():
+        if count is None:
+            count = np.array([c.sum() for _, c in hists])
+            table['count'] = count
+        total = np.array([np.dot(v.astype(float), c) for v, c in hists])
+        table[f'{measure}_sum'] = total
+        table[f'{measure}_mean'] = total / np.maximum(count, 1)
+        table[f'{measure}_median'] = [quantiles(v, c, [0.5])[0] if len(v) else np.nan
+                                      for v, c in hists]
+    return table[count > 0].reset_index(drop=True)
+
+
+def country_summary(df, measures=COUNTRY_MEASURES, weight=None):
+    codes, countries = encode(df['native.country'])
+    weights = _weights(df, weight)
+    return country_table(countries, {
+        measure: group_histograms(codes, df[measure].to_numpy(), len(countries), weights)
+        for measure in measures
+    })
+
+
+_summaries = (None, {})
+
+
+def country_summary_for(df, weight=None):
+    # country_summary(df), remembered per weighting for as long as the same frame is passed in
+    global _summaries
+    frame, by_weight = _summaries
+    if frame is not df:
+        by_weight = {}
+        _summaries = (df, by_weight)
+    if weight not in by_weight:
+        by_weight[weight] = country_summary(df, weight=weight)
+    return by_weight[weight]
+
+
+def forget_frames():
+    # Drop the memos above, so they stop holding on to a frame that has been replaced
+    global _last, _folded, _summaries
+    _last, _folded, _summaries = (None, None), (None, {}), (None, {})
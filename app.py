@@ -1,567 +1,716 @@
 import dash
+import hmac
+import logging
 import os
-from dash import dcc, html,Dash
-from dash.dependencies import Input, Output
-import pandas as pd
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
+import threading
+import time
+from dash import dcc, html, Dash
+from dash.dependencies import Input, Output, State, MATCH, ALL
+from flask import current_app, has_app_context
 from styles import css_styles, insight_styles
+from figure_cache import FigureCache
+import dataset
+import metrics
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONFIG = {
+    # a CSV, or a summary directory written by `python summary.py`
+    'data_path': os.environ.get('DASHBOARD_DATA', dataset.DEFAULT_PATH),
+    'figure_cache_size': 32,
+    # build every figure while the app is created instead of on first request
+    'warm_caches': False,
+    # directory written by `python bundle.py`; unfiltered figures are then
+    # served from it without loading the data
+    'bundle_path': os.environ.get('DASHBOARD_BUNDLE'),
+    # keep cProfile dumps of this many of the slowest callback requests in
+    # profile_dir (see metrics.py); 0 turns profiling off
+    'profile_slowest': int(os.environ.get('DASHBOARD_PROFILE_SLOWEST', 0)),
+    'profile_dir': os.environ.get('DASHBOARD_PROFILE_DIR', 'profiles'),
+    # look for a new drop of the data every this many seconds (see refresh.py); 0 never does
+    'refresh_interval': float(os.environ.get('DASHBOARD_REFRESH_INTERVAL', 0)),
+    # enables POST /admin/refresh for requests bearing this token
+    'admin_token': os.environ.get('DASHBOARD_ADMIN_TOKEN'),
+    # gzip (or brotli) the responses; turn off when a proxy in front does it
+    'compress': os.environ.get('DASHBOARD_COMPRESS', '1') != '0',
+    # threads warm_caches builds figures on; 0 picks scheduler.DEFAULT_THREADS
+    'build_threads': int(os.environ.get('DASHBOARD_BUILD_THREADS', 0)),
+    # bytes of drill-down query results kept (see query.py)
+    'query_cache_bytes': int(os.environ.get('DASHBOARD_QUERY_CACHE_MB', 64)) << 20,
+}
 
 
-# read data
-df = pd.read_csv("refined_adult.csv")
-# Initialize the Dash app
-app = dash.Dash(__name__,suppress_callback_exceptions=True, external_stylesheets=[{'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css',
-    'rel': 'stylesheet',
-    'async': True }])
-
-def age_distribution_plot():
-    fig = px.violin(df, x='income', y='age', 
-                    title='Distribution of Age by Income Level',
-                    labels={'income': 'Income Level', 'age': 'Age'}, 
-                    box=True, points='all') # Box=True adds a mini box plot inside the violin plot
-    return fig
-
-def hours_worked_plot():
-    fig = px.box(df, x='income', y='hours.per.week',
-             title='Distribution of Hours Worked per Week by Income Group',
-             labels={'income': 'Income Group', 'hours.per.week': 'Hours per Week'},
-             points='outliers', ) # Show outliers
-             
-    return fig
-
-def marital_status_plot():
-    color_map = {
-    '<=50K': '#008080',
-    '>50K': '#4EBCBA'
-}   
-
-    counts = df.groupby(['marital.status', 'income']).size().reset_index(name='count')
-    fig = px.bar(counts, x='marital.status', y='count', color='income',
-             title='Income Distribution by Marital Status',
-             labels={'marital.status': 'Marital Status', 'count': 'Count', 'income': 'Income Level'},
-             color_discrete_map=color_map,
-             barmode='group')
-    return fig
-
-
-def racial_status_stacked_plot():
-    # Aggregate the data
-    aggregated_df = df.groupby(['race', 'income']).size().reset_index(name='count')
-    heatmap_df = aggregated_df.pivot(index='race', columns='income', values='count')
-    fig = px.imshow(heatmap_df,
-                color_continuous_scale='Viridis',
-                labels={'x': 'Income', 'y': 'Race', 'color': 'Count of People'},
-                title='Income Distribution by Race',
-                text_auto=True)
-    fig.update_layout(
-        autosize=False,
-        width=800,  # Adjust the width as needed
-        height=450,  # Adjust the height as needed
-    )
-    return fig
-
-def workclass_gender_distribution():
-    color_map = {
-    '<=50K': '#FFD6A5',
-    '>50K': '#FFADAD'
-}
+CALLBACKS = []  # (arguments of Dash.callback, function) of every callback below
 
-    counts = df.groupby(['workclass', 'sex']).size().reset_index(name='count')
-    fig = px.bar(counts, x='workclass', y='count', color='sex',
-             title='Distribution of Work Class Across Different Gender',
-             labels={'workclass': 'Workclass', 'count': 'Count', 'sex': 'Gender'},
-             color_discrete_map=color_map,
-             barmode='stack',
-             text='count')
-    fig.update_layout(
-        width=700,
-        height=400,
-        title_x=0.5,
-        title_y=0.95
-    )
-
-    return fig
-
-def education_level_plot():
-    
-    education_mapping = df[['education.num', 'education']].drop_duplicates().sort_values('education.num')
-    education_mapping_dict = dict(zip(education_mapping['education.num'], education_mapping['education']))
-
-  # Create an ordered list of education levels based on education.num
-    ordered_education_levels = [education_mapping_dict[num] for num in sorted(education_mapping_dict.keys())]
-
-
-    color_map = {
-    '<=50K': '#99BAB9',
-    '>50K': '#CCD5AE'
-    }
-
-    counts = df.groupby(['education', 'income']).size().reset_index(name='count')
-    fig = px.bar(counts, x='education', y='count', color='income',
-             title='Distribution of Work Class Across Different Gender',
-             labels={'education': 'edu', 'income': 'income'},
-             category_orders={'education': ordered_education_levels},
-             color_discrete_map=color_map,
-             barmode='group')
-    return fig
-
-def hour_captial_gain_plot():
-    fig = px.scatter(df, x='hours.per.week', y='capital.gain',
-                 title='Relationship between Hours Worked per Week and Capital Gain',
-                 labels={'hours.per.week': 'Hours per Week', 'capital.gain': 'Capital gain'},
-                 trendline='ols',
-                 trendline_color_override="red",
-                 color='hours.per.week'
-                  )
-    return fig
-
- 
-def sunburst() : 
-    fig = px.sunburst(
-    df,
-    path=['income', 'occupation'],
-    values='hours.per.week',
-    color='income',
-    color_discrete_map={'>50K': "#e27c7c", '<=50K': "#a86464"},
-    hover_data={'hours.per.week': True}
-)
 
+def callback(*args, **kwargs):
+    # Like dash.callback, but registered with each app create_app() makes
+    # rather than with the first one to serve a request
+    def register(func):
+        CALLBACKS.append((args, kwargs, func))
+        return func
+    return register
 
-    # Update Layout
-    fig.update_layout(
-        title='Distribution of Hours Per Week by Income and Occupation',
-        width=550,
-        height=500,
-        title_x=0.5,
-        title_y=0.95
-    )
-
-    # Add Annotation
-    fig.add_annotation(
-        text="Size of each segment represents the average hours per week.",
-        xref='paper',
-        yref='paper',
-        x=0.5,
-        y=-0.1,
-        showarrow=False,
-        font=dict(size=14, color="black"),
-        align='center'
-    )
-
-    return fig
-
-def multivariate1():
-    color_map = {
-        '<=50K': '#ffb400',
-        '>50K': '#a57c1b'
-    }
-
-    # Create the histogram
-    fig = px.histogram(df, x='occupation', color='income', 
-                       facet_col='workclass', barmode='group',
-                       color_discrete_map=color_map,
-                       title='Distribution of Occupation by Income, Workclass',
-                       labels={'occupation': 'Occupation', 'income': 'Income Level'})
-    
-    # Update layout properties
-    fig.update_layout(
-        width=2500,       # Increase width
-        height=500,       # Increase height
-        title_x=0.5,      # Center the title
-        title_y=0.95,     # Position the title slightly below the top
-        xaxis_title='Occupation',  # X-axis title
-        yaxis_title='Count',       # Y-axis title
-        margin=dict(t=70, l=75, r=75, b=80),  # Set margins
-
-    )
-    return fig
-def aggregate_countries(df):
-    df_copy = df.copy() 
-    threshold = 1000
-    country_counts = df_copy['native.country'].value_counts()
-    countries_to_keep = country_counts[country_counts >= threshold].index
-    df_copy['native.country'] = df_copy['native.country'].apply(lambda x: x if x in countries_to_keep else 'Other')
-    return df_copy
-
-def multivariate2(df):
-
-    # Apply the function to the DataFrame
-    df_filtered  = aggregate_countries(df)
-
-    # Aggregate data to calculate average capital gain
-    df_aggregated = df_filtered .groupby(['native.country', 'race', 'workclass']).agg({
-        'capital.gain': 'mean'
-    }).reset_index()
-
-    color_map = {
-        'White': '#f3a8c2',
-        'Black': '#f6d1de',
-        'Asian-Pac-Islander': '#f74fd0',
-        'Amer-Indian-Eskimo': '#a2a0a1',
-        'Other': "#75c2f9"
-    }
-
-    fig = px.bar(df_aggregated, x='workclass', y='capital.gain', color='race', 
-                facet_col='native.country', barmode='group',
-                title='Average Capital Gain by Work Class, Race, and Native Country',
-                labels={'workclass': 'Work Class', 'capital.gain': 'Average Capital Gain'},
-                color_discrete_map=color_map)
-
-    # Update layout
-    fig.update_layout(width=900, height=500, margin=dict(t=70, l=25, r=25, b=25))
-    return fig
-
-
-def workclass_workhour_tree():
-    fig = px.treemap(
-    df,
-    path=['income', 'workclass'],
-    values='hours.per.week',
-    color='income',
-    title="Distribution of Hours Per Week by Income and Workclass",
-    color_discrete_map={'>50K': "#e27c7c", '<=50K': "#a86464"},
-    hover_data={'hours.per.week': True}
-)
-    # Update Layout
-    fig.update_layout(
-        width=650,
-        height=500,
-        title_x=0.5,
-        title_y=0.95
-    )
-    
 
-    return fig
-
-def count_income_workclass_sex_income():
-    count_individuals = df.groupby(['workclass', 'sex', 'income']).size().reset_index(name='count')
-    fig = px.bar(count_individuals, 
-                               x='workclass', 
-                               y='count', 
-                               color='workclass',
-                               facet_col='sex',
-                               facet_row='income',
-                               text='count',
-                               title='Count of Individuals by Work Class, Sex, and Income',
-                               labels={'workclass': 'Work Class', 'count': 'Count of Individuals'}
-                               )
-    fig.update_layout(
-        autosize=False,
-        width=800,  # Adjust the width as needed
-        height=600  # Adjust the height as needed
-    )
-
-    #fig_count_individuals.update_xaxes(title_text='Work Class')
-    #fig_count_individuals.update_yaxes(title_text='Count of Individuals')
-    #fig.for_each_annotation(lambda a: a.update(text=f"<b>{a.text.split('=')[-1]}</b>"))  # Clean and bold facet titles
-
-    return fig
-
-
-def proportion_count(df):
-    # Group by race, sex, and income, then calculate the proportion of individuals earning >50K
-    income_race_gender = df.groupby(['race', 'sex', 'income']).size().unstack(fill_value=0)
-    income_race_gender['proportion_>50K'] = income_race_gender['>50K'] / (income_race_gender['<=50K'] + income_race_gender['>50K'])
-    income_race_gender_proportions = income_race_gender[['proportion_>50K']].reset_index()
-
-    color_discrete_map = {
-        'White': '#CCD3CA',
-        'Black': '#B5C0D0',
-        'Asian-Pac-Islander': '#E2BFB3',
-        'Amer-Indian-Eskimo': '#EED3D9',
-        'Other': '#AEABAA',
-    }
-
-    fig = px.pie(income_race_gender_proportions, 
-                 names='race', 
-                 values='proportion_>50K', 
-                 color='race', 
-                 color_discrete_map=color_discrete_map,
-                 title='Proportion of Individuals Earning > 50K by Race and Gender',
-                 facet_col='sex')
-
-    # Clean and bold facet titles
-    fig.for_each_annotation(lambda a: a.update(text=f"<b>{a.text.split('=')[-1]}</b>"))
-    fig.update_layout(
-        autosize=False,
-        width=600,  # Adjust the width as needed
-        height=400  # Adjust the height as needed
-    )
-
-    return fig
-
-
-app.layout = html.Div([
-    # Header Section
-    html.Div([
-        html.H1("Exploring Income Trends by Demographic Factors", 
-                className='text-center my-4 header', 
-                style={'color': '#50748B', 'font-size': '2.5rem', 'font-weight': 'bold', 'text-shadow': '1px 1px 2px rgba(0,0,0,0.1)'}),
-    ], className='container'),
+def load_figures():
+    # pandas and plotly.express are only imported once a figure is first needed
+    import figures
+    return figures
 
-    # Introduction Section
-       html.Div([
-        html.Div([
-            html.H2("Introduction", className='subheader', style={'color': '#1E4C6A'}),
-            html.Div([
-                "Welcome to the interactive dashboard for analyzing how income varies based on demographic factors. This ",
-                html.A("dataset", href='https://www.kaggle.com/datasets/priyamchoksi/adult-census-income-dataset/data', target='_blank', style={'color': '#008ae6'}),
-                " was retrieved from the UCI Machine Learning Repository and extracted from the 1994 Census bureau database by Ronny Kohavi and Barry Becker from Silicon Graphics. The goal is to explore and visualize the relationships between various demographic factors and income levels."
-            ], style={'color': 'black', 'font-size': '1.15rem'}),
-        ], className='p-3 bg-custom rounded shadow-sm mb-4')
-    ], className='container'),
-    html.Div([
-        html.Div([
-            html.H2("Objective", className='subheader', style={'color': '#1E4C6A'}),
-            html.P("The objective of this dashboard is to provide a comprehensive analysis of income variations across different demographic groups, education levels, and occupations. It aims to uncover significant differences in income based on marital status, highest education level, and work hours. Additionally, the dashboard explores the distribution of individuals by work class, gender, and income, as well as the relationship between capital gains/losses and various demographic factors. The visualizations are designed to inform and support data-driven decision-making by highlighting key patterns and insights.")
-        ], className='p-3 bg-custom rounded shadow-sm mb-4')
-    ], className='container'),
 
-    # Dataset Overview, Data Characteristics, Data Preprocessing Sections
-    html.Div([
-        html.Div([
-            html.H3("Dataset Overview", className='subheader', style={'color': '#1E4C6A'}),
-            html.P("The dataset includes the following attributes:"),
-            html.Ul([
-                html.Li("Age: Individual's age."),
-                html.Li("Work Class: Type of employment."),
-                html.Li("Education: Highest level of education."),
-                html.Li("Hours Worked per Week: Average hours worked weekly."),
-                html.Li("Capital Gain: Amount of capital gains."),
-                html.Li("Capital Loss: Amount of capital losses."),
-                html.Li("Income Level: Income above or below $50K."),
-                html.Li("Final Weight (fnlwgt): Sampling weight."),
-                html.Li("Education Number (education-num): Ordinal education level."),
-                html.Li("Marital Status: Individual’s marital status."),
-                html.Li("Occupation: Type of occupation."),
-                html.Li("Relationship: Family relationship status."),
-                html.Li("Race: Racial group."),
-                html.Li("Sex: Gender."),
-                html.Li("Native Country: Country of origin.")
-            ]),
-            html.H3("Data Characteristics", className='subheader', style={'color': '#1E4C6A'}),
-            html.P([
-                "The dataset contains approximately ",
-                html.Span("32,561", style={'font-weight': 'bold'}),
-                " rows and ",
-                html.Span("15", style={'font-weight': 'bold'}),
-                " columns. It features a diverse representation of work classes, education levels, and income levels, providing a robust basis for predictive analysis."
-            ]),
-            html.H3("Data Preprocessing", className='subheader', style={'color': '#1E4C6A'}),
-            html.P("To prepare the data for analysis, we performed several preprocessing steps, including handling missing values, normalizing numerical features, and encoding categorical variables."),
-        ], className='p-3 bg-custom rounded shadow-sm mb-4')
-    ], className='container'),
+def figure(builder, *args, needs=()):
+    # Cache builder calling figures.<builder>(*args) on the current view.
+    # `needs` names the SHARED_AGGREGATES it reads, which warm_caches builds first.
+    def build():
+        figures = load_figures()
+        return figures.weighting_note(getattr(figures, builder)(*args))
+    build.needs = needs
+    return build
 
 
-    # Existing Content Sections
-    html.Div([
-        html.Div([
-            html.H2("Age Distribution Analysis", className='subheader', style={'color': '#1E4C6A'}),
-            html.P("The age column is an important feature in our dataset. To understand its distribution, we use a histogram and a box plot.", style={'color': '#05395a', 'font-size': '1.15rem'}),
-            html.Img(src='/assets/histogram_age.png', className='img-fluid rounded mx-auto d-block', style={'width': '50%', 'height': 'auto'}),
-            html.P("The histogram shows that the age distribution is not normally distributed. There is a higher frequency of individuals in the younger age groups, with a decreasing number of individuals as age increases.",
-                   style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.Img(src='/assets/outlier.png', className='img-fluid rounded mx-auto d-block', style={'width': '50%', 'height': 'auto'}),
-            html.P("The box plot reveals the presence of outliers in the age data, indicating that some individuals fall outside the typical age range for the majority of the dataset.", style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.P("Understanding the income and work patterns of older individuals can provide insights into retirement age, post-retirement income sources, and economic contributions of the elderly.", style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.H4("Statistical Test Selection", className='subheader', style={'color': '#1E4C6A'}),
-            html.P("Due to the non-normal distribution of the age column and the presence of outliers, we opted for non-parametric statistical tests, which do not assume normality. These tests include the Mann-Whitney U Test, Kruskal-Wallis H Test, Chi-Square Test of Independence, and Spearman's Rank Correlation.", style={'color': '#05395a', 'font-size': '1.15rem'})
-        ], className='p-3 bg-custom rounded shadow-sm mb-4')
-    ], className='container'),
+# Aggregates several figures are drawn from, each built once per dataset
+# before the figures that need it (see warm_caches)
+SHARED_AGGREGATES = {
+    'cube': lambda data: data.cube,
+    'country_summary': lambda data: data.country_summary(),
+}
 
-    html.Div([
-        html.Div([
-            html.H2("Explore Key Factors Affecting Income Distribution", className='subheader', style={'color': '#1E4C6A'}),
-            dcc.RadioItems(
-                id='analysis-options',
-                options=[
-                    {'label': 'Income Distribution by Age ', 'value': 'age_distribution'},
-                    {'label': 'Income Distribution by Hours Worked Per Week', 'value': 'hours_worked'},
-                    {'label': 'Income Distribution by Marital Status', 'value': 'marital_status'},
-                    {'label': 'Income Distribution by Racial Group', 'value': 'racial_group'},
-                    {'label': 'Income Distribution by Education Level', 'value': 'education_level'},
-                ],
-                value='age_distribution',
-                labelStyle={'display': 'block'}
-            )
-        ], className='p-3 bg-custom rounded shadow-sm mb-4')
-    ], className='container'),
-    html.Div([
-        # Displaying the selected question
-        html.Div(id='question-output', style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px'}),
+# Figures behind the analysis-options RadioItems, built once per dataset version
+ANALYSIS_FIGURES = {
+    'age_distribution': figure('age_distribution_plot'),
+    'hours_worked': figure('hours_worked_plot'),
+    'marital_status': figure('marital_status_plot', needs=['cube']),
+    'racial_group': figure('racial_status_stacked_plot', needs=['cube']),
+    'education_level': figure('education_level_plot', needs=['cube']),
+}
 
-    html.Div([
-        html.Div([
-            dcc.Graph(id='graph-output', style={'height': '450px', 'width': '800px'}),
-            html.Div(id='insights-output', style={'width': '30%', 'display': 'inline-block', 'margin-left': '30px', 'font-size': '1.15rem', 'font-weight': 'bold'})
-        ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '20px'}),
-    ]),
-    ], className='container'),
+# Figures of the static sections further down the page.  They are not part of
+# the initial layout; assets/lazy_sections.js asks for each one when its
+# section scrolls into view.
+SECTION_FIGURES = {
+    'workclass-gender': figure('workclass_gender_distribution', needs=['cube']),
+    'workclass-sex-income': figure('count_income_workclass_sex_income', needs=['cube']),
+    'income-proportion': figure('proportion_count', needs=['cube']),
+    'workclass-hours': figure('workclass_workhour_tree'),
+    'occupation-hours': figure('sunburst'),
+    'country-capital-gain': figure('multivariate2'),
+}
 
-    html.Div([
-        html.Div([
-            html.H2("Demographic Distribution and Income Proportions", className='subheader', style={'color': '#1E4C6A'}),
-        ], className='container p-3 bg-custom rounded shadow-sm mb-4'),
-        # Display the question
+# Choropleths behind the filter-dropdown, one per measure
+MAP_FIGURES = {
+    'capital.gain': figure('country_capital_map', 'capital.gain', needs=['country_summary']),
+    'capital.loss': figure('country_capital_map', 'capital.loss', needs=['country_summary']),
+}
+
+# Choices of the drill-down section (see query.py, which accepts more)
+DRILL_DIMS = {
+    'workclass': 'Work Class', 'education': 'Education', 'marital.status': 'Marital Status',
+    'occupation': 'Occupation', 'relationship': 'Relationship', 'race': 'Race', 'sex': 'Sex',
+    'native.country': 'Native Country', 'income': 'Income Level', 'age': 'Age',
+}
+DRILL_MEASURES = {
+    'hours.per.week': 'Hours per Week', 'age': 'Age', 'capital.gain': 'Capital Gain',
+    'capital.loss': 'Capital Loss', 'education.num': 'Years of Education',
+}
+DRILL_AGGREGATIONS = {'count': 'Count', 'mean': 'Mean', 'sum': 'Total', 'min': 'Minimum', 'max': 'Maximum'}
+
+class PagedBuilders(dict):
+    # Cache builders for the pages of a paged figure, made as pages are asked
+    # for.  `pages` names the figures function returning the page count of
+    # the dataset `data()` returns.
+    def __init__(self, builder, pages, data, needs=()):
+        super().__init__()
+        self.builder = builder
+        self.pages = pages
+        self.data = data
+        self.needs = needs
+        self[0] = self._page(0)  # the first page, which warm_caches builds
+
+    def page_count(self):
+        with dataset.viewing(self.data()):
+            return getattr(load_figures(), self.pages)()
+
+    def __missing__(self, page):
+        # only pages that exist, so clients cannot fill the cache with others
+        if not isinstance(page, int) or not 0 <= page < self.page_count():
+            raise KeyError(page)
+        build = self[page] = self._page(page)
+        return build
+
+    def _page(self, page):
+        draw = figure(self.builder, page, needs=self.needs)
+
+        def build():
+            fig = draw()
+            # a page's size is fixed by the number of categories; the log shows it stays so
+            logger.info("%s page %d: %d bytes", self.builder, page, len(fig.to_json()))
+            return fig
+        build.needs = self.needs
+        return build
+
+
+# Hours vs capital gain behind the fit-by RadioItems, one per trend-line grouping
+SCATTER_FIGURES = {
+    'all': figure('hour_captial_gain_plot'),
+    'income': figure('hour_captial_gain_plot', 'income'),
+    'workclass': figure('hour_captial_gain_plot', 'workclass'),
+}
+
+
+def figure_caches(data, max_entries=32):
+    # A new set of the figure caches, by name, for the dataset `data()`
+    # returns.  The occupation chart's pages of workclass facets are turned by
+    # its buttons.
+    return {cache.name: cache for cache in (
+        FigureCache(dict(ANALYSIS_FIGURES), max_entries, 'analysis'),
+        FigureCache(dict(SECTION_FIGURES), max_entries, 'sections'),
+        FigureCache(dict(MAP_FIGURES), max_entries, 'maps'),
+        FigureCache(dict(SCATTER_FIGURES), max_entries, 'scatter'),
+        FigureCache(PagedBuilders('multivariate1', 'occupation_facet_pages', data, ['cube']), max_entries,
+                    'occupation'),
+    )}
+
+
+class Dashboard:
+    # What one app serves from: its configuration, figure caches, bundle and
+    # query cache.  create_app() keeps it in the Flask config, so two apps
+    # made in one process share none of it; dashboard() finds the one of the
+    # app handling a request.  Apps reading the same data path share the
+    # loaded dataset (see dataset.current).
+
+    def __init__(self, config):
+        self.config = config
+        self.caches = figure_caches(self.data, config['figure_cache_size'])
+        self.bundle = None  # the offline bundle being served, see bundle.py
+        if config['bundle_path']:
+            from bundle import load_bundle
+            self.bundle = load_bundle(config['bundle_path'], config['data_path'])
+        self._queries = None  # query.QueryCache, made on the first query
+        self._watcher = None  # (pid, thread) polling for new data
+        self._lock = threading.Lock()
+
+    def data(self):
+        return dataset.current(self.config['data_path'])
+
+    def query_cache(self):
+        with self._lock:
+            if self._queries is None:
+                from query import QueryCache
+                self._queries = QueryCache(self.config['query_cache_bytes'])
+            return self._queries
+
+    def figure_names(self, cache):
+        # Every figure a cache can build: its builders, or each page of a paged figure
+        if isinstance(cache.builders, PagedBuilders):
+            if self.bundle is not None:
+                return self.bundle.names(cache.name)
+            return list(range(cache.builders.page_count()))
+        return list(cache.builders)
+
+    def warm_steps(self, data):
+        # scheduler steps building the aggregates and cached figures of `data`,
+        # named '<weighting>/<aggregate>' and '<weighting>/<cache>/<figure>'
+        from scheduler import Step
+        prefix = 'weighted/' if data.weight else 'rows/'
+
+        def on_data(build, *args):
+            def run():
+                with dataset.viewing(data):
+                    build(*args)
+            return run
+
+        steps = [Step(prefix + name, on_data(build, data)) for name, build in SHARED_AGGREGATES.items()]
+        if data.df is not None and data.weight is None:
+            # shared by every cross-filtered view, of either weighting
+            steps.append(Step('bitmaps', on_data(lambda data: data.bitmaps, data)))
+        for cache in self.caches.values():
+            for name, build in list(cache.builders.items()):
+                steps.append(Step(f'{prefix}{cache.name}/{name}',
+                                  on_data(cache.get, name, data.version, data.variant),
+                                  [prefix + need for need in build.needs]))
+        return steps
+
+    def warm_caches(self, threads=None):
+        # Both weightings, so flipping the toggle is a cache hit.  A bundle
+        # already holds the unfiltered figures; the data is then only read once
+        # somebody cross-filters.  Independent builds run concurrently (see
+        # scheduler.py); returns the seconds each step took.
+        if self.bundle is not None:
+            return {}
+        from scheduler import DEFAULT_THREADS, run_steps
+        data = self.data()
+        threads = threads or self.config['build_threads'] or DEFAULT_THREADS
+        start = time.perf_counter()
+        timings = run_steps(self.warm_steps(data) + self.warm_steps(data.weighted), threads)
+        logger.info("warmed %d figures and aggregates in %.2f s on %d threads",
+                    len(timings), time.perf_counter() - start, threads)
+        for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+            logger.debug("  %-44s %6.3f s", name, seconds)
+        return timings
+
+    def drop_stale_bundle(self, version):
+        if self.bundle is not None and self.bundle.manifest['version'] != version:
+            logger.warning("the data changed to version %s; no longer serving the bundle in %s "
+                           "(rebuild it with `python bundle.py`)", version, self.bundle.path)
+            self.bundle = None
+
+    def data_refreshed(self, data):
+        # A new version of the data is being served: let go of what was built
+        # for the old one, and build its figures before visitors ask for them
+        from aggregation import forget_frames
+        from crossfilter import forget_views
+        for cache in self.caches.values():
+            cache.invalidate(keep_version=data.version)
+        forget_views(data.version)
+        forget_frames()
+        if self._queries is not None:
+            from query import forget_codes
+            self._queries.invalidate(keep_version=data.version)
+            forget_codes()
+        self.drop_stale_bundle(data.version)
+        self.warm_caches()
+
+    def refresh_data(self):
+        # Serve the newest data on disk (see refresh.py); returns what was done
+        import refresh
+        path = self.config['data_path']
+        done = refresh.check(path, on_swap=self.data_refreshed)
+        if done == 'not loaded':  # the bundle may still be answering for an old version
+            self.drop_stale_bundle(refresh.disk_version(path))
+        return done
+
+    def watch_for_refreshes(self):
+        # Start polling for new data, once per process: a thread of the
+        # gunicorn master does not survive the fork, so each worker starts its own
+        import refresh
+        with self._lock:
+            if self._watcher is None or self._watcher[0] != os.getpid():
+                self._watcher = (os.getpid(), refresh.watch(self.config['refresh_interval'],
+                                                            self.refresh_data))
+
+
+_default = None  # the Dashboard of code running outside any app (scripts, tests)
+
+
+def dashboard(dash_app=None):
+    # The Dashboard of `dash_app`, else of the app handling this request,
+    # else one made from DEFAULT_CONFIG
+    global _default
+    if dash_app is not None:
+        return dash_app.server.config['DASHBOARD']
+    if has_app_context() and 'DASHBOARD' in current_app.config:
+        return current_app.config['DASHBOARD']
+    if _default is None:
+        _default = Dashboard(dict(DEFAULT_CONFIG))
+    return _default
+
+
+# Cross-filtering: what a click on each chart selects.  Flat charts map the
+# clicked point's x/y to a column; hierarchical ones select their whole path.
+CLICK_DIMS = {
+    'marital_status': {'x': 'marital.status'},
+    'education_level': {'x': 'education'},
+    'racial_group': {'x': 'income', 'y': 'race'},
+}
+PATH_DIMS = {
+    'occupation-hours': ['income', 'occupation'],
+    'workclass-hours': ['income', 'workclass'],
+}
+# A chart ignores the filters on the columns it selects (so the other values
+# stay clickable); the income proportions need both income groups
+OWN_DIMS = dict({name: list(axes.values()) for name, axes in CLICK_DIMS.items()},
+                **PATH_DIMS, **{'income-proportion': ['income']})
+
+
+def clicked_values(name, click_data):
+    # column -> value picked by a click on chart `name`
+    if not click_data or not click_data.get('points'):
+        return {}
+    point = click_data['points'][0]
+    if name in PATH_DIMS:
+        return dict(zip(PATH_DIMS[name], point.get('id', '').split('/')))
+    return {dim: point[axis] for axis, dim in CLICK_DIMS.get(name, {}).items() if axis in point}
+
+
+def weighted_data(weighting):
+    # The dataset, counting rows or (weighting == 'weighted') estimating the population
+    data = dashboard().data()
+    return data.weighted if weighting == 'weighted' else data
+
+
+def filtered_figure(cache, name, selection, weighting=None):
+    # Figure `name` of the cache named `cache`, drawn on the rows picked by
+    # the cross-filter selection
+    state = dashboard()
+    if not selection and state.bundle is not None:
+        fig = state.bundle.get(cache, name, weighting or 'rows')
+        if fig is not None:
+            metrics.lookup(cache, name, 'bundle')
+            return fig
+    view = weighted_data(weighting)
+    if selection and view.df is not None:  # a summary has no rows to filter
+        from crossfilter import view_for
+        with metrics.phase('aggregation'):
+            view = view_for(view, selection, exclude=OWN_DIMS.get(name, ()))
+            empty = view.key is not None and not view.n_rows
+        if empty:
+            return load_figures().no_data_figure()
+    with dataset.viewing(view):
+        return state.caches[cache].get(name, view.version, view.variant)
+
+
+def lazy_graph(name):
+    return html.Div([
+        dcc.Store(id={'type': 'lazy-visible', 'name': name}),
+        dcc.Loading(dcc.Graph(id={'type': 'lazy-graph', 'name': name})),
+    ], className='lazy-section', **{'data-section': name})
+
+
+def serve_layout():
+    # Built per page load; the figures themselves arrive through callbacks
+    return html.Div([
+        # Header Section
         html.Div([
-        html.P("What are the gender-based distributions across different work classes?", 
-               style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
-    ], className='container', style={'margin-bottom': '20px'}),
-          html.Div([
-        # Visualization
+            html.H1("Exploring Income Trends by Demographic Factors", 
+                    className='text-center my-4 header', 
+                    style={'color': '#50748B', 'font-size': '2.5rem', 'font-weight': 'bold', 'text-shadow': '1px 1px 2px rgba(0,0,0,0.1)'}),
+        ], className='container'),
+
+        # Introduction Section
+           html.Div([
+            html.Div([
+                html.H2("Introduction", className='subheader', style={'color': '#1E4C6A'}),
+                html.Div([
+                    "Welcome to the interactive dashboard for analyzing how income varies based on demographic factors. This ",
+                    html.A("dataset", href='https://www.kaggle.com/datasets/priyamchoksi/adult-census-income-dataset/data', target='_blank', style={'color': '#008ae6'}),
+                    " was retrieved from the UCI Machine Learning Repository and extracted from the 1994 Census bureau database by Ronny Kohavi and Barry Becker from Silicon Graphics. The goal is to explore and visualize the relationships between various demographic factors and income levels."
+                ], style={'color': 'black', 'font-size': '1.15rem'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4')
+        ], className='container'),
         html.Div([
-            dcc.Graph(
-                figure=workclass_gender_distribution()
-            )
-        ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+            html.Div([
+                html.H2("Objective", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("The objective of this dashboard is to provide a comprehensive analysis of income variations across different demographic groups, education levels, and occupations. It aims to uncover significant differences in income based on marital status, highest education level, and work hours. Additionally, the dashboard explores the distribution of individuals by work class, gender, and income, as well as the relationship between capital gains/losses and various demographic factors. The visualizations are designed to inform and support data-driven decision-making by highlighting key patterns and insights.")
+            ], className='p-3 bg-custom rounded shadow-sm mb-4')
+        ], className='container'),
 
-        # Insights
+        # Dataset Overview, Data Characteristics, Data Preprocessing Sections
         html.Div([
-            html.Ul([
-                html.Li("Most people work in the Private sector, with a significant number of males compared to females.", style={'color': '#54aeb1', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-                html.Li("Other work classes have relatively balanced gender distributions but much lower counts.", style={'color': '#54aeb1', 'font-size': '1.15rem', 'font-weight': 'bold'})
-            ], className='flex-item')
-        ], style={'margin-left': '70'})  # Flex: 1 for insights
-    ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
-    html.Div([
-        html.P("Count of Individuals by Work Class, Sex, and Income", 
-               style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
-    ], className='container', style={'margin-bottom': '20px'}),
-    html.Div([
-        # Visualization
+            html.Div([
+                html.H3("Dataset Overview", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("The dataset includes the following attributes:"),
+                html.Ul([
+                    html.Li("Age: Individual's age."),
+                    html.Li("Work Class: Type of employment."),
+                    html.Li("Education: Highest level of education."),
+                    html.Li("Hours Worked per Week: Average hours worked weekly."),
+                    html.Li("Capital Gain: Amount of capital gains."),
+                    html.Li("Capital Loss: Amount of capital losses."),
+                    html.Li("Income Level: Income above or below $50K."),
+                    html.Li("Final Weight (fnlwgt): Sampling weight."),
+                    html.Li("Education Number (education-num): Ordinal education level."),
+                    html.Li("Marital Status: Individual’s marital status."),
+                    html.Li("Occupation: Type of occupation."),
+                    html.Li("Relationship: Family relationship status."),
+                    html.Li("Race: Racial group."),
+                    html.Li("Sex: Gender."),
+                    html.Li("Native Country: Country of origin.")
+                ]),
+                html.H3("Data Characteristics", className='subheader', style={'color': '#1E4C6A'}),
+                html.P([
+                    "The dataset contains approximately ",
+                    html.Span("32,561", style={'font-weight': 'bold'}),
+                    " rows and ",
+                    html.Span("15", style={'font-weight': 'bold'}),
+                    " columns. It features a diverse representation of work classes, education levels, and income levels, providing a robust basis for predictive analysis."
+                ]),
+                html.H3("Data Preprocessing", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("To prepare the data for analysis, we performed several preprocessing steps, including handling missing values, normalizing numerical features, and encoding categorical variables."),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4')
+        ], className='container'),
+
+
+        # Existing Content Sections
         html.Div([
-            dcc.Graph(
-                figure=count_income_workclass_sex_income()
-            )
-        ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+            html.Div([
+                html.H2("Age Distribution Analysis", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("The age column is an important feature in our dataset. To understand its distribution, we use a histogram and a box plot.", style={'color': '#05395a', 'font-size': '1.15rem'}),
+                html.Img(src='/assets/histogram_age.png', className='img-fluid rounded mx-auto d-block', style={'width': '50%', 'height': 'auto'}),
+                html.P("The histogram shows that the age distribution is not normally distributed. There is a higher frequency of individuals in the younger age groups, with a decreasing number of individuals as age increases.",
+                       style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.Img(src='/assets/outlier.png', className='img-fluid rounded mx-auto d-block', style={'width': '50%', 'height': 'auto'}),
+                html.P("The box plot reveals the presence of outliers in the age data, indicating that some individuals fall outside the typical age range for the majority of the dataset.", style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.P("Understanding the income and work patterns of older individuals can provide insights into retirement age, post-retirement income sources, and economic contributions of the elderly.", style={'color': '#05395a', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.H4("Statistical Test Selection", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("Due to the non-normal distribution of the age column and the presence of outliers, we opted for non-parametric statistical tests, which do not assume normality. These tests include the Mann-Whitney U Test, Kruskal-Wallis H Test, Chi-Square Test of Independence, and Spearman's Rank Correlation.", style={'color': '#05395a', 'font-size': '1.15rem'})
+            ], className='p-3 bg-custom rounded shadow-sm mb-4')
+        ], className='container'),
 
-        # Insights
         html.Div([
-            html.Ul([
-                html.Li([
-                html.Span("Female (<=50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
-                ": The majority of women earning ≤50K are in the Private sector, with 5010 individuals. Other work classes like Local-gov, Self-employed, and State-gov have significantly fewer women."
-            ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.Li([
-                html.Span("Female (>50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
-                ":For women earning >50K, the highest count is again in the Private sector (623), followed by Self-employed (145)."
-            ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-             html.Li([
-                html.Span("Male (<=50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
-                ":Men in the ≤50K category are also predominantly in the Private sector (7592), followed by Self-employed and Local-gov."
-            ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.Li([
-                html.Span("Male (>50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
-                ":In the >50K category, men are mainly in the Private sector (3470), with significant counts in Self-employed,State-gov and Local-gov."
-            ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            ], className='flex-item')
-        ], style={'margin-left': '70'})  # Flex: 1 for insights
-    ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
-    html.Div([
-        html.P("Proportion of Individuals Earning > $50K by Race and Gender", 
-               style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
-    ], className='container', style={'margin-bottom': '20px'}),
-    html.Div([
-        # Visualization
+            html.Div([
+                html.H2("Explore Key Factors Affecting Income Distribution", className='subheader', style={'color': '#1E4C6A'}),
+                dcc.RadioItems(
+                    id='analysis-options',
+                    options=[
+                        {'label': 'Income Distribution by Age ', 'value': 'age_distribution'},
+                        {'label': 'Income Distribution by Hours Worked Per Week', 'value': 'hours_worked'},
+                        {'label': 'Income Distribution by Marital Status', 'value': 'marital_status'},
+                        {'label': 'Income Distribution by Racial Group', 'value': 'racial_group'},
+                        {'label': 'Income Distribution by Education Level', 'value': 'education_level'},
+                    ],
+                    value='age_distribution',
+                    labelStyle={'display': 'block'}
+                ),
+                html.P("Click a bar, heatmap cell or sunburst/treemap segment to filter every other chart to it; click it again to remove it.",
+                       style={'margin-top': '15px', 'margin-bottom': '5px'}),
+                html.Div([
+                    html.Span(id='crossfilter-status', style={'font-weight': 'bold'}),
+                    html.Button("Clear filter", id='crossfilter-clear', className='btn btn-sm btn-outline-secondary ml-3'),
+                ]),
+                dcc.Store(id='crossfilter-selection', data={}),
+                dcc.RadioItems(
+                    id='weighting',
+                    options=[
+                        {'label': 'Count sampled rows ', 'value': 'rows'},
+                        {'label': 'Estimate the population (weighted by fnlwgt)', 'value': 'weighted'},
+                    ],
+                    value='rows',
+                    inline=True,
+                    labelStyle={'margin-right': '20px'},
+                    style={'margin-top': '10px'}
+                ),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4')
+        ], className='container'),
         html.Div([
-            dcc.Graph(
-                figure=proportion_count(df)
-            )
-        ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+            # Displaying the selected question
+            html.Div(id='question-output', style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px'}),
 
-        # Insights
         html.Div([
-            html.Ul([
-                html.Li([
-                html.Span("Female", style={'color': '#f1948a '}),  # Highlighting "Female (≤50K)" in blue
-                ":Among females, the largest proportion of those earning >50K is  Amer-Indian-Eskimo (26.3%), followed by White(24.3%) and Asian-Pac-Islander (23.5%)."
-            ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.Li([
-                html.Span("Male", style={'color': '#f1948a'}),  # Highlighting "Female (≤50K)" in blue
-                ":Among males, Asian-Pac-Islander constitute the largest proportion (32%), followed by White (29.6%) and Black (17%)."
-            ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            ], className='flex-item')
-        ], style={'margin-left': '70'})  # Flex: 1 for insights
-    ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
-
-], className='container'),
-
-    html.Div([
+            html.Div([
+                dcc.Graph(id='graph-output', style={'height': '450px', 'width': '800px'}),
+                html.Div(id='insights-output', style={'width': '30%', 'display': 'inline-block', 'margin-left': '30px', 'font-size': '1.15rem', 'font-weight': 'bold'})
+            ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '20px'}),
+        ]),
+        ], className='container'),
+
         html.Div([
-            html.H2("Variation in Work Hours Across Occupations and Work Classes", className='subheader', style={'color': '#1E4C6A'}),
-        ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            html.Div([
+                html.H2("Demographic Distribution and Income Proportions", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='container p-3 bg-custom rounded shadow-sm mb-4'),
+            # Display the question
+            html.Div([
+            html.P("What are the gender-based distributions across different work classes?", 
+                   style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
+        ], className='container', style={'margin-bottom': '20px'}),
+              html.Div([
+            # Visualization
+            html.Div([
+                lazy_graph('workclass-gender')
+            ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+
+            # Insights
+            html.Div([
+                html.Ul([
+                    html.Li("Most people work in the Private sector, with a significant number of males compared to females.", style={'color': '#54aeb1', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                    html.Li("Other work classes have relatively balanced gender distributions but much lower counts.", style={'color': '#54aeb1', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                ], className='flex-item')
+            ], style={'margin-left': '70'})  # Flex: 1 for insights
+        ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
         html.Div([
-        html.P("How do work hours differ across various workclass?", 
-               style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
-    ], className='container', style={'margin-bottom': '20px'}),
+            html.P("Count of Individuals by Work Class, Sex, and Income", 
+                   style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
+        ], className='container', style={'margin-bottom': '20px'}),
         html.Div([
-            dcc.Graph(figure=workclass_workhour_tree()),
+            # Visualization
+            html.Div([
+                lazy_graph('workclass-sex-income')
+            ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+
+            # Insights
             html.Div([
                 html.Ul([
+                    html.Li([
+                    html.Span("Female (<=50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
+                    ": The majority of women earning ≤50K are in the Private sector, with 5010 individuals. Other work classes like Local-gov, Self-employed, and State-gov have significantly fewer women."
+                ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
                 html.Li([
-                html.Span("<=50k", style={'color': '#f1948a '}),  
-                ":The largest segment in this category is for individuals in the Private sector, indicating they work the most hours but earn ≤50K. The Self-employed and Local-gov also occupy smaller portions."
-            ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-            html.Li([
-                html.Span(">50k", style={'color': '#f1948a'}), 
-                ":For individuals earning >50K, the Private sector remains the largest, though other work classes like Self-employed and Local-gov also have a presence."
-            ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                    html.Span("Female (>50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
+                    ":For women earning >50K, the highest count is again in the Private sector (623), followed by Self-employed (145)."
+                ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                 html.Li([
+                    html.Span("Male (<=50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
+                    ":Men in the ≤50K category are also predominantly in the Private sector (7592), followed by Self-employed and Local-gov."
+                ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.Li([
+                    html.Span("Male (>50K)", style={'color': '#C70039 '}),  # Highlighting "Female (≤50K)" in blue
+                    ":In the >50K category, men are mainly in the Private sector (3470), with significant counts in Self-employed,State-gov and Local-gov."
+                ], style={'color': '#BD7F37FF', 'font-size': '1.15rem', 'font-weight': 'bold'}),
                 ], className='flex-item')
-            ])
-        ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '30px'}),
+            ], style={'margin-left': '70'})  # Flex: 1 for insights
+        ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
+        html.Div([
+            html.P("Proportion of Individuals Earning > $50K by Race and Gender", 
+                   style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
+        ], className='container', style={'margin-bottom': '20px'}),
         html.Div([
-        html.P("How do work hours differ across various oocupation?", 
-               style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
-    ], className='container', style={'margin-bottom': '20px'}),
-    html.Div([
-            dcc.Graph(figure=sunburst()),
+            # Visualization
+            html.Div([
+                lazy_graph('income-proportion')
+            ], style={'flex': '3'}),  # Flex: 3 for visualization, with margin-right for spacing
+
+            # Insights
             html.Div([
                 html.Ul([
-                    html.Li("Individuals earning <=50K tend to be in Prof-specialty , Craft repair,Adm-clerical,and Sales roles, working longer hours.", style={'color': '#cc6666', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-                    html.Li("The largest segment of >50K income earners work in various occupations with smaller average work hours.", style={'color': '#cc6666', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                    html.Li([
+                    html.Span("Female", style={'color': '#f1948a '}),  # Highlighting "Female (≤50K)" in blue
+                    ":Among females, the largest proportion of those earning >50K is  Amer-Indian-Eskimo (26.3%), followed by White(24.3%) and Asian-Pac-Islander (23.5%)."
+                ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.Li([
+                    html.Span("Male", style={'color': '#f1948a'}),  # Highlighting "Female (≤50K)" in blue
+                    ":Among males, Asian-Pac-Islander constitute the largest proportion (32%), followed by White (29.6%) and Black (17%)."
+                ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
                 ], className='flex-item')
-            ])
-        ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '30px'})
+            ], style={'margin-left': '70'})  # Flex: 1 for insights
+        ], style={'display': 'flex', 'justify-content': 'space-between', 'align-items': 'flex-start','margin-bottom': '30px'}),
+
     ], className='container'),
 
+        html.Div([
+            html.Div([
+                html.H2("Variation in Work Hours Across Occupations and Work Classes", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            html.Div([
+            html.P("How do work hours differ across various workclass?", 
+                   style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
+        ], className='container', style={'margin-bottom': '20px'}),
+            html.Div([
+                lazy_graph('workclass-hours'),
+                html.Div([
+                    html.Ul([
+                    html.Li([
+                    html.Span("<=50k", style={'color': '#f1948a '}),  
+                    ":The largest segment in this category is for individuals in the Private sector, indicating they work the most hours but earn ≤50K. The Self-employed and Local-gov also occupy smaller portions."
+                ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                html.Li([
+                    html.Span(">50k", style={'color': '#f1948a'}), 
+                    ":For individuals earning >50K, the Private sector remains the largest, though other work classes like Self-employed and Local-gov also have a presence."
+                ], style={'color': '#616a6b', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                    ], className='flex-item')
+                ])
+            ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '30px'}),
+            html.Div([
+            html.P("How do work hours differ across various oocupation?", 
+                   style={'font-size': '1.25rem', 'font-weight': 'bold', 'margin-bottom': '20px', 'margin-top': '20px'})
+        ], className='container', style={'margin-bottom': '20px'}),
+        html.Div([
+                lazy_graph('occupation-hours'),
+                html.Div([
+                    html.Ul([
+                        html.Li("Individuals earning <=50K tend to be in Prof-specialty , Craft repair,Adm-clerical,and Sales roles, working longer hours.", style={'color': '#cc6666', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                        html.Li("The largest segment of >50K income earners work in various occupations with smaller average work hours.", style={'color': '#cc6666', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                    ], className='flex-item')
+                ])
+            ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '30px'})
+        ], className='container'),
+
     
-    html.Div([
         html.Div([
-            html.H2("Average Capital Gain by Work Class, Race, and Native Country", className='subheader', style={'color': '#1E4C6A'}),
-        ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            html.Div([
+                html.H2("Average Capital Gain by Work Class, Race, and Native Country", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+
+            html.Div([
+                lazy_graph('country-capital-gain'),
+                html.Div([
+                    html.Ul([
+                        html.Li("Self-employed individuals tend to have the highest average capital gains across the U.S. and other countries.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                        html.Li("Private, Federal-gov, Local-gov, and State-gov work classes generally show much lower average capital gains compared to the self-employed group.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'}),
+                        html.Li("The Other native country category shows a higher capital gain in the self-employed sector compared to the United States.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'})
+                    ], className='flex-item')
+                ])
+            ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '20px'})
+        ], className='container'),
 
         html.Div([
-            dcc.Graph(figure=multivariate2(df)),
             html.Div([
-                html.Ul([
-                    html.Li("Self-employed individuals tend to have the highest average capital gains across the U.S. and other countries.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-                    html.Li("Private, Federal-gov, Local-gov, and State-gov work classes generally show much lower average capital gains compared to the self-employed group.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'}),
-                    html.Li("The Other native country category shows a higher capital gain in the self-employed sector compared to the United States.", style={'color': '#534b4f', 'font-size': '1.15rem', 'font-weight': 'bold'})
-                ], className='flex-item')
-            ])
-        ], style={'display': 'flex', 'justify-content': 'space-between', 'margin-bottom': '20px'})
-    ], className='container'),
+                html.H2("Distribution of Occupation by Income and Work Class", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            html.Div([
+                html.Button("Previous work classes", id='occupation-prev', className='btn btn-sm btn-outline-secondary mr-2'),
+                html.Button("Next work classes", id='occupation-next', className='btn btn-sm btn-outline-secondary'),
+            ]),
+            dcc.Store(id='occupation-page', data=0),
+            dcc.Loading(dcc.Graph(id='occupation-graph')),
+        ], className='container', style={'margin-bottom': '30px'}),
+
+        html.Div([
+            html.Div([
+                html.H2("Hours Worked per Week and Capital Gain", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            dcc.RadioItems(
+                id='fit-by',
+                options=[
+                    {'label': 'One trend line ', 'value': 'all'},
+                    {'label': 'A trend line per income level ', 'value': 'income'},
+                    {'label': 'A trend line per work class', 'value': 'workclass'},
+                ],
+                value='all',
+                inline=True,
+                labelStyle={'margin-right': '20px'}
+            ),
+            dcc.Loading(dcc.Graph(id='hours-capital-graph')),
+        ], className='container', style={'margin-bottom': '30px'}),
+
+        html.Div([
+            html.Div([
+                html.H2("Drill Down", className='subheader', style={'color': '#1E4C6A'}),
+                html.P("Break any measure down by up to three columns; the cross-filter and the weighting toggle apply."),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            html.Div([
+                dcc.Dropdown(
+                    id='query-group-by',
+                    options=[{'label': label, 'value': dim} for dim, label in DRILL_DIMS.items()],
+                    value=['occupation', 'education', 'income'],
+                    multi=True,
+                    style={'width': '50%'}
+                ),
+                dcc.Dropdown(
+                    id='query-measure',
+                    options=[{'label': label, 'value': measure} for measure, label in DRILL_MEASURES.items()],
+                    value='hours.per.week',
+                    clearable=False,
+                    style={'width': '30%'}
+                ),
+            ], style={'display': 'flex', 'gap': '20px'}),
+            dcc.RadioItems(
+                id='query-agg',
+                options=[{'label': f'{label} ', 'value': agg} for agg, label in DRILL_AGGREGATIONS.items()],
+                value='count',
+                inline=True,
+                labelStyle={'margin-right': '20px'}
+            ),
+            dcc.Loading(dcc.Graph(id='query-graph')),
+        ], className='container', style={'margin-bottom': '30px'}),
 
-    html.Div([
         html.Div([
-        html.H1("Global Analysis of Average Capital Gain/Loss", className='subheader', style={'color': '#1E4C6A'}),
-        ], className='p-3 bg-custom rounded shadow-sm mb-4'),
-        dcc.Dropdown(
-            id='filter-dropdown',
-            options=[
-                {'label': 'Capital Gain', 'value': 'capital.gain'},
-                {'label': 'Capital Loss', 'value': 'capital.loss'}
-            ],
-            value='capital.gain',  # Default value
-            style={'width': '50%'}
-        ),
+            html.Div([
+            html.H1("Global Analysis of Average Capital Gain/Loss", className='subheader', style={'color': '#1E4C6A'}),
+            ], className='p-3 bg-custom rounded shadow-sm mb-4'),
+            dcc.Dropdown(
+                id='filter-dropdown',
+                options=[
+                    {'label': 'Capital Gain', 'value': 'capital.gain'},
+                    {'label': 'Capital Loss', 'value': 'capital.loss'}
+                ],
+                value='capital.gain',  # Default value
+                style={'width': '50%'}
+            ),
 
-        dcc.Graph(id='map-graph')
-    ], className='container')
+            dcc.Graph(id='map-graph')
+        ], className='container')
 
-])  # Set background color and text color
+    ])  # Set background color and text color
 
 
 
@@ -569,16 +718,19 @@ app.layout = html.Div([
 #Updated Callback Functions
 #Update the callback to handle the combined analyses:
 
-@app.callback(
+@callback(
     [Output('question-output', 'children'),
      Output('graph-output', 'figure'),
      Output('insights-output', 'children')],
-    [Input('analysis-options', 'value')]
+    [Input('analysis-options', 'value'),
+     Input('crossfilter-selection', 'data'),
+     Input('weighting', 'value')]
 )
-def update_main_analysis(selected_option):
+@metrics.instrument
+def update_main_analysis(selected_option, selection, weighting):
     if selected_option == 'hours_worked':
         question = "How does income vary across different work hours?"
-        fig = hours_worked_plot()  # Ensure this function returns a Plotly figure
+        fig = filtered_figure('analysis', 'hours_worked', selection, weighting)
         insights = html.Ul([
             html.Li("The median hours worked per week for both income groups is 40 hours.", style={'color': '#86608e'}),
             html.Li("People earning greater than 50K tend to work slightly more hours per week compared to those earning less than or equal to 50K.", style={'color': '#86608e'}),
@@ -587,7 +739,7 @@ def update_main_analysis(selected_option):
 
     elif selected_option == 'age_distribution':
         question = "How does income vary across different age groups?"
-        fig = age_distribution_plot()  # Ensure this function returns a Plotly figure
+        fig = filtered_figure('analysis', 'age_distribution', selection, weighting)
         insights = html.Ul([
             html.Li("The distribution of age for people earning less than or equal to 50K is wider compared to those earning greater than 50K.", style={'color': '#86608e'}),
             html.Li("There are more younger individuals (20-40 years) in the less than or equal to 50K group.", style={'color': '#86608e'}),
@@ -596,7 +748,7 @@ def update_main_analysis(selected_option):
 
     elif selected_option == 'marital_status':
         question = "Are there significant differences in income between married individuals and those who are divorced, widowed, or never married?"
-        fig = marital_status_plot()  # Ensure this function returns a Plotly figure
+        fig = filtered_figure('analysis', 'marital_status', selection, weighting)
         insights = html.Ul([
             html.Li("Individuals who have never married or are divorced show a higher count of individuals earning less than or equal to 50K.", style={'color': '#5f9ea0'}),
             html.Li("Married individuals show a higher count of individuals earning greater than 50K.", style={'color': '#5f9ea0'}),
@@ -605,7 +757,7 @@ def update_main_analysis(selected_option):
 
     elif selected_option == 'racial_group':
         question = "What is the distribution of income by racial group?"
-        fig = racial_status_stacked_plot()  # Ensure this function returns a Plotly figure
+        fig = filtered_figure('analysis', 'racial_group', selection, weighting)
         insights = html.Ul([
             html.Li("Most of the individuals in the dataset are White, with a higher count earning less than or equal to 50K.", style={'color': '#26619c'}),
             html.Li("Other races, such as Black and Asian-Pac-Islander, also have significant counts but with fewer individuals earning greater than 50K.", style={'color': '#26619c'}),
@@ -614,7 +766,7 @@ def update_main_analysis(selected_option):
 
     elif selected_option == 'education_level':
         question = "Is there a significant difference in income based on the highest level of education completed?"
-        fig = education_level_plot()  # Ensure this function returns a Plotly figure
+        fig = filtered_figure('analysis', 'education_level', selection, weighting)
         insights = html.Ul([
             html.Li("Most individuals have education levels around high school graduation (HS-grad).", style={'color': '#739073'}),
             html.Li("Higher education levels like Bachelors, Masters, and Doctorate show a higher proportion of individuals earning greater than 50K.", style={'color': '#739073'}),
@@ -627,25 +779,212 @@ def update_main_analysis(selected_option):
 
 
 # Callback to update the map based on the selected filter
-@app.callback(
+@callback(
     Output('map-graph', 'figure'),
     Input('filter-dropdown', 'value'),
-   
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
 )
-def update_map(selected_filter):
-    df_avg = df.groupby('native.country')[selected_filter].mean().reset_index()
-    
-    fig = px.choropleth(
-        df_avg,
-        locations='native.country',
-        locationmode='country names',
-        color=selected_filter,
-        hover_name="native.country",
-        color_continuous_scale=px.colors.sequential.Plasma,
-        title=f'Average {selected_filter.replace(".", " ").title()} by Country'
-    )
-    return fig
+@metrics.instrument
+def update_map(selected_filter, selection, weighting):
+    return filtered_figure('maps', selected_filter, selection, weighting)
+
+@callback(
+    Output('occupation-page', 'data'),
+    Input('occupation-prev', 'n_clicks'),
+    Input('occupation-next', 'n_clicks'),
+    State('occupation-page', 'data'),
+    prevent_initial_call=True
+)
+@metrics.instrument
+def turn_occupation_page(prev_clicks, next_clicks, page):
+    step = -1 if dash.ctx.triggered_id == 'occupation-prev' else 1
+    return occupation_page(occupation_page(page) + step)
+
+def occupation_page(page):
+    # The page a client sent, clamped to the pages there are
+    if not isinstance(page, int):
+        return 0
+    state = dashboard()
+    return min(max(page, 0), len(state.figure_names(state.caches['occupation'])) - 1)
+
+@callback(
+    Output('occupation-graph', 'figure'),
+    Input('occupation-page', 'data'),
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
+)
+@metrics.instrument
+def update_occupation(page, selection, weighting):
+    return filtered_figure('occupation', occupation_page(page), selection, weighting)
+
+@callback(
+    Output('hours-capital-graph', 'figure'),
+    Input('fit-by', 'value'),
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
+)
+@metrics.instrument
+def update_hours_capital(fit_by, selection, weighting):
+    return filtered_figure('scatter', fit_by, selection, weighting)
+
+@callback(
+    Output('query-graph', 'figure'),
+    Input('query-group-by', 'value'),
+    Input('query-measure', 'value'),
+    Input('query-agg', 'value'),
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
+)
+@metrics.instrument
+def update_query(group_by, measure, agg, selection, weighting):
+    from crossfilter import normalize
+    from payload import figure_json
+    from query import QueryError
+    figures = load_figures()
+    try:
+        result, _ = dashboard().query_cache().get(dashboard().data(), {
+            'group_by': (group_by or [])[:3], 'agg': agg, 'measure': measure,
+            'filters': normalize(selection), 'weighted': weighting == 'weighted'})
+    except QueryError as e:
+        return figures.no_data_figure(str(e))
+    return figure_json(figures.query_figure(result, DRILL_DIMS, DRILL_MEASURES))
+
+@callback(
+    Output({'type': 'lazy-graph', 'name': MATCH}, 'figure'),
+    Input({'type': 'lazy-visible', 'name': MATCH}, 'data'),
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
+    prevent_initial_call=True
+)
+@metrics.instrument
+def load_section(visible, selection, weighting):
+    if not visible:
+        # not scrolled into view yet; it reads the selection once it is
+        return dash.no_update
+    return filtered_figure('sections', dash.ctx.outputs_list['id']['name'], selection, weighting)
+
+@callback(
+    Output('crossfilter-selection', 'data'),
+    Input('graph-output', 'clickData'),
+    Input({'type': 'lazy-graph', 'name': ALL}, 'clickData'),
+    Input('crossfilter-clear', 'n_clicks'),
+    State('analysis-options', 'value'),
+    State('crossfilter-selection', 'data'),
+    prevent_initial_call=True
+)
+@metrics.instrument
+def update_selection(main_click, section_clicks, clear, selected_option, selection):
+    from crossfilter import toggle
+    trigger = dash.ctx.triggered_id
+    if trigger == 'crossfilter-clear':
+        return {}
+    if trigger == 'graph-output':
+        clicked = clicked_values(selected_option, main_click)
+    else:
+        clicked = clicked_values(trigger['name'], dash.ctx.triggered[0]['value'])
+    if not clicked:
+        return dash.no_update
+    return toggle(selection, clicked)
+
+@callback(
+    Output('crossfilter-status', 'children'),
+    Input('crossfilter-selection', 'data'),
+    Input('weighting', 'value'),
+)
+@metrics.instrument
+def show_selection(selection, weighting):
+    return selection_status(dashboard(), selection, weighting)
+
+def selection_status(state, selection, weighting):
+    # The line saying what the cross-filter selects, for the app `state` serves
+    if not selection and state.bundle is not None:
+        return state.bundle.status[weighting or 'rows']
+    data = state.data()
+    data = data.weighted if weighting == 'weighted' else data
+    # fnlwgt is a sampling weight, not a head count, so its sum is reported as such
+    total = f" (weighted total {data.cube.counts.sum():,.0f})" if data.weight else ""
+    if data.df is None:
+        return (f"Serving a pre-aggregated summary of {data.n_rows:,} rows{total}; "
+                f"cross-filtering needs the row-level data.")
+    from crossfilter import view_for
+    view = view_for(data, selection)
+    if view is data:  # nothing selected, or only columns that cannot be filtered on
+        return f"No filter: all {data.n_rows:,} rows{total}."
+    if data.weight:
+        total = f" (weighted total {view.cube.counts.sum():,.0f} of {data.cube.counts.sum():,.0f})"
+    terms = [f"{dim} = {' or '.join(values)}" for dim, values in view.selection.items()]
+    return f"Filtered to {' and '.join(terms)}: {view.n_rows:,} of {data.n_rows:,} rows{total}."
+
+def layout_payload_report():
+    # Bytes of the initial layout, and of the section figures it no longer embeds
+    import plotly.io as pio
+    sections = dashboard().caches['sections']
+    data = dashboard().data()
+    layout_bytes = len(pio.to_json(serve_layout()))
+    with dataset.viewing(data):
+        deferred_bytes = sum(len(pio.to_json(sections.get(name, data.version, data.variant)))
+                             for name in sections.builders)
+    return {'initial_layout': layout_bytes, 'deferred_figures': deferred_bytes,
+            'eager_layout': layout_bytes + deferred_bytes}
+
+def create_app(config=None):
+    # A Dash app serving the dashboard; `config` overrides DEFAULT_CONFIG.
+    # What it serves from is kept on the app (see Dashboard).
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    state = Dashboard(config)
+
+    app = Dash(__name__, suppress_callback_exceptions=True, external_stylesheets=[{'href': 'https://stackpath.bootstrapcdn.com/bootstrap/4.5.2/css/bootstrap.min.css',
+        'rel': 'stylesheet',
+        'async': True }])
+    app.layout = serve_layout
+    app.server.config['DASHBOARD'] = state
+    for args, kwargs, func in CALLBACKS:
+        app.callback(*args, **kwargs)(func)
+    metrics.install(app.server, state.caches, config['profile_slowest'], config['profile_dir'])
+    if config['compress']:
+        # after metrics, so Flask runs it first and the metrics count the bytes sent
+        import payload
+        payload.install(app.server)
+    if config['refresh_interval']:
+        @app.server.before_request
+        def start_refresh_watcher():
+            # here rather than now, so each gunicorn worker starts its own
+            state.watch_for_refreshes()
+    if config['admin_token']:
+        expected = f"Bearer {config['admin_token']}".encode()
+
+        @app.server.route('/admin/refresh', methods=['POST'])
+        def admin_refresh():
+            from flask import abort, jsonify, request
+            if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected):
+                abort(403)
+            done = state.refresh_data()
+            data = dataset.loaded(config['data_path'])[1]
+            return jsonify(result=done, version=data and data.version, rows=data and data.n_rows)
+
+    @app.server.route('/api/query', methods=['POST'])
+    def api_query():
+        # A query.py query as the JSON body; its result, or 400 and why not
+        from flask import jsonify, request
+        from query import QueryError
+        try:
+            result, cached = state.query_cache().get(state.data(), request.get_json(silent=True))
+        except QueryError as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(dict(result, cached=cached))
+    if config['warm_caches']:
+        state.warm_caches()
+    return app
+
 
 # Run the app
 if __name__ == '__main__':
+    logging.basicConfig(level=os.environ.get('DASHBOARD_LOG_LEVEL', 'INFO'))
+    app = create_app()
+    dashboard(app).warm_caches()
+    with app.server.app_context():
+        report = layout_payload_report()
+    print(f"initial layout: {report['initial_layout']:,} bytes "
+          f"(was {report['eager_layout']:,} with the section figures embedded)")
     app.run(debug=True)  # runs on http://127.0.0.1:8050
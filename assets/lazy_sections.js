@@ -0,0 +1,37 @@
+// Lazy dashboard sections: when a .lazy-section scrolls into view, flag its
+// dcc.Store so the server sends the figure.  Each section is requested once.
+(function () {
+    function reveal(el) {
+        window.dash_clientside.set_props(
+            {type: 'lazy-visible', name: el.getAttribute('data-section')},
+            {data: true}
+        );
+    }
+
+    var observer = null;
+    if ('IntersectionObserver' in window) {
+        observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    reveal(entry.target);
+                }
+            });
+        }, {rootMargin: '200px'});  // start fetching just before it is on screen
+    }
+
+    // Sections are rendered by React after this script runs, so pick them up
+    // as they appear in the DOM
+    function watch() {
+        document.querySelectorAll('.lazy-section:not([data-watched])').forEach(function (el) {
+            el.setAttribute('data-watched', 'true');
+            if (observer) {
+                observer.observe(el);
+            } else {
+                reveal(el);
+            }
+        });
+    }
+
+    new MutationObserver(watch).observe(document.documentElement, {childList: true, subtree: true});
+})();
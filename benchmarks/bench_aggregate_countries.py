@@ -0,0 +1,68 @@
+# aggregate_countries: the old copy + per-row lambda vs the category-level fold.
+#
+#   python benchmarks/bench_aggregate_countries.py [--scale 100] [--repeat 5]
+#
+# Runs on the shipped CSV and on a synthetic upscale made by stacking it
+# `scale` times (category cardinalities stay the same, counts grow).
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aggregation import fold_rare  # noqa: E402
+
+
+def legacy_aggregate_countries(df, threshold=1000):
+    df_copy = df.copy()
+    country_counts = df_copy['native.country'].value_counts()
+    countries_to_keep = country_counts[country_counts >= threshold].index
+    df_copy['native.country'] = df_copy['native.country'].apply(lambda x: x if x in countries_to_keep else 'Other')
+    return df_copy
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, result
+
+
+def run(label, df, threshold, repeat):
+    legacy_ms, legacy = best_of(lambda: legacy_aggregate_countries(df, threshold), repeat)
+    fold_ms, folded = best_of(lambda: fold_rare(df['native.country'], threshold), repeat)
+    assert (legacy['native.country'].to_numpy() == folded.astype(object).to_numpy()).all()
+
+    memo = {threshold: folded}
+    memo_ms, _ = best_of(lambda: memo[threshold], repeat)
+    print(f"{label:<22}{len(df):>11,}{legacy_ms:>12.2f}{fold_ms:>12.2f}"
+          f"{legacy_ms / fold_ms:>10.1f}x{memo_ms * 1000:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'refined_adult.csv'))
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--threshold', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.csv)
+    big = pd.concat([df] * args.scale, ignore_index=True)
+    print(f"{'dataset':<22}{'rows':>11}{'legacy ms':>12}{'fold ms':>12}{'speedup':>11}{'memo us':>12}")
+    run('csv (object)', df, args.threshold, args.repeat)
+    run('csv (category)', df.astype({'native.country': 'category'}), args.threshold, args.repeat)
+    # the threshold scales with the data so the same countries survive
+    run(f'{args.scale}x (object)', big, args.threshold * args.scale, args.repeat)
+    run(f'{args.scale}x (category)', big.astype({'native.country': 'category'}),
+        args.threshold * args.scale, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
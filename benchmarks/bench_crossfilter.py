@@ -0,0 +1,88 @@
+# Cross-filtering on a synthetic dataset: how long one click takes to resolve.
+#
+#   python benchmarks/bench_crossfilter.py [--rows 10000000] [--repeat 5]
+#
+# The synthetic rows are drawn with replacement from the shipped CSV, so the
+# categories and their mix match the real data.  A cross-filter step is what
+# the dashboard does before drawing anything: resolve the selection to a
+# bitset, count it, and produce the count-chart aggregates for the new view.
+# Plotly figure building is left out; it does not depend on the row count.
+# Selections on two or more columns outside the cube (say native.country and
+# relationship) are resolved through the selected rows and are not timed here.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crossfilter  # noqa: E402
+from crossfilter import INDEX_DIMS, View  # noqa: E402
+from dataset import Dataset  # noqa: E402
+
+TARGET_MS = 20
+
+# A click sequence: each entry adds to (or replaces) the previous selection
+SELECTIONS = [
+    {'marital.status': ['Divorced']},
+    {'marital.status': ['Divorced'], 'income': ['>50K']},
+    {'marital.status': ['Divorced'], 'income': ['>50K'], 'occupation': ['Sales']},
+    {'marital.status': ['Divorced', 'Never-married'], 'income': ['>50K']},
+    {'income': ['<=50K'], 'occupation': ['Craft-repair', 'Sales']},
+    {'native.country': ['Mexico']},
+    {'native.country': ['United-States'], 'race': ['White'], 'sex': ['Male']},
+    {'relationship': ['Husband', 'Wife'], 'income': ['>50K']},
+]
+COUNT_CHARTS = [['marital.status', 'income'], ['race', 'income'], ['workclass', 'sex'],
+                ['education', 'income'], ['workclass', 'sex', 'income'], ['race', 'sex', 'income']]
+
+
+def cross_filter(data, selection):
+    view = View(data, crossfilter.normalize(selection))
+    for dims in COUNT_CHARTS:
+        view.cube.size(dims)
+    return view.n_rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'refined_adult.csv'))
+    parser.add_argument('--rows', type=int, default=10_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    base = pd.read_csv(args.csv).astype({dim: 'category' for dim in INDEX_DIMS})
+    rng = np.random.default_rng(0)
+    df = base.take(rng.integers(0, len(base), args.rows)).reset_index(drop=True)
+    data = Dataset(df, 'bench')
+
+    start = time.perf_counter()
+    data.cube, data.bitmaps
+    for dim in {dim for selection in SELECTIONS for dim in selection} - set(data.cube.dims):
+        data.cube_with(dim)
+    build_s = time.perf_counter() - start
+    index_mb = sum(b.nbytes for b in data.bitmaps.bitsets.values()) / 1e6
+    print(f"{len(df):,} rows; cubes + bitmap index built once in {build_s:.2f} s "
+          f"({index_mb:.0f} MB of bitsets)")
+
+    print(f"{'selection':<86}{'rows':>11}{'ms':>8}")
+    worst = 0
+    for selection in SELECTIONS:
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            n_rows = cross_filter(data, selection)
+            times.append((time.perf_counter() - start) * 1000)
+        worst = max(worst, min(times))
+        label = ' & '.join(f"{dim}={'|'.join(values)}" for dim, values in selection.items())
+        print(f"{label:<86}{n_rows:>11,}{min(times):>8.2f}")
+    print(f"slowest cross-filter {worst:.2f} ms (target {TARGET_MS} ms): "
+          f"{'ok' if worst < TARGET_MS else 'over target'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Load time and memory of the CSV path vs the columnar store.
+#
+#   python data_store.py                      # build refined_adult.store first
+#   python benchmarks/bench_data_store.py [--repeat N]
+#
+# Each path is measured in a fresh interpreter so import caches and the
+# allocator state of one run do not flatter the other.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, resource, sys, time, tracemalloc
+import numpy as np, pandas as pd
+import data_store
+
+path, csv_path, repeat = sys.argv[1], sys.argv[2], int(sys.argv[3])
+rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+times = []
+for i in range(repeat):
+    if i == 0:
+        tracemalloc.start()
+    start = time.perf_counter()
+    if path == 'csv':
+        df = pd.read_csv(csv_path)
+    else:
+        store = data_store.store_path_for(csv_path)
+        df = data_store.load_store(store, data_store.read_manifest(store))
+    times.append(time.perf_counter() - start)
+    if i == 0:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+print(json.dumps({
+    'load_ms_median': 1000 * float(np.median(times)),
+    'load_ms_first': 1000 * times[0],
+    'frame_bytes_deep': int(df.memory_usage(deep=True).sum()),
+    'alloc_peak_bytes': peak,
+    'max_rss_growth_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before,
+}))
+'''
+
+
+def measure(path, csv_path, repeat):
+    out = subprocess.run([sys.executable, '-c', PROBE, path, csv_path, str(repeat)],
+                         cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default='refined_adult.csv')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    import data_store
+    csv_path = os.path.join(ROOT, args.csv)
+    if data_store.read_manifest(data_store.store_path_for(csv_path)) is None:
+        sys.exit('no store found, run `python data_store.py` first')
+
+    results = {path: measure(path, csv_path, args.repeat) for path in ('csv', 'store')}
+    print(f"{'':8}{'load ms':>10}{'frame MB':>10}{'alloc MB':>10}{'rss +MB':>10}")
+    for path, r in results.items():
+        print(f"{path:8}{r['load_ms_median']:>10.1f}{r['frame_bytes_deep'] / 2**20:>10.2f}"
+              f"{r['alloc_peak_bytes'] / 2**20:>10.2f}{r['max_rss_growth_kb'] / 1024:>10.2f}")
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, ROOT)
+    main()
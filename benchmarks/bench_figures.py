@@ -0,0 +1,217 @@
+# Every figure function timed on census-shaped data at several sizes.
+#
+#   python benchmarks/bench_figures.py [--scale 1 10 100 1000] [--repeat 3] [--save figures.json]
+#   python benchmarks/bench_figures.py --compare figures.json [--tolerance 0.25]
+#
+# Scale N is N times the rows of the shipped CSV: the CSV itself, then rows
+# drawn from it with replacement, so every category keeps its cardinality
+# and roughly its mix.  Columns are typed the way the columnar store holds
+# them.  Each scale runs in a fresh interpreter, so its peak RSS is its own;
+# a scale that fails (out of memory at 1000x, say) is reported and skipped.
+#
+# Per figure the report has the best build time over --repeat runs, the
+# time and size of its JSON, and the peak memory allocated while building
+# it.  Every figure is first drawn once from a small slice, so plotly's
+# one-off start-up costs are not counted.  The cube and the bitmap index
+# every count chart shares are built first and timed as `setup`; memos of
+# other aggregates are cleared before every run.  `update_map` is the
+# choropleth the map callback builds.
+#
+# With --compare the run is checked against a saved report and the script
+# exits non-zero when a figure got slower, bigger or hungrier by more than
+# --tolerance.
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# report name -> (figures function, its arguments)
+FIGURES = {
+    'age_distribution_plot': ('age_distribution_plot', ()),
+    'hours_worked_plot': ('hours_worked_plot', ()),
+    'marital_status_plot': ('marital_status_plot', ()),
+    'racial_status_stacked_plot': ('racial_status_stacked_plot', ()),
+    'education_level_plot': ('education_level_plot', ()),
+    'sunburst': ('sunburst', ()),
+    'multivariate2': ('multivariate2', ()),
+    'proportion_count': ('proportion_count', ()),
+    'update_map': ('country_capital_map', ('capital.gain',)),
+    'workclass_gender_distribution': ('workclass_gender_distribution', ()),
+    'count_income_workclass_sex_income': ('count_income_workclass_sex_income', ()),
+    'workclass_workhour_tree': ('workclass_workhour_tree', ()),
+    'multivariate1': ('multivariate1', (0,)),
+    'hour_captial_gain_plot': ('hour_captial_gain_plot', ()),
+}
+# (report key, what a rise in it is)
+CHECKED = [('seconds', 'build time'), ('json_bytes', 'figure size'), ('peak_alloc_mb', 'peak memory')]
+NOISE_S = 0.002  # time differences below this are jitter, not regressions
+
+
+def synthesize(csv_path, scale, seed=0):
+    # The CSV typed like the columnar store, followed by (scale - 1) times
+    # its rows drawn with replacement
+    import numpy as np
+    from data_store import ingest, load_store
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, 'bench.store')
+        base = load_store(store, ingest(csv_path, store), mmap=False)
+    n = len(base)
+    rows = np.concatenate([np.arange(n), np.random.default_rng(seed).integers(0, n, n * (scale - 1))])
+    return base.take(rows).reset_index(drop=True)
+
+
+def reset_memos():
+    import aggregation
+    aggregation._folded = (None, {})
+    aggregation._summaries = (None, {})
+
+
+def run_scale(csv_path, scale, repeat, weighted):
+    # One scale, in this interpreter: the per-figure numbers as a dict
+    import dataset
+    import figures
+    from summary import peak_rss_mb
+
+    start = time.perf_counter()
+    df = synthesize(csv_path, scale)
+    data = dataset.Dataset(df, f'bench-x{scale}')
+    if weighted:
+        data = data.weighted
+    synth_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data.cube, data.bitmaps
+    result = {'rows': len(df), 'synthesize_s': synth_s, 'setup_s': time.perf_counter() - start,
+              'figures': {}}
+
+    # plotly's lazy imports and first-use setup, so no figure pays for them
+    warm_up = dataset.Dataset(df.head(1000), 'warm-up')
+    with dataset.viewing(warm_up.weighted if weighted else warm_up):
+        for function, args in FIGURES.values():
+            getattr(figures, function)(*args).to_json()
+
+    with dataset.viewing(data):
+        for name, (function, args) in FIGURES.items():
+            build = getattr(figures, function)
+            times = []
+            for _ in range(repeat):
+                reset_memos()
+                start = time.perf_counter()
+                fig = build(*args)
+                times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            raw = fig.to_json()
+            json_s = time.perf_counter() - start
+
+            reset_memos()
+            tracemalloc.start()
+            build(*args)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            result['figures'][name] = {'seconds': min(times), 'json_seconds': json_s,
+                                       'json_bytes': len(raw), 'peak_alloc_mb': peak / 2**20}
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+
+def measure(csv_path, scale, repeat, weighted):
+    # run_scale in a fresh interpreter
+    cmd = [sys.executable, os.path.abspath(__file__), '--worker', str(scale), '--csv', csv_path,
+           '--repeat', str(repeat)] + (['--weighted'] if weighted else [])
+    out = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        reason = out.stderr.strip().splitlines()[-1:] or [f'exit status {out.returncode}']
+        return {'error': reason[0]}
+    return json.loads(out.stdout)
+
+
+def describe():
+    # What the numbers were measured on
+    import numpy
+    import pandas
+    import plotly
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(), 'machine': platform.machine(),
+            'numpy': numpy.__version__, 'pandas': pandas.__version__, 'plotly': plotly.__version__}
+
+
+def print_scale(scale, result):
+    if 'error' in result:
+        print(f"x{scale}: failed ({result['error']})")
+        return
+    print(f"x{scale}: {result['rows']:,} rows, setup {result['setup_s']:.2f} s, "
+          f"peak RSS {result['peak_rss_mb']:.0f} MB")
+    print(f"  {'figure':<36}{'build ms':>10}{'json ms':>9}{'KB':>9}{'peak MB':>9}")
+    for name, r in result['figures'].items():
+        print(f"  {name:<36}{r['seconds'] * 1000:>10.1f}{r['json_seconds'] * 1000:>9.1f}"
+              f"{r['json_bytes'] / 1024:>9.1f}{r['peak_alloc_mb']:>9.1f}")
+
+
+def regressions(report, baseline, tolerance):
+    # (scale, figure, what, old, new) for every figure worse than baseline
+    found = []
+    for scale, result in report['scales'].items():
+        old = baseline.get('scales', {}).get(scale, {})
+        for name, r in result.get('figures', {}).items():
+            before = old.get('figures', {}).get(name)
+            if before is None:
+                continue
+            for key, what in CHECKED:
+                slack = NOISE_S if key == 'seconds' else 0
+                if r[key] > before[key] * (1 + tolerance) + slack:
+                    found.append((scale, name, what, before[key], r[key]))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'refined_adult.csv'))
+    parser.add_argument('--scale', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--weighted', action='store_true', help='draw the fnlwgt-weighted figures')
+    parser.add_argument('--save')
+    parser.add_argument('--compare')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed growth before flagging, as a fraction')
+    parser.add_argument('--worker', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scale(args.csv, args.worker, args.repeat, args.weighted)))
+        return
+
+    report = {'meta': dict(describe(), repeat=args.repeat, weighted=args.weighted), 'scales': {}}
+    for scale in args.scale:
+        result = report['scales'][str(scale)] = measure(args.csv, scale, args.repeat, args.weighted)
+        print_scale(scale, result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('date')})")
+        found = regressions(report, baseline, args.tolerance)
+        for scale, name, what, before, after in found:
+            print(f"REGRESSION x{scale} {name} {what}: {before:.4g} -> {after:.4g}")
+        sys.exit(1 if found else 0)
+
+
+if __name__ == '__main__':
+    main()
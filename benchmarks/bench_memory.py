@@ -0,0 +1,43 @@
+# Memory of the dataset as pandas reads the CSV and as the app holds it.
+#
+#   python benchmarks/bench_memory.py [--csv refined_adult.csv]
+#
+# "before" is pd.read_csv as is (text as Python strings, 64-bit integers);
+# "after" is data_store.read_csv, the typed frame the app falls back to when
+# the columnar store is missing (the store holds the same columns).  Sizes are
+# memory_usage(deep=True).  tests/test_typed_csv.py checks that every figure
+# comes out the same from either.
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def column_report(before, after):
+    # (column, dtype before, bytes before, dtype after, bytes after)
+    old, new = before.memory_usage(deep=True, index=False), after.memory_usage(deep=True, index=False)
+    return [(name, str(before[name].dtype), int(old[name]), str(after[name].dtype), int(new[name]))
+            for name in before.columns]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'refined_adult.csv'))
+    args = parser.parse_args()
+
+    import pandas as pd
+    from data_store import read_csv
+
+    before, after = pd.read_csv(args.csv), read_csv(args.csv)
+    rows = column_report(before, after)
+    print(f"{'column':<16}{'before':>10}{'KB':>10}{'after':>12}{'KB':>10}")
+    for name, old_dtype, old, new_dtype, new in rows:
+        print(f"{name:<16}{old_dtype:>10}{old / 1024:>10.1f}{new_dtype:>12}{new / 1024:>10.1f}")
+    old, new = sum(r[2] for r in rows), sum(r[4] for r in rows)
+    print(f"{'total':<16}{'':>10}{old / 1024:>10.1f}{'':>12}{new / 1024:>10.1f}  ({new / old:.1%})")
+
+
+if __name__ == '__main__':
+    main()
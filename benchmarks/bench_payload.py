@@ -0,0 +1,62 @@
+# Bytes of every dashboard figure as plotly writes it and as the app sends it.
+#
+#   python benchmarks/bench_payload.py [--weighted] [--save payload.json]
+#
+# Per figure: plotly's JSON, the compact JSON of payload.figure_json, and both
+# gzipped -- plus brotli, when the brotli package is installed -- at the
+# levels the app compresses responses with.
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measure(weighting):
+    # figure label -> {column: bytes}
+    import app
+    import dataset
+    import payload
+
+    encodings = payload.encodings()
+    sizes = {}
+    state = app.dashboard()
+    data = state.data()
+    with dataset.viewing(data.weighted if weighting == 'weighted' else data):
+        for section, cache in state.caches.items():
+            for name in state.figure_names(cache):
+                fig = cache.builders[name]()
+                before = fig.to_json().encode()
+                after = json.dumps(payload.figure_json(fig), separators=(',', ':')).encode()
+                row = {'plotly': len(before), 'compact': len(after)}
+                for encoding in reversed(encodings):
+                    row[f'plotly+{encoding}'] = len(payload.compress(before, encoding))
+                    row[f'compact+{encoding}'] = len(payload.compress(after, encoding))
+                sizes[f'{section}/{name}'] = row
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weighted', action='store_true', help='the fnlwgt-weighted figures')
+    parser.add_argument('--save')
+    args = parser.parse_args()
+
+    sizes = measure('weighted' if args.weighted else 'rows')
+    columns = list(next(iter(sizes.values())))
+    total = {column: sum(row[column] for row in sizes.values()) for column in columns}
+    print(f"{'figure (KB)':<34}" + ''.join(f'{column:>15}' for column in columns))
+    for name, row in list(sizes.items()) + [('total', total)]:
+        print(f'{name:<34}' + ''.join(f'{row[column] / 1024:>15.1f}' for column in columns))
+    print(f"compact JSON is {total['compact'] / total['plotly']:.0%} of plotly's, "
+          f"{total['compact+gzip'] / total['plotly']:.0%} gzipped")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(sizes, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
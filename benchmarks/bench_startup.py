@@ -0,0 +1,100 @@
+# Cold-start benchmark: how long a fresh worker takes to import the app and to
+# answer its first requests.
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--save startup.json]
+#   python benchmarks/bench_startup.py --compare startup.json [--tolerance 0.25]
+#
+# Each run is a fresh interpreter.  With --compare the medians are checked
+# against a saved report and the script exits non-zero on a regression.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+
+client = app.create_app().server.test_client()
+for path in ('/', '/_dash-layout'):
+    if client.get(path).status_code != 200:
+        raise SystemExit(f'GET {path} failed')
+page = time.perf_counter()
+
+response = client.post('/_dash-update-component', json={
+    'output': '..question-output.children...graph-output.figure...insights-output.children..',
+    'outputs': [{'id': 'question-output', 'property': 'children'},
+                {'id': 'graph-output', 'property': 'figure'},
+                {'id': 'insights-output', 'property': 'children'}],
+    'inputs': [{'id': 'analysis-options', 'property': 'value', 'value': 'age_distribution'},
+               {'id': 'crossfilter-selection', 'property': 'data', 'value': {}},
+               {'id': 'weighting', 'property': 'value', 'value': 'rows'}],
+    'changedPropIds': ['analysis-options.value'],
+    'state': [],
+})
+figure = time.perf_counter()
+if response.status_code != 200:
+    raise SystemExit(f'first figure request failed: HTTP {response.status_code}')
+
+print(json.dumps({
+    'import_s': imported - start,
+    'first_page_s': page - start,
+    'first_figure_s': figure - start,
+}))
+'''
+
+METRICS = ('import_s', 'first_page_s', 'first_figure_s')
+
+
+def run_once():
+    # modules imported by the time `import app` returns, recorded separately
+    check = ('import sys, json, app; print(json.dumps([m for m in '
+             '("pandas", "numpy", "plotly.express", "matplotlib") if m in sys.modules]))')
+    at_import = subprocess.run([sys.executable, '-c', check], cwd=ROOT, check=True,
+                               capture_output=True, text=True).stdout
+    out = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+                         capture_output=True, text=True)
+    result = json.loads(out.stdout)
+    result['heavy_modules_at_import'] = json.loads(at_import)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--save')
+    parser.add_argument('--compare')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown before flagging, as a fraction')
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    report = {metric: statistics.median(r[metric] for r in runs) for metric in METRICS}
+    report['heavy_modules_at_import'] = runs[-1]['heavy_modules_at_import']
+
+    for metric in METRICS:
+        print(f"{metric:<16}{report[metric] * 1000:>10.0f} ms")
+    print(f"{'heavy imports':<16}{', '.join(report['heavy_modules_at_import']) or 'none':>10}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = [m for m in METRICS
+                       if report[m] > baseline[m] * (1 + args.tolerance)]
+        for m in regressions:
+            print(f"REGRESSION {m}: {baseline[m] * 1000:.0f} ms -> {report[m] * 1000:.0f} ms")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Peak memory of the chunked summary ingest vs reading the whole CSV.
+#
+#   python benchmarks/bench_streaming.py [--scale 10 100] [--chunksize 200000]
+#
+# Writes synthetic extracts made by stacking the shipped CSV `scale` times into
+# a temporary directory, then measures each path in a fresh interpreter.  The
+# summary's peak RSS should stay flat as the file grows; the full read grows
+# with it.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+import pandas as pd
+import summary
+
+path, csv_path, chunksize = sys.argv[1], sys.argv[2], int(sys.argv[3])
+start = time.perf_counter()
+if path == 'full read':
+    rows = len(pd.read_csv(csv_path))
+else:
+    rows = summary.build_summary(csv_path, csv_path + '.summary', chunksize)['rows']
+print(json.dumps({'rows': rows, 'seconds': time.perf_counter() - start,
+                  'peak_rss_mb': summary.peak_rss_mb()}))
+'''
+
+
+def measure(path, csv_path, chunksize):
+    out = subprocess.run([sys.executable, '-c', PROBE, path, csv_path, str(chunksize)],
+                         cwd=ROOT, check=True, capture_output=True, text=True)
+    return json.loads(out.stdout)
+
+
+def write_scaled(csv_path, out_path, scale):
+    df = pd.read_csv(csv_path)
+    df.to_csv(out_path, index=False)
+    for _ in range(scale - 1):
+        df.to_csv(out_path, index=False, header=False, mode='a')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', default=os.path.join(ROOT, 'refined_adult.csv'))
+    parser.add_argument('--scale', type=int, nargs='+', default=[10, 100])
+    parser.add_argument('--chunksize', type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'file':>12}{'rows':>13}{'path':>14}{'seconds':>10}{'peak RSS MB':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in args.scale:
+            csv_path = os.path.join(tmp, f'adult_x{scale}.csv')
+            write_scaled(args.csv, csv_path, scale)
+            size = f"{os.path.getsize(csv_path) / 2**20:.0f} MB"
+            for path in ('full read', 'summary'):
+                r = measure(path, csv_path, args.chunksize)
+                print(f"{size:>12}{r['rows']:>13,}{path:>14}{r['seconds']:>10.1f}{r['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
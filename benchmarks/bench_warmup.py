@@ -0,0 +1,52 @@
+# How long warm_caches takes to build every figure, by thread count.
+#
+#   python benchmarks/bench_warmup.py [--threads 1 2 4] [--data refined_adult.csv]
+#
+# Each thread count runs in a fresh interpreter: load the data, then build
+# the shared aggregates and both weightings of every cached figure (see
+# scheduler.py).  Prints the wall time of each run and the seconds every
+# step took; a step's time includes waiting for the GIL, so the sum of the
+# steps grows with the threads while the wall time should shrink.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+import app
+state = app.dashboard(app.create_app({'data_path': sys.argv[1]}))
+start = time.perf_counter()
+state.data()
+loaded = time.perf_counter()
+steps = state.warm_caches(int(sys.argv[2]))
+print(json.dumps({'load_s': loaded - start, 'warm_s': time.perf_counter() - loaded, 'steps': steps}))
+'''
+
+
+def measure(data_path, threads):
+    out = subprocess.run([sys.executable, '-c', PROBE, data_path, str(threads)], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.path.join(ROOT, 'refined_adult.csv'))
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    runs = {threads: measure(args.data, threads) for threads in args.threads}
+    for threads, run in runs.items():
+        print(f"{threads} thread(s): load {run['load_s']:.2f} s, warm {run['warm_s']:.2f} s")
+    steps = sorted(runs[args.threads[0]]['steps'], key=lambda name: -runs[args.threads[0]]['steps'][name])
+    print(f"\n{'step (ms)':<46}" + ''.join(f'{f"{threads} thr":>10}' for threads in runs))
+    for name in steps:
+        print(f'{name:<46}' + ''.join(f"{run['steps'][name] * 1000:>10.1f}" for run in runs.values()))
+
+
+if __name__ == '__main__':
+    main()
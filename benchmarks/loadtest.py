@@ -0,0 +1,101 @@
+# Load test against a running dashboard's _dash-update-component endpoint.
+#
+#   gunicorn -c gunicorn.conf.py &
+#   python benchmarks/loadtest.py --url http://127.0.0.1:8000 --clients 16 --duration 30
+#
+# Every client loops over the analysis options and the map filter, the two
+# callbacks a visitor triggers most.  Reports requests/second and latency
+# percentiles for all requests and per callback.
+import argparse
+import itertools
+import threading
+import time
+
+import numpy as np
+import requests
+
+ANALYSIS_OPTIONS = ['age_distribution', 'hours_worked', 'marital_status', 'racial_group', 'education_level']
+MAP_FILTERS = ['capital.gain', 'capital.loss']
+# the unfiltered, unweighted page, as a first visit sends it
+SHARED_INPUTS = [{'id': 'crossfilter-selection', 'property': 'data', 'value': {}},
+                 {'id': 'weighting', 'property': 'value', 'value': 'rows'}]
+
+
+def analysis_request(option):
+    return 'update_main_analysis', {
+        'output': '..question-output.children...graph-output.figure...insights-output.children..',
+        'outputs': [{'id': 'question-output', 'property': 'children'},
+                    {'id': 'graph-output', 'property': 'figure'},
+                    {'id': 'insights-output', 'property': 'children'}],
+        'inputs': [{'id': 'analysis-options', 'property': 'value', 'value': option}] + SHARED_INPUTS,
+        'changedPropIds': ['analysis-options.value'],
+        'state': [],
+    }
+
+
+def map_request(selected_filter):
+    return 'update_map', {
+        'output': 'map-graph.figure',
+        'outputs': {'id': 'map-graph', 'property': 'figure'},
+        'inputs': [{'id': 'filter-dropdown', 'property': 'value', 'value': selected_filter}] + SHARED_INPUTS,
+        'changedPropIds': ['filter-dropdown.value'],
+        'state': [],
+    }
+
+
+def client(url, deadline, offset, results, errors):
+    requests_ = [analysis_request(o) for o in ANALYSIS_OPTIONS] + [map_request(f) for f in MAP_FILTERS]
+    session = requests.Session()
+    session.headers['Accept-Encoding'] = 'gzip'
+    for name, body in itertools.islice(itertools.cycle(requests_), offset, None):
+        if time.perf_counter() >= deadline:
+            return
+        start = time.perf_counter()
+        try:
+            response = session.post(url + '/_dash-update-component', json=body, timeout=30)
+        except requests.RequestException:
+            errors.append(name)
+            continue
+        if response.status_code != 200:
+            errors.append(name)
+            continue
+        results.append((name, time.perf_counter() - start))
+
+
+def summarize(label, latencies, elapsed):
+    ms = np.asarray(latencies) * 1000
+    print(f"{label:<22}{len(ms):>8}{len(ms) / elapsed:>10.1f}"
+          f"{np.percentile(ms, 50):>10.1f}{np.percentile(ms, 99):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30, help='seconds')
+    args = parser.parse_args()
+    url = args.url.rstrip('/')
+
+    requests.get(url + '/', timeout=30).raise_for_status()
+    results, errors = [], []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [threading.Thread(target=client, args=(url, deadline, i, results, errors))
+               for i in range(args.clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if not results:
+        raise SystemExit(f'no successful requests ({len(errors)} errors)')
+    print(f"{args.clients} clients, {elapsed:.1f} s, {len(errors)} errors")
+    print(f"{'callback':<22}{'requests':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    summarize('all', [t for _, t in results], elapsed)
+    for name in ('update_main_analysis', 'update_map'):
+        summarize(name, [t for n, t in results if n == name], elapsed)
+
+
+if __name__ == '__main__':
+    main()
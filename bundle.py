@@ -0,0 +1,153 @@
+# bundle.py
+#
+# Offline build of the dashboard's unfiltered figures.  `python bundle.py`
+# loads the data once, runs every figure function (both weightings, every
+# page) and writes each figure's compact JSON (see payload.py) gzipped into
+# bundle/<data version>/, with a manifest listing them.  Started with the bundle
+#
+#   DASHBOARD_BUNDLE=bundle python app.py
+#
+# the app answers every unfiltered figure (and the filter status line) from
+# those files and only reads the data once somebody cross-filters.  The bundle
+# for another version of the data is never used: the directory is looked up
+# by the version of the data being served, so rebuilding the CSV (or the
+# summary) means rebuilding the bundle.
+#
+# --images also writes a PNG of each figure (needs the kaleido package).
+# The PNGs in assets/ are already served as static files.
+import argparse
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+import dataset
+from data_store import MANIFEST, dataset_version, store_path_for
+from payload import figure_json
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+DEFAULT_PATH = 'bundle'
+WEIGHTINGS = ('rows', 'weighted')  # values of the weighting toggle
+
+
+def data_version(data_path):
+    # The version dataset.current() reports for `data_path`, without loading it
+    if os.path.isdir(data_path):  # a summary
+        manifest_path = os.path.join(data_path, MANIFEST)
+    elif os.path.exists(data_path):
+        return dataset_version(data_path)
+    else:  # only the columnar store is left
+        manifest_path = os.path.join(store_path_for(data_path), MANIFEST)
+    with open(manifest_path) as f:
+        return json.load(f)['version']
+
+
+def build_bundle(data_path=dataset.DEFAULT_PATH, out=DEFAULT_PATH, images=False):
+    import app
+
+    state = app.Dashboard(dict(app.DEFAULT_CONFIG, data_path=data_path, bundle_path=None))
+    data = state.data()
+    path = os.path.join(out, data.version)
+    os.makedirs(path, exist_ok=True)
+
+    figures, status = {}, {}
+    for weighting in WEIGHTINGS:
+        variant = data.weighted if weighting == 'weighted' else data
+        with dataset.viewing(variant):
+            for section, cache in state.caches.items():
+                for name in state.figure_names(cache):
+                    fig = cache.builders[name]()
+                    raw = json.dumps(figure_json(fig), separators=(',', ':')).encode()
+                    file = f'{section}-{name}-{weighting}.json.gz'
+                    with open(os.path.join(path, file), 'wb') as f:
+                        f.write(gzip.compress(raw, mtime=0))
+                    entry = {'file': file, 'bytes': len(raw),
+                             'gzip_bytes': os.path.getsize(os.path.join(path, file))}
+                    if images:
+                        entry['image'] = file.replace('.json.gz', '.png')
+                        try:
+                            fig.write_image(os.path.join(path, entry['image']))
+                        except ValueError as e:  # plotly's message when kaleido is missing
+                            raise SystemExit(f"--images: {e}") from None
+                    figures.setdefault(section, {}).setdefault(str(name), {})[weighting] = entry
+        status[weighting] = app.selection_status(state, {}, weighting)
+
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'version': data.version,
+        'source': os.path.basename(os.path.normpath(data_path)),
+        'status': status,
+        'figures': figures,
+    }
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    return path, manifest
+
+
+class Bundle:
+    # The figures of one bundle directory, decompressed on first use
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.status = manifest['status']  # weighting -> filter status line
+        self._figures = {}
+        self._lock = threading.Lock()
+
+    def names(self, section):
+        names = list(self.manifest['figures'].get(section, {}))
+        return [int(n) for n in names] if all(n.isdigit() for n in names) else names
+
+    def get(self, section, name, weighting):
+        # The figure as a JSON dict, or None when the bundle does not have it
+        entry = self.manifest['figures'].get(section, {}).get(str(name), {}).get(weighting)
+        if entry is None:
+            return None
+        fig = self._figures.get(entry['file'])
+        if fig is None:
+            with gzip.open(os.path.join(self.path, entry['file']), 'rt') as f:
+                fig = json.load(f)
+            with self._lock:
+                fig = self._figures.setdefault(entry['file'], fig)
+        return fig
+
+
+def load_bundle(out, data_path):
+    # The bundle built from the data at `data_path`, or None (with a warning)
+    # when there is none for that version
+    try:
+        version = data_version(data_path)
+        path = os.path.join(out, version)
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError, KeyError):
+        manifest = None
+    if manifest is None or manifest.get('format') != BUNDLE_FORMAT:
+        logger.warning("no bundle for %s in %s, building figures from the data "
+                       "(run `python bundle.py` to build one)", data_path, out)
+        return None
+    return Bundle(path, manifest)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--data', default=os.environ.get('DASHBOARD_DATA', dataset.DEFAULT_PATH),
+                        help='CSV or summary directory to build from')
+    parser.add_argument('--out', default=DEFAULT_PATH)
+    parser.add_argument('--images', action='store_true', help='also write a PNG of each figure')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path, manifest = build_bundle(args.data, args.out, args.images)
+    entries = [e for section in manifest['figures'].values() for names in section.values()
+               for e in names.values()]
+    print(f"wrote {path}: {len(entries)} figures, "
+          f"{sum(e['bytes'] for e in entries) / 1e6:.1f} MB of JSON gzipped to "
+          f"{sum(e['gzip_bytes'] for e in entries) / 1e6:.1f} MB, "
+          f"in {time.perf_counter() - start:.1f} s")
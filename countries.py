@@ -0,0 +1,49 @@
+# countries.py
+#
+# ISO-3 codes for the native.country values in the census extract, so the
+# choropleth can use locationmode='ISO-3' instead of having plotly.js match
+# every name against its country regexes in the browser.  The codes are the
+# ones plotly.js resolved these names to; the names it could not place are
+# mapped to None and left off the map, as before.
+COUNTRY_ISO3 = {
+    'Cambodia': 'KHM',
+    'Canada': 'CAN',
+    'China': 'CHN',
+    'Columbia': None,
+    'Cuba': 'CUB',
+    'Dominican-Republic': 'DOM',
+    'Ecuador': 'ECU',
+    'El-Salvador': 'SLV',
+    'England': None,
+    'France': 'FRA',
+    'Germany': 'DEU',
+    'Greece': 'GRC',
+    'Guatemala': 'GTM',
+    'Haiti': 'HTI',
+    'Honduras': 'HND',
+    'Hong': None,
+    'Hungary': 'HUN',
+    'India': 'IND',
+    'Iran': 'IRN',
+    'Ireland': 'IRL',
+    'Italy': 'ITA',
+    'Jamaica': 'JAM',
+    'Japan': 'JPN',
+    'Laos': 'LAO',
+    'Mexico': 'MEX',
+    'Nicaragua': 'NIC',
+    'Outlying-US(Guam-USVI-etc)': 'GUM',
+    'Peru': 'PER',
+    'Philippines': 'PHL',
+    'Poland': 'POL',
+    'Portugal': 'PRT',
+    'Puerto-Rico': 'PRI',
+    'Scotland': None,
+    'South': None,
+    'Taiwan': 'TWN',
+    'Thailand': 'THA',
+    'Trinadad&Tobago': 'TTO',
+    'United-States': 'USA',
+    'Vietnam': 'VNM',
+    'Yugoslavia': 'YUG',
+}
@@ -0,0 +1,182 @@
+# crossfilter.py
+#
+# Cross-filtering between the charts.  A selection is a dict of column ->
+# selected values; rows must match one of the values of every column (OR
+# within a column, AND across columns).  The bitmap index keeps one packed
+# bitset per value of each categorical column, so resolving a selection is a
+# handful of bitwise ORs/ANDs over N/8 bytes instead of a pass over the frame.
+import json
+import threading
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+
+from aggregation import CUBE_DIMS, ContingencyCube, encode
+from dataset import FrameData
+from metrics import timed
+
+INDEX_DIMS = ['workclass', 'education', 'marital.status', 'occupation', 'relationship',
+              'race', 'sex', 'native.country', 'income']
+
+
+class BitmapIndex:
+
+    def __init__(self, n_rows, labels, bitsets):
+        self.n_rows = n_rows
+        self.labels = labels  # column -> Index of values
+        self.bitsets = bitsets  # column -> 2-D uint8 array, one packed row per value
+
+    @classmethod
+    def from_frame(cls, df, dims=INDEX_DIMS):
+        labels, bitsets = {}, {}
+        for dim in dims:
+            codes, labels[dim] = encode(df[dim])
+            bitsets[dim] = np.stack([np.packbits(codes == code) for code in range(len(labels[dim]))])
+        return cls(len(df), labels, bitsets)
+
+    def appended(self, df, start):
+        # The index of `df`, whose rows before `start` are the ones indexed
+        # here: the bitsets are copied and the new rows' bits added after them
+        labels, bitsets = {}, {}
+        n_bytes, shift = -(-len(df) // 8), start % 8
+        for dim, old in self.bitsets.items():
+            codes, added = encode(df[dim].iloc[start:])
+            labels[dim] = self.labels[dim].union(added)
+            codes = np.append(labels[dim].get_indexer(added), -1)[codes]  # missing stays -1
+            bits = np.zeros((len(labels[dim]), n_bytes), dtype=np.uint8)
+            bits[labels[dim].get_indexer(self.labels[dim]), :old.shape[1]] = old
+            # the first new row shares the last old byte when start is not a multiple of 8
+            lead = np.zeros(shift, dtype=bool)
+            bits[:, start // 8:] |= np.stack([np.packbits(np.r_[lead, codes == code])
+                                              for code in range(len(labels[dim]))])
+            bitsets[dim] = bits
+        return BitmapIndex(len(df), labels, bitsets)
+
+    def column_mask(self, dim, values):
+        # Rows holding any of `values` in `dim`; unknown values match nothing
+        codes = self.labels[dim].get_indexer(list(values))
+        codes = codes[codes >= 0]
+        if not len(codes):
+            return np.zeros(self.bitsets[dim].shape[1], dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bitsets[dim][codes], axis=0)
+
+    def mask(self, selection):
+        # Packed bitset of the rows matching the whole selection, None when empty
+        mask = None
+        for dim, values in selection.items():
+            column = self.column_mask(dim, values)
+            mask = column if mask is None else np.bitwise_and(mask, column, out=mask)
+        return mask
+
+    def count(self, mask):
+        return self.n_rows if mask is None else int(np.bitwise_count(mask).sum(dtype=np.int64))
+
+    def counts(self, dim, mask):
+        # Matching rows per value of `dim`, straight from the bitsets
+        bitsets = self.bitsets[dim]
+        if mask is not None:
+            bitsets = bitsets & mask
+        return np.bitwise_count(bitsets).sum(axis=1, dtype=np.int64)
+
+    def rows(self, mask):
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows))
+
+
+def normalize(selection, exclude=()):
+    # Canonical form of a selection: sorted values; empty and excluded columns
+    # dropped, and so are columns the index does not cover (a client can send any)
+    return {dim: sorted(values) for dim, values in sorted((selection or {}).items())
+            if values and isinstance(values, list) and dim in INDEX_DIMS and dim not in exclude}
+
+
+class View(FrameData):
+    # The dataset restricted to a selection, so the figure functions work on
+    # either; every part is computed on first use and kept for as long as the
+    # view is cached.
+
+    def __init__(self, dataset, selection):
+        self.dataset = dataset
+        self.selection = selection
+        self.version = dataset.version
+        self.weight = dataset.weight
+        self.key = json.dumps(selection, separators=(',', ':'))
+
+    @cached_property
+    @timed('aggregation')
+    def mask(self):
+        return self.dataset.bitmaps.mask(self.selection)
+
+    @cached_property
+    @timed('aggregation')
+    def n_rows(self):
+        return self.dataset.bitmaps.count(self.mask)
+
+    @cached_property
+    @timed('aggregation')
+    def rows(self):
+        return self.dataset.bitmaps.rows(self.mask)
+
+    @cached_property
+    @timed('aggregation')
+    def df(self):
+        return self.dataset.df.take(self.rows)
+
+    @cached_property
+    @timed('aggregation')
+    def cube(self):
+        # Cut down from the precomputed cube, so no row is touched.  A column
+        # outside the cube comes from a cube with that column as an extra axis;
+        # filtering on two or more of those goes through the selected rows.
+        extra = [dim for dim in self.selection if dim not in CUBE_DIMS]
+        if len(extra) > 1:
+            weights = None if self.weight is None else self.df[self.weight].to_numpy()
+            return ContingencyCube.from_frame(self.df, weights=weights)
+        cube = self.dataset.cube
+        if extra:
+            cube = self.dataset.cube_with(extra[0]).slice(extra[0], self.selection[extra[0]])
+        return cube.restrict({dim: values for dim, values in self.selection.items() if dim not in extra})
+
+
+_views = OrderedDict()
+_lock = threading.Lock()
+MAX_VIEWS = 16
+
+
+def view_for(dataset, selection, exclude=()):
+    # The view of `selection` (minus the `exclude` columns), or the dataset
+    # itself when nothing is left to filter on.  Views are cached, so a
+    # selection's aggregates are computed once however many charts ask.
+    selection = normalize(selection, exclude)
+    if not selection:
+        return dataset
+    view = View(dataset, selection)
+    key = (dataset.version, dataset.weight, view.key)
+    with _lock:
+        cached = _views.get(key)
+        if cached is not None and cached.dataset is dataset:
+            _views.move_to_end(key)
+            return cached
+        _views[key] = view
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+    return view
+
+
+def forget_views(keep_version=None):
+    # Drop the cached views of every dataset version but keep_version
+    with _lock:
+        for key in [k for k in _views if k[0] != keep_version]:
+            del _views[key]
+
+
+def toggle(selection, clicked):
+    # Add each clicked (column, value) to the selection, or drop it if already there
+    selection = {dim: list(values) for dim, values in (selection or {}).items()}
+    for dim, value in clicked.items():
+        values = selection.setdefault(dim, [])
+        if value in values:
+            values.remove(value)
+        else:
+            values.append(value)
+    return normalize(selection)
@@ -0,0 +1,209 @@
+# data_store.py
+#
+# Typed columnar copy of the census CSV.  `python data_store.py` converts the
+# CSV once into a directory of .npy files (string columns as dictionary-encoded
+# integer codes, numeric columns downcast to the narrowest integer type) plus a
+# manifest.  load_dataset() memory-maps that directory and falls back to the CSV,
+# typed the same way, when the store is missing or was built from a different
+# version of the file.
+import io
+import json
+import logging
+import os
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT = 1
+MANIFEST = 'manifest.json'
+TAIL_BYTES = 1 << 16  # end of the file checksummed to tell an append from a rewrite
+
+
+def dataset_version(path):
+    # Changes whenever the file is rewritten, so cached figures never outlive their data
+    stat = os.stat(path)
+    return f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def version_size(version):
+    # The file size a dataset_version() was taken at
+    return int(version.split('-')[0], 16)
+
+
+def file_state(path, size=None):
+    # What appended_rows() compares against: the file's first `size` bytes
+    # (all of it by default), by length and a checksum of their end
+    size = os.path.getsize(path) if size is None else size
+    with open(path, 'rb') as f:
+        f.seek(max(0, size - TAIL_BYTES))
+        tail = f.read(size - f.tell())
+    return {'path': path, 'size': size, 'tail': zlib.crc32(tail), 'newline': tail.endswith(b'\n')}
+
+
+def appended_rows(state, columns):
+    # (rows, state) for the complete lines added to the CSV since `state`
+    # was taken, parsed into a frame with `columns`; None when the file was
+    # rewritten rather than appended to.  A line still being written is left
+    # for the next call.
+    size = os.path.getsize(state['path'])
+    if size < state['size'] or not state['newline']:
+        return None
+    with open(state['path'], 'rb') as f:
+        f.seek(max(0, state['size'] - TAIL_BYTES))
+        tail = f.read(state['size'] - f.tell())
+        if zlib.crc32(tail) != state['tail']:
+            return None
+        added = f.read(size - state['size'])
+    added = added[:added.rfind(b'\n') + 1]
+    tail = (tail + added)[-TAIL_BYTES:]
+    state = {'path': state['path'], 'size': state['size'] + len(added), 'tail': zlib.crc32(tail),
+             'newline': True}
+    if not added.strip():
+        return pd.DataFrame(columns=columns), state
+    return pd.read_csv(io.BytesIO(added), header=None, names=columns), state
+
+
+def append_rows(df, rows):
+    # `df` with `rows` added at the end, `rows` converted to df's column
+    # types: categories are merged (kept sorted, like ingest() writes them)
+    # and integers narrowed back to the stored width when they fit
+    columns = {}
+    for name in df.columns:
+        old, new = df[name], rows[name]
+        if isinstance(old.dtype, pd.CategoricalDtype):
+            categories = old.cat.categories.union(pd.Index(new.dropna().unique()).astype(str))
+            old_codes = old.cat.set_categories(categories).cat.codes.to_numpy()
+            new_codes = pd.Categorical(new, categories=categories).codes
+            columns[name] = pd.Categorical.from_codes(np.concatenate([old_codes, new_codes]), categories)
+            continue
+        if pd.api.types.is_integer_dtype(old) and pd.api.types.is_integer_dtype(new):
+            info = np.iinfo(old.dtype)
+            if new.empty or (new.min() >= info.min and new.max() <= info.max):
+                new = new.astype(old.dtype)
+        columns[name] = np.concatenate([old.to_numpy(), new.to_numpy()])
+    return pd.DataFrame(columns, copy=False)
+
+
+def store_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + '.store'
+
+
+def _narrow_codes(n_categories):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def typed_column(col):
+    # `col` the way the store holds it: text as a categorical, its categories
+    # sorted so groupby output keeps the order it has on strings, and
+    # integers in the narrowest type holding them
+    if col.dtype == object:
+        codes, categories = pd.factorize(col, sort=True)
+        return pd.Series(pd.Categorical.from_codes(codes, categories=[str(c) for c in categories]),
+                         index=col.index, name=col.name)
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        if not col.cat.categories.is_monotonic_increasing:
+            col = col.cat.reorder_categories(col.cat.categories.sort_values())
+        return col
+    if pd.api.types.is_integer_dtype(col):
+        return pd.to_numeric(col, downcast='integer')
+    return col
+
+
+def read_csv(csv_path, sample_rows=1000):
+    # The CSV typed like the store.  The columns holding text in the first
+    # `sample_rows` rows are parsed straight into categoricals, so the table
+    # is never held as Python strings; the rest are narrowed one at a time.
+    head = pd.read_csv(csv_path, nrows=sample_rows)
+    text = {name: 'category' for name in head.columns if head[name].dtype == object}
+    df = pd.read_csv(csv_path, dtype=text)
+    for name in df.columns:
+        df[name] = typed_column(df[name])
+    return df
+
+
+def ingest(csv_path, store_path=None):
+    store_path = store_path or store_path_for(csv_path)
+    version = dataset_version(csv_path)
+    df = read_csv(csv_path)
+    os.makedirs(store_path, exist_ok=True)
+
+    columns = []
+    for i, name in enumerate(df.columns):
+        col = typed_column(df[name])
+        entry = {'name': name, 'file': f'{i:02d}.npy'}
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            categories = col.cat.categories
+            values = col.cat.codes.to_numpy().astype(_narrow_codes(len(categories)))
+            entry.update(kind='category', categories=list(categories))
+        elif pd.api.types.is_integer_dtype(col):
+            values = col.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            values = col.to_numpy()
+            entry['kind'] = 'numeric'
+        entry['dtype'] = values.dtype.str
+        np.save(os.path.join(store_path, entry['file']), values)
+        columns.append(entry)
+
+    manifest = {
+        'format': STORE_FORMAT,
+        'source': os.path.basename(csv_path),
+        'version': version,
+        'rows': len(df),
+        'columns': columns,
+    }
+    # The manifest is written last so a half-written store is never picked up
+    tmp = os.path.join(store_path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(store_path, MANIFEST))
+    return manifest
+
+
+def read_manifest(store_path):
+    try:
+        with open(os.path.join(store_path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == STORE_FORMAT else None
+
+
+def load_store(store_path, manifest, mmap=True):
+    data = {}
+    for entry in manifest['columns']:
+        values = np.load(os.path.join(store_path, entry['file']),
+                         mmap_mode='r' if mmap else None)
+        if entry['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        data[entry['name']] = values
+    return pd.DataFrame(data, copy=False)
+
+
+def load_dataset(csv_path, store_path=None, mmap=True):
+    # Returns (df, version).  The store wins whenever it matches the CSV on disk.
+    store_path = store_path or store_path_for(csv_path)
+    manifest = read_manifest(store_path)
+    csv_version = dataset_version(csv_path) if os.path.exists(csv_path) else None
+
+    if manifest is not None and csv_version in (None, manifest['version']):
+        return load_store(store_path, manifest, mmap=mmap), manifest['version']
+
+    if manifest is not None:
+        logger.warning("%s is stale, reading %s instead (run `python data_store.py` to rebuild)",
+                       store_path, csv_path)
+    return read_csv(csv_path), csv_version
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else 'refined_adult.csv'
+    manifest = ingest(csv_path)
+    print(f"wrote {store_path_for(csv_path)}: {manifest['rows']} rows, "
+          f"{len(manifest['columns'])} columns (version {manifest['version']})")
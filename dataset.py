@@ -0,0 +1,250 @@
+# dataset.py
+#
+# The dataset the dashboard is serving.  It is read on first use rather than
+# at import, so importing the app (gunicorn workers, tests, tooling) stays
+# cheap; pandas and the columnar store are only imported at that point.
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cached_property
+
+from metrics import timed
+
+DEFAULT_PATH = 'refined_adult.csv'
+
+
+class FrameData:
+    # The aggregates the charts are drawn from, computed from an in-memory
+    # frame.  summary.Summary answers the same questions from tables folded
+    # chunk by chunk, for data that does not fit in memory.
+    version = None
+    key = None  # the unfiltered view (see crossfilter.View)
+    weight = None  # column every row is weighted by; None counts rows
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def variant(self):
+        # What tells apart figures drawn from the same dataset version
+        return (self.weight, self.key)
+
+    @property
+    def n_rows(self):
+        return len(self.df)
+
+    @cached_property
+    @timed('aggregation')
+    def cube(self):
+        from aggregation import ContingencyCube, cube_for
+        if self.weight is None:
+            return cube_for(self.df)
+        return ContingencyCube.from_frame(self.df, weights=self.df[self.weight].to_numpy())
+
+    @timed('aggregation')
+    def histograms(self, group, measure):
+        from aggregation import histograms
+        return histograms(self.df, group, measure, self.weight)
+
+    @timed('aggregation')
+    def sample(self, group, measure, budget):
+        from aggregation import sample
+        return sample(self.df, group, measure, budget, weight=self.weight)
+
+    @timed('aggregation')
+    def totals(self, path, measure):
+        from aggregation import totals
+        return totals(self.df, path, measure, self.weight)
+
+    @timed('aggregation')
+    def group_means(self, dims, measure, fold=None):
+        from aggregation import group_means
+        return group_means(self.df, dims, measure, fold, self.weight)
+
+    @timed('aggregation')
+    def fits(self, x, y, group=None):
+        from aggregation import linear_fits
+        return linear_fits(self.df, x, y, group, self.weight)
+
+    @timed('aggregation')
+    def histogram2d(self, x, y, bins):
+        from aggregation import histogram2d
+        return histogram2d(self.df, x, y, bins, self.weight)
+
+    @timed('aggregation')
+    def country_summary(self):
+        from aggregation import country_summary_for
+        return country_summary_for(self.df, self.weight)
+
+    @timed('aggregation')
+    def ordered_levels(self, dim, by):
+        # Values of `dim` ordered by the numeric column `by` (education by education.num)
+        pairs = self.df[[by, dim]].drop_duplicates().sort_values(by)
+        mapping = dict(zip(pairs[by], pairs[dim]))
+        return [mapping[key] for key in sorted(mapping)]
+
+
+class Dataset(FrameData):
+    # One loaded version of the data.  A refresh replaces the whole object.
+    source = None  # data_store.file_state() of the CSV it was read from
+
+    def __init__(self, df, version, weight=None):
+        super().__init__(df)
+        self.version = version
+        self.weight = weight
+        self.unweighted = self
+        self._extended_cubes = {}
+        self._histograms = {}  # (group, measure) -> histograms(group, measure)
+
+    @cached_property
+    def weighted(self):
+        # The same rows with every aggregate weighted by fnlwgt, i.e. estimates
+        # for the population the sample stands for.  It shares the frame and
+        # the bitmap index; its cubes and figures are kept next to these.
+        from aggregation import WEIGHT
+        if self.weight is not None:
+            return self
+        weighted = Dataset(self.df, self.version, WEIGHT)
+        weighted.unweighted = self
+        return weighted
+
+    @timed('aggregation')
+    def cube_with(self, dim):
+        # The cube with one more dimension, for filtering on a column outside it
+        cube = self._extended_cubes.get(dim)
+        if cube is None:
+            from aggregation import CUBE_DIMS, ContingencyCube
+            weights = None if self.weight is None else self.df[self.weight].to_numpy()
+            cube = self._extended_cubes[dim] = ContingencyCube.from_frame(self.df, CUBE_DIMS + [dim], weights)
+        return cube
+
+    def histograms(self, group, measure):
+        # Kept, so appended() can extend them
+        hists = self._histograms.get((group, measure))
+        if hists is None:
+            hists = self._histograms[group, measure] = super().histograms(group, measure)
+        return hists
+
+    @timed('aggregation')
+    def country_summary(self):
+        # From the per-country histograms, like summary.Summary's
+        from aggregation import COUNTRY_MEASURES, country_table
+        hists = {}
+        for measure in COUNTRY_MEASURES:
+            countries, hists[measure] = self.histograms('native.country', measure)
+        return country_table(countries, hists)
+
+    def appended(self, rows, version):
+        # This dataset with `rows` added at the end, as version `version`.  The
+        # cubes, histograms (and so the country summary) and bitmap index built
+        # so far, weighted or not, are carried over plus those of the new rows,
+        # so none is recomputed over the whole frame.
+        from aggregation import ContingencyCube, histograms, merge_group_histograms
+        from data_store import append_rows
+        grown = Dataset(append_rows(self.df, rows), version)
+        rows = grown.df.iloc[len(self.df):]  # typed like the rest
+        pairs = [(self, grown)]
+        if 'weighted' in self.__dict__:
+            pairs.append((self.weighted, grown.weighted))
+        for old, new in pairs:
+            weights = None if old.weight is None else rows[old.weight].to_numpy()
+            if 'cube' in old.__dict__:
+                new.cube = old.cube.merge(ContingencyCube.from_frame(rows, old.cube.dims, weights))
+            for dim, cube in old._extended_cubes.items():
+                new._extended_cubes[dim] = cube.merge(ContingencyCube.from_frame(rows, cube.dims, weights))
+            for (group, measure), hists in list(old._histograms.items()):
+                added = histograms(rows, group, measure, old.weight)
+                new._histograms[group, measure] = merge_group_histograms(hists, added)
+        if 'bitmaps' in self.__dict__:
+            grown.bitmaps = self.bitmaps.appended(grown.df, len(self.df))
+        return grown
+
+    @cached_property
+    @timed('aggregation')
+    def bitmaps(self):
+        if self.unweighted is not self:
+            return self.unweighted.bitmaps  # a selection picks the same rows either way
+        from crossfilter import BitmapIndex
+        return BitmapIndex.from_frame(self.df)
+
+
+_path = None  # set by configure(); an app passes its own data_path instead
+_loaded = {}  # path -> the dataset being served from it
+_lock = threading.Lock()
+_view = ContextVar('view', default=None)
+
+
+def configure(path):
+    # The data current() serves when not given a path: a CSV or a directory
+    # written by `python summary.py`, read on first use.  For scripts; an app
+    # names its data path every time, so two apps can serve different data.
+    global _path
+    _path = path
+
+
+def _resolve(path):
+    path = path or _path
+    if path is None:
+        raise LookupError("no data path given, and none set by dataset.configure()")
+    return path
+
+
+def load(path):
+    # The data at `path`, read now
+    if os.path.isdir(path):
+        from summary import load_summary
+        return load_summary(path)
+    from data_store import file_state, load_dataset, version_size
+    dataset = Dataset(*load_dataset(path))
+    if os.path.exists(path):
+        dataset.source = file_state(path, version_size(dataset.version))
+    return dataset
+
+
+def current(path=None):
+    # The dataset served from `path` (the configured one by default), read
+    # once however many apps serve it
+    path = _resolve(path)
+    dataset = _loaded.get(path)
+    if dataset is None:
+        with _lock:
+            dataset = _loaded.get(path)
+            if dataset is None:
+                dataset = _loaded[path] = load(path)
+    return dataset
+
+
+def loaded(path=None):
+    # (path, dataset being served from it); the dataset is None until first read
+    path = _resolve(path)
+    return path, _loaded.get(path)
+
+
+def swap(old, new, path=None):
+    # Serve `new` in place of `old`, in one step: a request holds one or the
+    # other.  False, and no change, when `old` is no longer what is served.
+    path = _resolve(path)
+    with _lock:
+        if _loaded.get(path) is not old:
+            return False
+        _loaded[path] = new
+    return True
+
+
+def current_view():
+    # What the figure functions draw: the dataset or cross-filtered view set
+    # by viewing().  Never a default, which could be other data than the app's.
+    view = _view.get()
+    if view is None:
+        raise LookupError("figures are drawn inside dataset.viewing(data)")
+    return view
+
+
+@contextmanager
+def viewing(view):
+    token = _view.set(view)
+    try:
+        yield view
+    finally:
+        _view.reset(token)
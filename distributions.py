@@ -0,0 +1,155 @@
+# distributions.py
+#
+# Server-side summaries for the distribution charts (KDE curves, quartiles,
+# whiskers).  Everything works on per-group histograms -- sorted distinct
+# values plus their counts -- so after the single pass that builds them the
+# cost depends on the number of distinct values, not on the number of rows.
+import numpy as np
+
+# Above this many distinct values the KDE is evaluated on a binned histogram
+MAX_KDE_SUPPORT = 1024
+
+
+def group_histograms(codes, values, n_groups, weights=None):
+    # [(distinct values, counts)] for each group code 0..n_groups-1.  With
+    # `weights` the counts are the summed weights of the rows instead.
+    valid = codes >= 0
+    codes, values = codes[valid].astype(np.int64), np.asarray(values)[valid]
+    if weights is not None:
+        weights = np.asarray(weights)[valid]
+    if np.issubdtype(values.dtype, np.integer) and len(values):
+        values = values.astype(np.int64)
+        lo, hi = values.min(), values.max()
+        span = int(hi - lo) + 1
+        if span * n_groups <= 1 << 22:
+            # small integer range (ages, hours): one bincount over (group, value)
+            table = np.bincount(codes * span + (values - lo), weights, minlength=span * n_groups)
+            support = np.arange(lo, hi + 1)
+            return [(support[row > 0], row[row > 0]) for row in table.reshape(n_groups, span)]
+
+    if not len(values):
+        return [(values, np.zeros(0, dtype=np.int64))] * n_groups
+    order = np.lexsort((values, codes))
+    codes, values = codes[order], values[order]
+    starts = np.flatnonzero(np.r_[True, (codes[1:] != codes[:-1]) | (values[1:] != values[:-1])])
+    if weights is None:
+        run_counts = np.diff(np.r_[starts, len(values)])
+    else:
+        run_counts = np.add.reduceat(weights[order], starts)
+    run_codes, run_values = codes[starts], values[starts]
+    return [(run_values[run_codes == g], run_counts[run_codes == g]) for g in range(n_groups)]
+
+
+def merge_histograms(*histograms):
+    # One (distinct values, counts) histogram of the rows of all of `histograms`
+    values, inverse = np.unique(np.concatenate([v for v, _ in histograms]), return_inverse=True)
+    counts = np.zeros(len(values), dtype=np.result_type(*[c.dtype for _, c in histograms]))
+    np.add.at(counts, inverse, np.concatenate([c for _, c in histograms]))
+    return values, counts
+
+
+def quantiles(values, counts, qs):
+    # Linear interpolation between order statistics (pandas' and numpy's default),
+    # read off the histogram instead of a sorted copy of the column
+    n = counts.sum()
+    pos = np.asarray(qs, dtype=float) * (n - 1)
+    cum = np.cumsum(counts)
+    lo = np.searchsorted(cum, np.floor(pos), side='right')
+    hi = np.searchsorted(cum, np.ceil(pos), side='right')
+    values = values.astype(float)
+    return values[lo] + (pos - np.floor(pos)) * (values[hi] - values[lo])
+
+
+def box_stats(values, counts):
+    # Quartiles, Tukey whiskers (furthest values within 1.5 IQR) and the outliers
+    q1, median, q3 = quantiles(values, counts, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = (values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)
+    return {
+        'q1': q1, 'median': median, 'q3': q3,
+        'lowerfence': float(values[inside].min()),
+        'upperfence': float(values[inside].max()),
+        'outliers': values[~inside],
+        'outlier_counts': counts[~inside],
+    }
+
+
+def bandwidth(values, counts):
+    # plotly.js' default for violins: Silverman's rule of thumb, floored at 1% of the range
+    n = counts.sum()
+    values = values.astype(float)
+    span = values[-1] - values[0]
+    if span == 0 or n < 2:
+        return 0.0
+    mean = np.average(values, weights=counts)
+    std = np.sqrt(np.sum(counts * (values - mean) ** 2) / (n - 1))
+    q1, q3 = quantiles(values, counts, [0.25, 0.75])
+    rule = 1.059 * min(std, (q3 - q1) / 1.349) * n ** -0.2
+    return max(rule, span / 100)
+
+
+def kde(values, counts, grid, bw):
+    # Gaussian kernel density on `grid`, vectorized over the distinct values
+    values = values.astype(float)
+    weights = counts.astype(float)
+    if len(values) > MAX_KDE_SUPPORT:
+        weights, edges = np.histogram(values, bins=MAX_KDE_SUPPORT, weights=weights)
+        values = (edges[:-1] + edges[1:]) / 2
+    z = (grid[:, None] - values[None, :]) / bw
+    density = np.exp(-0.5 * z ** 2) @ weights
+    return density / (weights.sum() * bw * np.sqrt(2 * np.pi))
+
+
+def violin_summary(values, counts, n_grid=200):
+    # KDE curve over plotly's 'soft' span (two bandwidths past the data) plus box stats
+    bw = bandwidth(values, counts)
+    if bw == 0:
+        grid = np.array([float(values[0])])
+        density = np.ones(1)
+    else:
+        grid = np.linspace(values[0] - 2 * bw, values[-1] + 2 * bw, n_grid)
+        density = kde(values, counts, grid, bw)
+    return dict(box_stats(values, counts), grid=grid, density=density, bandwidth=bw)
+
+
+def group_fits(codes, x, y, n_groups, weights=None):
+    # Closed-form least-squares line y = intercept + slope * x for every group
+    # code at once (weighted least squares with `weights`): the per-group means,
+    # then the centred cross products, each a single bincount.  A group with
+    # no spread in x gets NaN.
+    valid = codes >= 0
+    codes = codes[valid].astype(np.int64)
+    x, y = np.asarray(x, dtype=float)[valid], np.asarray(y, dtype=float)[valid]
+    w = np.ones(len(x)) if weights is None else np.asarray(weights, dtype=float)[valid]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = np.bincount(codes, w, n_groups)
+        mean_x = np.bincount(codes, w * x, n_groups) / n
+        mean_y = np.bincount(codes, w * y, n_groups) / n
+        dx = x - mean_x[codes]
+        sxx = np.bincount(codes, w * dx * dx, n_groups)
+        sxy = np.bincount(codes, w * dx * (y - mean_y[codes]), n_groups)
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+    return slope, mean_y - slope * mean_x
+
+
+def stratified_sample(codes, n_groups, budget, seed=0, weights=None):
+    # Row positions of at most `budget` rows, split across groups in proportion
+    # to their size.  Seeded so the same data always yields the same figure.
+    # With `weights`, groups are sized by their summed weight and rows are
+    # drawn with probability proportional to their weight.
+    rng = np.random.default_rng(seed)
+    valid = codes >= 0
+    rows_per_group = np.bincount(codes[valid], minlength=n_groups)
+    if rows_per_group.sum() <= budget:
+        return np.flatnonzero(valid)
+    sizes = rows_per_group if weights is None else np.bincount(codes[valid], weights[valid], minlength=n_groups)
+    quota = np.minimum(rows_per_group,
+                       np.maximum(1, np.round(budget * sizes / sizes.sum()).astype(int)))
+    picks = []
+    for g in range(n_groups):
+        if not quota[g]:
+            continue
+        members = np.flatnonzero(codes == g)
+        p = None if weights is None else weights[members] / weights[members].sum()
+        picks.append(rng.choice(members, quota[g], replace=False, p=p))
+    return np.sort(np.concatenate(picks))
@@ -0,0 +1,86 @@
+# figure_cache.py
+import threading
+from collections import OrderedDict
+
+import metrics
+from payload import figure_json
+
+
+class FigureCache:
+    # Serialized Plotly figures keyed by (figure name, dataset version, variant);
+    # the variant tells apart the cross-filtered versions of a figure.
+    # Entries are plain JSON dicts (compacted, see payload.py), so a hit hands
+    # Dash something it can dump without going back through pandas or the
+    # Plotly validators.
+    # Eviction is least-recently-used once max_entries is exceeded.
+
+    def __init__(self, builders, max_entries=32, name=None):
+        self.builders = builders  # figure name -> callable returning a go.Figure
+        self.name = name  # what the offline bundle files these figures under (see bundle.py)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = {}
+
+    def _lookup(self, key):
+        # caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return entry
+
+    def get(self, name, version, variant=None):
+        key = (name, version, variant)
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                metrics.lookup(self.name, name, 'hit')
+                return entry
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        # Only one thread builds a given figure; the others wait and then hit.
+        with build_lock:
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    metrics.lookup(self.name, name, 'hit')
+                    return entry
+            metrics.lookup(self.name, name, 'miss')
+            with metrics.figure_build(self.name, name):
+                fig = self.builders[name]()
+                with metrics.phase('serialization'):
+                    entry = figure_json(fig)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = entry
+                self._build_locks.pop(key, None)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def warm(self, version, names=None, variant=None):
+        for name in names or self.builders:
+            self.get(name, version, variant)
+
+    def invalidate(self, keep_version=None):
+        # Drop every entry that does not belong to keep_version (all of them when None).
+        with self._lock:
+            for key in [k for k in self._entries if k[1] != keep_version]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,495 @@
+# figures.py
+#
+# Every Plotly figure on the dashboard.  Kept apart from app.py so that
+# importing the app does not pull in pandas, NumPy and plotly.express; the
+# app imports this module the first time it has to build a figure.
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from dataset import current_view
+from distributions import box_stats, violin_summary
+
+
+def no_data_figure(text="No rows match the current filter"):
+    # Stands in for a chart when the cross-filter leaves it no rows
+    fig = go.Figure()
+    fig.add_annotation(text=text, showarrow=False,
+                       font=dict(size=16), xref='paper', yref='paper', x=0.5, y=0.5)
+    fig.update_layout(xaxis_visible=False, yaxis_visible=False)
+    return fig
+
+
+def weighting_note(fig):
+    # Weighted figures say so in their title
+    weight = current_view().weight
+    if weight is not None and fig.layout.title.text:
+        fig.update_layout(title_text=f"{fig.layout.title.text} (population estimates, weighted by {weight})")
+    return fig
+
+
+# How the age violin is drawn: 'density' sends KDE curves, box statistics and a
+# stratified sample of at most AGE_POINT_BUDGET points; 'raw' sends every row
+AGE_PLOT_MODE = 'density'
+AGE_POINT_BUDGET = 2000
+
+def age_distribution_plot(mode=None, max_points=None):
+    data = current_view()
+    title = 'Distribution of Age by Income Level'
+    labels = {'income': 'Income Level', 'age': 'Age'}
+    # the raw violin shows rows, so it has no weighted form
+    if (mode or AGE_PLOT_MODE) == 'density' or data.df is None or data.weight is not None:
+        return density_violin(data, 'income', 'age', title, labels,
+                              max_points if max_points is not None else AGE_POINT_BUDGET)
+
+    fig = px.violin(data.df, x='income', y='age', 
+                    title=title,
+                    labels=labels, 
+                    box=True, points='all') # Box=True adds a mini box plot inside the violin plot
+    return fig
+
+def density_violin(data, x, y, title, labels, max_points):
+    # Looks like px.violin(box=True, points='all') but is drawn from server-side
+    # summaries, so the payload no longer grows with the number of rows
+    groups, histograms = data.histograms(x, y)
+    color = px.colors.qualitative.Plotly[0]
+    fill = 'rgba(99, 110, 250, 0.5)'
+    half = 0.25  # half the violin width, in category units
+    rng = np.random.default_rng(0)
+
+    fig = go.Figure()
+    summaries = []
+    for pos, (vals, counts) in enumerate(histograms):
+        if not len(vals):
+            # a cross-filter can leave a group without rows
+            summaries.append(None)
+            continue
+        s = violin_summary(vals, counts)
+        summaries.append(s)
+        width = half * s['density'] / s['density'].max()
+        fig.add_trace(go.Scatter(
+            x=np.r_[pos - width, pos + width[::-1]].astype(np.float32),
+            y=np.r_[s['grid'], s['grid'][::-1]].astype(np.float32),
+            mode='lines', fill='toself', fillcolor=fill, line=dict(color=color, width=2),
+            hoverinfo='skip', showlegend=False))
+        fig.add_trace(go.Box(
+            x=[pos], q1=[s['q1']], median=[s['median']], q3=[s['q3']],
+            lowerfence=[s['lowerfence']], upperfence=[s['upperfence']],
+            width=half / 2, boxpoints=False, fillcolor=fill, line=dict(color=color),
+            name=str(groups[pos]), showlegend=False))
+
+    # Sampled points sit to the left of each violin, jittered in proportion to
+    # the density at their value, as plotly does with points='all'
+    for pos, (s, mine) in enumerate(zip(summaries, data.sample(x, y, max_points))):
+        if s is None:
+            continue
+        spread = np.interp(mine, s['grid'], s['density']) / s['density'].max()
+        jitter = rng.uniform(-0.3, 0.3, len(mine)) * half * spread
+        fig.add_trace(go.Scatter(
+            x=(pos - 1.5 * half + jitter).astype(np.float32), y=mine,
+            mode='markers', marker=dict(color=color, size=6),
+            hovertemplate=f"{labels[x]}={groups[pos]}<br>{labels[y]}=%{{y}}<extra></extra>",
+            showlegend=False))
+
+    fig.update_layout(
+        title=title,
+        xaxis=dict(title=labels[x], tickmode='array', tickvals=list(range(len(groups))),
+                   ticktext=[str(g) for g in groups]),
+        yaxis=dict(title=labels[y]),
+    )
+    return fig
+
+def hours_worked_plot():
+    # Quartiles, whiskers and outliers are computed here once per income group,
+    # so the payload grows with the number of distinct outlier values, not rows
+    groups, histograms = current_view().histograms('income', 'hours.per.week')
+    stats = [box_stats(vals, counts) for vals, counts in histograms if len(vals)]
+    names = [str(g) for g, (vals, _) in zip(groups, histograms) if len(vals)]
+    color = px.colors.qualitative.Plotly[0]
+
+    fig = go.Figure(go.Box(
+        x=names,
+        q1=[s['q1'] for s in stats], median=[s['median'] for s in stats], q3=[s['q3'] for s in stats],
+        lowerfence=[s['lowerfence'] for s in stats], upperfence=[s['upperfence'] for s in stats],
+        boxpoints=False, marker_color=color, showlegend=False))
+    for name, s in zip(names, stats):
+        fig.add_trace(go.Scatter(
+            x=[name] * len(s['outliers']), y=s['outliers'], customdata=s['outlier_counts'],
+            mode='markers', marker=dict(color=color, size=6), showlegend=False,
+            hovertemplate='Income Group=%{x}<br>Hours per Week=%{y}<br>Rows=%{customdata}<extra></extra>'))
+
+    fig.update_layout(
+        title='Distribution of Hours Worked per Week by Income Group',
+        xaxis_title='Income Group',
+        yaxis_title='Hours per Week',
+    )
+    return fig
+
+def marital_status_plot():
+    color_map = {
+    '<=50K': '#008080',
+    '>50K': '#4EBCBA'
+}   
+
+    counts = current_view().cube.size(['marital.status', 'income']).reset_index(name='count')
+    fig = px.bar(counts, x='marital.status', y='count', color='income',
+             title='Income Distribution by Marital Status',
+             labels={'marital.status': 'Marital Status', 'count': 'Count', 'income': 'Income Level'},
+             color_discrete_map=color_map,
+             barmode='group')
+    return fig
+
+
+def racial_status_stacked_plot():
+    # Aggregate the data
+    aggregated_df = current_view().cube.size(['race', 'income']).reset_index(name='count')
+    heatmap_df = aggregated_df.pivot(index='race', columns='income', values='count')
+    fig = px.imshow(heatmap_df,
+                color_continuous_scale='Viridis',
+                labels={'x': 'Income', 'y': 'Race', 'color': 'Count of People'},
+                title='Income Distribution by Race',
+                text_auto=True)
+    fig.update_layout(
+        autosize=False,
+        width=800,  # Adjust the width as needed
+        height=450,  # Adjust the height as needed
+    )
+    return fig
+
+def workclass_gender_distribution():
+    color_map = {
+    '<=50K': '#FFD6A5',
+    '>50K': '#FFADAD'
+}
+
+    counts = current_view().cube.size(['workclass', 'sex']).reset_index(name='count')
+    fig = px.bar(counts, x='workclass', y='count', color='sex',
+             title='Distribution of Work Class Across Different Gender',
+             labels={'workclass': 'Workclass', 'count': 'Count', 'sex': 'Gender'},
+             color_discrete_map=color_map,
+             barmode='stack',
+             text='count')
+    fig.update_layout(
+        width=700,
+        height=400,
+        title_x=0.5,
+        title_y=0.95
+    )
+
+    return fig
+
+def education_level_plot():
+    # Education levels ordered by education.num, taken from the whole dataset
+    # behind the view so the order survives any filter
+    data = current_view()
+    ordered_education_levels = getattr(data, 'dataset', data).ordered_levels('education', 'education.num')
+
+
+    color_map = {
+    '<=50K': '#99BAB9',
+    '>50K': '#CCD5AE'
+    }
+
+    counts = data.cube.size(['education', 'income']).reset_index(name='count')
+    fig = px.bar(counts, x='education', y='count', color='income',
+             title='Distribution of Work Class Across Different Gender',
+             labels={'education': 'edu', 'income': 'income'},
+             category_orders={'education': ordered_education_levels},
+             color_discrete_map=color_map,
+             barmode='group')
+    return fig
+
+# Above this many rows the hours/capital-gain chart bins the points into a 2-D
+# histogram instead of sending one WebGL marker per row
+SCATTER_MAX_POINTS = 50_000
+SCATTER_BINS = (50, 50)
+
+
+def hour_captial_gain_plot(by=None):
+    # Hours vs capital gain with a least-squares trend line, or one per value
+    # of `by` (income, workclass)
+    data = current_view()
+    x, y = 'hours.per.week', 'capital.gain'
+    if data.df is None:
+        return no_data_figure("This chart needs the row-level data, not a pre-aggregated summary")
+
+    fig = go.Figure()
+    if data.n_rows > SCATTER_MAX_POINTS:
+        counts, x_edges, y_edges = data.histogram2d(x, y, SCATTER_BINS)
+        counts = np.where(counts > 0, counts, np.nan).T  # heatmap rows run along y
+        fig.add_trace(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.log10(counts), customdata=counts, colorscale='Blues', name='rows',
+            colorbar=dict(title='Count (log10)'),
+            hovertemplate='Hours %{x:.0f}, capital gain %{y:,.0f}: %{customdata:,.0f}<extra></extra>',
+        ))
+    else:
+        fig.add_trace(go.Scattergl(
+            x=data.df[x].to_numpy(np.float32), y=data.df[y].to_numpy(np.float32),
+            mode='markers', name='rows', marker=dict(size=4, opacity=0.4, color='#636efa'),
+        ))
+
+    lo, hi = data.df[x].min(), data.df[x].max()
+    colors = px.colors.qualitative.Plotly
+    for i, (group, slope, intercept) in enumerate(zip(*data.fits(x, y, by))):
+        if np.isnan(slope):
+            continue
+        fig.add_trace(go.Scattergl(
+            x=[lo, hi], y=[intercept + slope * lo, intercept + slope * hi], mode='lines',
+            name='OLS fit' if by is None else f'{group} fit',
+            line=dict(color='red' if by is None else colors[i % len(colors)], width=3),
+            hovertemplate=f'{group}: capital gain = {intercept:,.0f} + {slope:,.1f} × hours<extra></extra>',
+        ))
+    fig.update_layout(
+        title='Relationship between Hours Worked per Week and Capital Gain',
+        xaxis_title='Hours per Week', yaxis_title='Capital gain',
+    )
+    return fig
+
+ 
+def hours_by(path):
+    return current_view().totals(path, 'hours.per.week')
+
+
+def sunburst() : 
+    fig = px.sunburst(
+    hours_by(['income', 'occupation']),
+    path=['income', 'occupation'],
+    values='hours.per.week',
+    color='income',
+    color_discrete_map={'>50K': "#e27c7c", '<=50K': "#a86464"},
+    hover_data={'hours.per.week': True}
+)
+
+
+    # Update Layout
+    fig.update_layout(
+        title='Distribution of Hours Per Week by Income and Occupation',
+        width=550,
+        height=500,
+        title_x=0.5,
+        title_y=0.95
+    )
+
+    # Add Annotation
+    fig.add_annotation(
+        text="Size of each segment represents the average hours per week.",
+        xref='paper',
+        yref='paper',
+        x=0.5,
+        y=-0.1,
+        showarrow=False,
+        font=dict(size=14, color="black"),
+        align='center'
+    )
+
+    return fig
+
+# Workclass facets of the occupation chart shown at a time
+OCCUPATION_FACETS_PER_PAGE = 3
+
+
+def occupation_facet_pages():
+    workclasses = current_view().cube.labels['workclass']
+    return max(1, -(-len(workclasses) // OCCUPATION_FACETS_PER_PAGE))
+
+
+def multivariate1(page=0):
+    # Occupation by income, one facet per workclass and
+    # OCCUPATION_FACETS_PER_PAGE facets to a page.  The bars come from the
+    # cube's workclass x occupation x income counts with every occupation
+    # kept, so the payload depends on the number of categories, not of rows.
+    cube = current_view().cube
+    counts = cube.marginal(['workclass', 'occupation', 'income'])
+    workclasses = [str(w) for w in cube.labels['workclass']]
+    occupations = [str(o) for o in cube.labels['occupation']]
+    incomes = [str(i) for i in cube.labels['income']]
+    color_map = {
+        '<=50K': '#ffb400',
+        '>50K': '#a57c1b'
+    }
+
+    first = page * OCCUPATION_FACETS_PER_PAGE
+    shown = range(first, min(first + OCCUPATION_FACETS_PER_PAGE, len(workclasses)))
+    fig = make_subplots(rows=1, cols=OCCUPATION_FACETS_PER_PAGE, shared_yaxes=True,
+                        horizontal_spacing=0.02,
+                        subplot_titles=[f'workclass={workclasses[w]}' for w in shown])
+    for col, w in enumerate(shown, start=1):
+        for i, income in enumerate(incomes):
+            fig.add_trace(go.Bar(x=occupations, y=counts[w, :, i], name=income,
+                                 marker_color=color_map.get(income), legendgroup=income,
+                                 showlegend=col == 1),
+                          row=1, col=col)
+
+    # Update layout properties
+    fig.update_layout(
+        barmode='group',
+        height=500,
+        title=f'Distribution of Occupation by Income, Workclass '
+              f'({first + 1}{f"-{shown.stop}" if len(shown) > 1 else ""} of {len(workclasses)} work classes)',
+        title_x=0.5,      # Center the title
+        title_y=0.95,     # Position the title slightly below the top
+        yaxis_title='Count',       # Y-axis title
+        legend_title_text='Income Level',
+        margin=dict(t=90, l=75, r=75, b=80),  # Set margins
+    )
+    fig.update_xaxes(title_text='Occupation', tickangle=45)
+    return fig
+
+
+def multivariate2(threshold=1000):
+    # Average capital gain, with countries seen fewer than `threshold` times grouped as 'Other'
+    df_aggregated = current_view().group_means(['native.country', 'race', 'workclass'], 'capital.gain',
+                                               fold={'native.country': threshold})
+
+    color_map = {
+        'White': '#f3a8c2',
+        'Black': '#f6d1de',
+        'Asian-Pac-Islander': '#f74fd0',
+        'Amer-Indian-Eskimo': '#a2a0a1',
+        'Other': "#75c2f9"
+    }
+
+    fig = px.bar(df_aggregated, x='workclass', y='capital.gain', color='race', 
+                facet_col='native.country', barmode='group',
+                title='Average Capital Gain by Work Class, Race, and Native Country',
+                labels={'workclass': 'Work Class', 'capital.gain': 'Average Capital Gain'},
+                color_discrete_map=color_map)
+
+    # Update layout
+    fig.update_layout(width=900, height=500, margin=dict(t=70, l=25, r=25, b=25))
+    return fig
+
+
+def workclass_workhour_tree():
+    fig = px.treemap(
+    hours_by(['income', 'workclass']),
+    path=['income', 'workclass'],
+    values='hours.per.week',
+    color='income',
+    title="Distribution of Hours Per Week by Income and Workclass",
+    color_discrete_map={'>50K': "#e27c7c", '<=50K': "#a86464"},
+    hover_data={'hours.per.week': True}
+)
+    # Update Layout
+    fig.update_layout(
+        width=650,
+        height=500,
+        title_x=0.5,
+        title_y=0.95
+    )
+    
+
+    return fig
+
+def count_income_workclass_sex_income():
+    count_individuals = current_view().cube.size(['workclass', 'sex', 'income']).reset_index(name='count')
+    fig = px.bar(count_individuals, 
+                               x='workclass', 
+                               y='count', 
+                               color='workclass',
+                               facet_col='sex',
+                               facet_row='income',
+                               text='count',
+                               title='Count of Individuals by Work Class, Sex, and Income',
+                               labels={'workclass': 'Work Class', 'count': 'Count of Individuals'}
+                               )
+    fig.update_layout(
+        autosize=False,
+        width=800,  # Adjust the width as needed
+        height=600  # Adjust the height as needed
+    )
+
+    #fig_count_individuals.update_xaxes(title_text='Work Class')
+    #fig_count_individuals.update_yaxes(title_text='Count of Individuals')
+    #fig.for_each_annotation(lambda a: a.update(text=f"<b>{a.text.split('=')[-1]}</b>"))  # Clean and bold facet titles
+
+    return fig
+
+
+def proportion_count():
+    # Group by race, sex, and income, then calculate the proportion of individuals earning >50K
+    income_race_gender = (current_view().cube.size(['race', 'sex', 'income']).unstack(fill_value=0)
+                          .reindex(columns=['<=50K', '>50K'], fill_value=0))
+    income_race_gender['proportion_>50K'] = income_race_gender['>50K'] / (income_race_gender['<=50K'] + income_race_gender['>50K'])
+    income_race_gender_proportions = income_race_gender[['proportion_>50K']].reset_index()
+
+    color_discrete_map = {
+        'White': '#CCD3CA',
+        'Black': '#B5C0D0',
+        'Asian-Pac-Islander': '#E2BFB3',
+        'Amer-Indian-Eskimo': '#EED3D9',
+        'Other': '#AEABAA',
+    }
+
+    fig = px.pie(income_race_gender_proportions, 
+                 names='race', 
+                 values='proportion_>50K', 
+                 color='race', 
+                 color_discrete_map=color_discrete_map,
+                 title='Proportion of Individuals Earning > 50K by Race and Gender',
+                 facet_col='sex')
+
+    # Clean and bold facet titles
+    fig.for_each_annotation(lambda a: a.update(text=f"<b>{a.text.split('=')[-1]}</b>"))
+    fig.update_layout(
+        autosize=False,
+        width=600,  # Adjust the width as needed
+        height=400  # Adjust the height as needed
+    )
+
+    return fig
+
+
+def country_capital_map(selected_filter):
+    # Drawn from the per-country summary table; countries are already ISO-3 codes.
+    # Weighted, the count is the summed weight: an estimate of the population.
+    data = current_view()
+    table = data.country_summary()
+    df_avg = table[table['iso3'].notna()].rename(columns={
+        f'{selected_filter}_mean': selected_filter,
+        f'{selected_filter}_median': 'median',
+    })
+
+    fig = px.choropleth(
+        df_avg,
+        locations='iso3',
+        locationmode='ISO-3',
+        color=selected_filter,
+        hover_name="native.country",
+        hover_data={'iso3': False, 'median': True, 'count': True},
+        color_continuous_scale=px.colors.sequential.Plasma,
+        labels={'count': 'estimated population'} if data.weight is not None else None,
+        title=f'Average {selected_filter.replace(".", " ").title()} by Country'
+    )
+    return fig
+
+
+def query_figure(result, dim_labels=None, measure_labels=None):
+    # Bars of a query.py result: the first group-by column along the x axis,
+    # the second as colour, the third as facets
+    query = result['query']
+    dims, agg, measure = query['group_by'], query['agg'], query['measure']
+    dim_labels, measure_labels = dim_labels or {}, measure_labels or {}
+    df = pd.DataFrame(result['data'])
+    if df.empty:
+        return no_data_figure()
+    if agg == 'count':
+        value = 'People (estimated)' if query['weighted'] else 'Rows'
+    else:
+        value = f"{agg.title()} of {measure_labels.get(measure, measure)}"
+    title = f"{value} by {', '.join(dim_labels.get(dim, dim) for dim in dims)}" if dims else value
+    if not dims:
+        dims = ['all']
+        df['all'] = 'All rows'
+    df[dims] = df[dims].astype(str)  # numeric columns too are categories here
+    if query['weighted']:
+        title += ' (population estimates, weighted by fnlwgt)'
+    fig = px.bar(df, x=dims[0], y=agg,
+                 color=dims[1] if len(dims) > 1 else None,
+                 facet_col=dims[2] if len(dims) > 2 else None, facet_col_wrap=3,
+                 barmode='group', title=title,
+                 labels=dict({agg: value}, **{dim: dim_labels.get(dim, dim) for dim in dims}))
+    fig.for_each_annotation(lambda a: a.update(text=a.text.split('=')[-1]))
+    return fig
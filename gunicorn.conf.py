@@ -0,0 +1,12 @@
+# gunicorn.conf.py -- settings for `gunicorn -c gunicorn.conf.py`
+import multiprocessing
+import os
+
+wsgi_app = 'wsgi:server'
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('DASHBOARD_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('DASHBOARD_THREADS', 2))
+# Build the data and figures once in the master and fork the workers from it
+preload_app = True
+timeout = 60
+accesslog = '-'
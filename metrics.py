@@ -0,0 +1,364 @@
+# metrics.py
+#
+# Where the time of a callback request goes, and how big its response is.
+# Every request to /_dash-update-component is split into phases:
+#
+#   aggregation    reading the numbers off the dataset (cube, histograms, ...)
+#   construction   building the Plotly figure from them
+#   serialization  the figure to JSON for the cache, and Dash's response dump
+#   other          the rest of the callback
+#
+# Timing is exclusive: a phase entered inside another pauses the outer one's
+# clock, so aggregation done while a figure is built is not counted twice.
+# Alongside the phases each callback records its response bytes and its
+# figure-cache hits, and each figure function its build time per phase.
+# All of it is served at /metrics in the Prometheus text format.  Under
+# gunicorn every worker keeps its own numbers; /metrics shows the worker
+# that answered.
+#
+# With profile_slowest=N the requests are also run under cProfile and the
+# profiles of the N slowest so far are kept in profile_dir, for
+# `python -m pstats <file>`.
+import cProfile
+import heapq
+import itertools
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+# upper bounds (seconds) of the request duration histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+CALLBACK_PATH = '/_dash-update-component'
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class _Record:
+    # Phase seconds and cache lookups of one request or one figure build
+    def __init__(self):
+        self.phases = defaultdict(float)
+        self.lookups = defaultdict(int)  # 'hit' / 'miss' / 'bundle' -> count
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+        _local.records = []
+    return stack
+
+
+def _accrue(name, seconds):
+    for record in _local.records:
+        record.phases[name] += seconds
+
+
+def _checkpoint():
+    # Count the running phase's time so far towards the records open now
+    stack = _stack()
+    if stack:
+        now = time.perf_counter()
+        _accrue(stack[-1][0], now - stack[-1][1])
+        stack[-1][1] = now
+
+
+class phase:
+    # `with phase('aggregation'):` counts the time inside towards that phase
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        stack = _stack()
+        now = time.perf_counter()
+        if stack:
+            outer = stack[-1]
+            _accrue(outer[0], now - outer[1])
+        stack.append([self.name, now])
+
+    def __exit__(self, *exc):
+        stack = _local.stack
+        now = time.perf_counter()
+        name, start = stack.pop()
+        _accrue(name, now - start)
+        if stack:
+            stack[-1][1] = now
+
+
+def timed(name):
+    # Decorator: every call of the function is counted towards phase `name`
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _Recording:
+    # Collect the phases of everything run inside into a new _Record
+    def __enter__(self):
+        _checkpoint()
+        self.record = _Record()
+        _local.records.append(self.record)
+        return self.record
+
+    def __exit__(self, *exc):
+        _checkpoint()
+        _local.records.remove(self.record)
+
+
+class Registry:
+    # Totals since the process started, per callback and per figure function
+
+    def __init__(self):
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.seconds = defaultdict(float)  # (callback, phase)
+        self.response_bytes = defaultdict(int)
+        self.durations = defaultdict(lambda: [0] * (len(BUCKETS) + 1))  # callback -> bucket counts
+        self.duration_sum = defaultdict(float)
+        self.callback_lookups = defaultdict(int)  # (callback, result)
+        self.figure_lookups = defaultdict(int)  # (cache, figure, result)
+        self.build_seconds = defaultdict(float)  # (cache, figure, phase)
+
+    def add_request(self, callback, record, duration, size, status):
+        with _lock:
+            self.requests[callback] += 1
+            if status >= 400:
+                self.errors[callback] += 1
+            for name, seconds in record.phases.items():
+                self.seconds[callback, name] += seconds
+            self.response_bytes[callback] += size
+            buckets = self.durations[callback]
+            buckets[next((i for i, bound in enumerate(BUCKETS) if duration <= bound), len(BUCKETS))] += 1
+            self.duration_sum[callback] += duration
+            for result, n in record.lookups.items():
+                self.callback_lookups[callback, result] += n
+
+    def add_build(self, cache, figure, record):
+        with _lock:
+            for name, seconds in record.phases.items():
+                self.build_seconds[cache, figure, name] += seconds
+
+    def add_lookup(self, cache, figure, result):
+        with _lock:
+            self.figure_lookups[cache, figure, result] += 1
+        for record in getattr(_local, 'records', ()):
+            record.lookups[result] += 1
+
+
+registry = Registry()
+
+
+def figure_build(cache, figure):
+    # Context manager around building one figure; its phases go to the
+    # figure function's totals as well as to the request's
+    return _FigureBuild(cache, figure)
+
+
+class _FigureBuild(_Recording):
+    # Counted as construction, less the phases entered inside
+    def __init__(self, cache, figure):
+        self.cache, self.figure = cache, str(figure)
+        self.construction = phase('construction')
+
+    def __enter__(self):
+        self.construction.__enter__()
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.construction.__exit__(*exc)
+        registry.add_build(self.cache, self.figure, self.record)
+
+
+def lookup(cache, figure, result):
+    # A figure was asked of `cache`: result is 'hit', 'miss' or 'bundle'
+    registry.add_lookup(cache, str(figure), result)
+
+
+def instrument(fn):
+    # Decorator for a Dash callback, under @callback: names the request after
+    # the function and counts the callback's own time as 'other'
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        request = getattr(_local, 'request', None)
+        if request is not None:
+            request['callback'] = fn.__name__
+        try:
+            with phase('other'):
+                return fn(*args, **kwargs)
+        finally:
+            if request is not None:
+                request['returned'] = time.perf_counter()
+    return wrapper
+
+
+class SlowestProfiles:
+    # cProfile dumps of the `keep` slowest requests so far, in `path`.  Only
+    # one request is profiled at a time; requests overlapping it run as usual.
+
+    def __init__(self, keep, path):
+        self.keep = keep
+        self.path = path
+        self._slowest = []  # heap of (seconds, n, file)
+        self._count = itertools.count()
+        self._busy = threading.Lock()
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def start(self):
+        if not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def abandon(self, profile):
+        profile.disable()
+        self._busy.release()
+
+    def stop(self, profile, callback, seconds):
+        self.abandon(profile)
+        with self._lock:
+            if len(self._slowest) >= self.keep and seconds <= self._slowest[0][0]:
+                return
+            n = next(self._count)
+            file = os.path.join(self.path, f'{callback}-{seconds * 1000:.0f}ms-{n}.prof')
+            profile.dump_stats(file)
+            heapq.heappush(self._slowest, (seconds, n, file))
+            if len(self._slowest) > self.keep:
+                _, _, dropped = heapq.heappop(self._slowest)
+                os.remove(dropped)
+
+    def files(self):
+        with self._lock:
+            return [file for _, _, file in sorted(self._slowest, reverse=True)]
+
+
+def install(server, figure_caches=(), profile_slowest=0, profile_dir='profiles'):
+    # Time every callback request of the Flask `server` and serve /metrics
+    from flask import Response, request
+
+    profiles = SlowestProfiles(profile_slowest, profile_dir) if profile_slowest else None
+
+    @server.before_request
+    def start_request():
+        if request.path != CALLBACK_PATH:
+            return
+        record = _Record()
+        _local.stack, _local.records = [], [record]
+        _local.request = {'callback': None, 'record': record, 'start': time.perf_counter(),
+                          'returned': None, 'profile': profiles and profiles.start()}
+
+    @server.after_request
+    def finish_request(response):
+        state = getattr(_local, 'request', None)
+        if state is None or request.path != CALLBACK_PATH:
+            return response
+        _local.request = None
+        _local.records.remove(state['record'])
+        now = time.perf_counter()
+        if state['returned'] is not None:  # Dash writing out what the callback returned
+            state['record'].phases['serialization'] += now - state['returned']
+        callback = state['callback'] or 'unknown'
+        duration = now - state['start']
+        if state['profile'] is not None:
+            profiles.stop(state['profile'], callback, duration)
+        size = 0 if response.direct_passthrough else len(response.get_data())
+        registry.add_request(callback, state['record'], duration, size, response.status_code)
+        return response
+
+    @server.teardown_request
+    def abandon_request(exc):
+        # after_request did not run (the request failed outside Flask's
+        # handlers): drop its record and free the profiler
+        state = getattr(_local, 'request', None)
+        if state is not None:
+            _local.request = None
+            _local.records = []
+            if state['profile'] is not None:
+                profiles.abandon(state['profile'])
+
+    @server.route('/metrics')
+    def serve_metrics():
+        return Response(prometheus_text(figure_caches), mimetype='text/plain; version=0.0.4')
+
+    return profiles
+
+
+# Prometheus text exposition
+
+def _escape(value):
+    return re.sub(r'([\\"])', r'\\\1', str(value)).replace('\n', r'\n')
+
+
+def _sample(name, labels, value):
+    value = value if isinstance(value, int) else repr(float(value))
+    if labels:
+        text = ','.join(f'{key}="{_escape(v)}"' for key, v in labels.items())
+        return f'{name}{{{text}}} {value}'
+    return f'{name} {value}'
+
+
+def _ratio(lookups, key):
+    hits = sum(n for k, n in lookups.items() if k[:-1] == key and k[-1] != 'miss')
+    total = sum(n for k, n in lookups.items() if k[:-1] == key)
+    return hits / total if total else 0.0
+
+
+def prometheus_text(figure_caches=()):
+    # Everything recorded so far, and the sizes of figure_caches (name -> FigureCache)
+    lines = []
+
+    def metric(name, kind, help, samples):
+        lines.append(f'# HELP {name} {help}')
+        lines.append(f'# TYPE {name} {kind}')
+        lines.extend(_sample(name, labels, value) for labels, value in samples)
+
+    with _lock:
+        metric('dashboard_callback_requests_total', 'counter', 'Callback requests served.',
+               [({'callback': cb}, n) for cb, n in sorted(registry.requests.items())])
+        metric('dashboard_callback_errors_total', 'counter', 'Callback requests answered with an error status.',
+               [({'callback': cb}, n) for cb, n in sorted(registry.errors.items())])
+        metric('dashboard_callback_phase_seconds_total', 'counter',
+               'Wall time of callback requests, by phase.',
+               [({'callback': cb, 'phase': ph}, s) for (cb, ph), s in sorted(registry.seconds.items())])
+        lines.append('# HELP dashboard_callback_duration_seconds Wall time of callback requests.')
+        lines.append('# TYPE dashboard_callback_duration_seconds histogram')
+        for cb, buckets in sorted(registry.durations.items()):
+            for bound, n in zip(BUCKETS + ('+Inf',), itertools.accumulate(buckets)):
+                lines.append(_sample('dashboard_callback_duration_seconds_bucket', {'callback': cb, 'le': bound}, n))
+            lines.append(_sample('dashboard_callback_duration_seconds_sum', {'callback': cb}, registry.duration_sum[cb]))
+            lines.append(_sample('dashboard_callback_duration_seconds_count', {'callback': cb}, sum(buckets)))
+        metric('dashboard_callback_response_bytes_total', 'counter', 'Bytes of callback responses.',
+               [({'callback': cb}, n) for cb, n in sorted(registry.response_bytes.items())])
+        metric('dashboard_callback_cache_lookups_total', 'counter',
+               'Figure lookups made by callbacks: hit, miss, or served from the bundle.',
+               [({'callback': cb, 'result': r}, n) for (cb, r), n in sorted(registry.callback_lookups.items())])
+        metric('dashboard_callback_cache_hit_ratio', 'gauge',
+               'Share of a callback\'s figure lookups that did not build the figure.',
+               [({'callback': cb}, _ratio(registry.callback_lookups, (cb,)))
+                for cb in sorted({k[0] for k in registry.callback_lookups})])
+        metric('dashboard_figure_cache_lookups_total', 'counter', 'Lookups of each figure.',
+               [({'cache': c, 'figure': f, 'result': r}, n)
+                for (c, f, r), n in sorted(registry.figure_lookups.items())])
+        metric('dashboard_figure_cache_hit_ratio', 'gauge',
+               'Share of lookups of each figure that did not build it.',
+               [({'cache': c, 'figure': f}, _ratio(registry.figure_lookups, (c, f)))
+                for c, f in sorted({k[:2] for k in registry.figure_lookups})])
+        metric('dashboard_figure_build_seconds_total', 'counter',
+               'Time spent building each figure, by phase.',
+               [({'cache': c, 'figure': f, 'phase': ph}, s)
+                for (c, f, ph), s in sorted(registry.build_seconds.items())])
+    stats = {name: cache.stats() for name, cache in dict(figure_caches).items()}
+    metric('dashboard_figure_cache_entries', 'gauge', 'Figures held by each cache.',
+           [({'cache': name}, s['entries']) for name, s in stats.items()])
+    metric('dashboard_figure_cache_evictions_total', 'counter', 'Figures evicted from each cache.',
+           [({'cache': name}, s['evictions']) for name, s in stats.items()])
+    return '\n'.join(lines) + '\n'
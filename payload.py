@@ -0,0 +1,153 @@
+# payload.py
+#
+# What goes over the wire: figures as compact JSON, and responses compressed.
+#
+# plotly already writes numpy arrays as base64 typed arrays ({'dtype', 'bdata'}),
+# but as float64 or int64 whatever the values.  figure_json() narrows each one
+# to the smallest type holding its values exactly -- counts, hours and dollar
+# amounts become 1-, 2- or 4-byte integers -- and rounds the remaining floats
+# to the digits a hover label shows.  It also keeps only the parts of the
+# plotly template that apply to the figure's trace types; the rest (defaults
+# for 3-D scenes, polar plots, carpets, ...) is most of every small figure.
+#
+# install() compresses the Flask responses: brotli when the client accepts
+# it and the brotli package is installed, gzip otherwise.  Dash's JavaScript
+# bundles are the same bytes on every request, so those are compressed once.
+import base64
+import gzip
+import json
+import threading
+
+SIGNIFICANT = 6  # digits kept of a float that is not a whole number
+# narrowest first; plotly.js decodes each of these
+INT_DTYPES = ['u1', 'i1', 'u2', 'i2', 'u4', 'i4']
+# template.layout entries drawn only by traces of these types
+SUBPLOT_TRACES = {
+    'geo': {'choropleth', 'scattergeo'},
+    'mapbox': {'scattermapbox', 'choroplethmapbox', 'densitymapbox'},
+    'polar': {'scatterpolar', 'scatterpolargl', 'barpolar'},
+    'ternary': {'scatterternary'},
+    'scene': {'scatter3d', 'surface', 'mesh3d', 'cone', 'streamtube', 'volume', 'isosurface'},
+}
+
+COMPRESSIBLE = ('application/json', 'application/javascript', 'text/')
+MIN_BYTES = 1024  # below this the headers outweigh what is saved
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def figure_json(fig):
+    # The JSON-ready dict Dash sends for the plotly figure `fig`, made compact
+    entry = json.loads(fig.to_json())
+    for trace in entry.get('data', []):
+        _compact(trace)
+    template = entry.get('layout', {}).get('template')
+    if template:
+        _strip_template(template, {trace.get('type', 'scatter') for trace in entry.get('data', [])})
+    return entry
+
+
+def _compact(node):
+    # Narrow the typed arrays and round the float lists of a trace, in place
+    for key, value in node.items():
+        if isinstance(value, dict):
+            if 'bdata' in value and 'dtype' in value:
+                node[key] = compact_array(value)
+            else:
+                _compact(value)
+        elif isinstance(value, list) and value:
+            if all(isinstance(x, float) for x in value):
+                node[key] = [float(f'{x:.{SIGNIFICANT}g}') for x in value]
+            else:
+                for item in value:
+                    if isinstance(item, dict):
+                        _compact(item)
+
+
+def compact_array(spec):
+    # A plotly typed-array spec with its values in the narrowest dtype
+    import numpy as np
+    values = np.frombuffer(base64.b64decode(spec['bdata']), dtype=spec['dtype'])
+    if not values.size:
+        return spec
+    if values.dtype.kind == 'f':
+        if not np.isfinite(values).all() or not np.array_equal(values, np.round(values)):
+            if values.dtype.itemsize < 8:
+                return spec  # float32 already carries about as many digits as are shown
+            finite = np.isfinite(values) & (values != 0)
+            magnitude = np.floor(np.log10(np.abs(values, where=finite, out=np.ones_like(values))))
+            scale = 10.0 ** (SIGNIFICANT - 1 - magnitude)
+            values = np.where(finite, np.round(values * scale) / scale, values)
+            return dict(spec, bdata=base64.b64encode(values.tobytes()).decode('ascii'))
+    low, high = values.min(), values.max()
+    for dtype in INT_DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            if dtype == spec['dtype']:
+                return spec
+            return dict(spec, dtype=dtype,
+                        bdata=base64.b64encode(values.astype(dtype).tobytes()).decode('ascii'))
+    return spec
+
+
+def _strip_template(template, trace_types):
+    # Drop the template's defaults for traces and subplots the figure has none of
+    if 'data' in template:
+        template['data'] = {t: v for t, v in template['data'].items() if t in trace_types}
+    layout = template.get('layout', {})
+    for key, types in SUBPLOT_TRACES.items():
+        if key in layout and not types & trace_types:
+            del layout[key]
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        import brotli
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encodings():
+    # What this process can compress with, preferred first
+    try:
+        import brotli  # noqa: F401  optional: pip install brotli
+    except ImportError:
+        return ['gzip']
+    return ['br', 'gzip']
+
+
+def install(server, min_bytes=MIN_BYTES):
+    # Compress the responses of the Flask `server` for clients that accept it
+    from flask import request
+
+    offered = encodings()
+    static = {}  # (etag or path, encoding) -> compressed bytes of a response that never changes
+    static_lock = threading.Lock()
+
+    @server.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE)):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(offered)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < min_bytes:
+            return response
+        # Dash's bundles carry an ETag or, when fingerprinted, a year-long max-age
+        tag = response.get_etag()[0] or (request.path if response.cache_control.max_age else None)
+        if tag is None:
+            compressed = compress(body, encoding)
+        else:
+            with static_lock:
+                compressed = static.get((tag, encoding))
+            if compressed is None:
+                compressed = compress(body, encoding)
+                with static_lock:
+                    static[tag, encoding] = compressed
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,229 @@
+# query.py
+#
+# Ad-hoc breakdowns of the census columns: one measure aggregated per
+# combination of a few columns, over the rows matching some filters.  The
+# drill-down section of the page and POST /api/query both answer them.  A
+# query is a dict like
+#
+#   {'group_by': ['occupation', 'education', 'income'], 'agg': 'mean',
+#    'measure': 'hours.per.week', 'filters': {'sex': ['Female']}, 'weighted': false}
+#
+# Filters are a cross-filter selection (column -> values) and are resolved
+# with the bitmap index.  Counts grouped by cube columns are summed out of
+# the (filtered) cube, so they touch no rows at all; the rest is a bincount
+# over the matching rows' codes, with each column's codes computed once per
+# dataset.  Results are kept in an LRU cache keyed by the normalized query
+# and the dataset version, bounded by the bytes of their JSON.
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from aggregation import CUBE_DIMS, encode
+from crossfilter import INDEX_DIMS, view_for
+from crossfilter import normalize as normalize_selection
+from metrics import timed
+
+GROUP_DIMS = INDEX_DIMS + ['age', 'education.num', 'hours.per.week']
+MEASURES = ['age', 'education.num', 'hours.per.week', 'capital.gain', 'capital.loss']
+AGGREGATIONS = ['count', 'sum', 'mean', 'min', 'max']
+MAX_GROUP_BY = 4
+MAX_CELLS = 1 << 22  # past this many combinations, only the ones present are numbered
+
+
+class QueryError(ValueError):
+    # A query that cannot be answered; the message says why
+    pass
+
+
+def normalize(query):
+    # The canonical form of `query`, or QueryError.  The order of group_by is
+    # kept, since it is the order of the result's columns.
+    if not isinstance(query, dict):
+        raise QueryError("a query is a JSON object")
+    unknown = set(query) - {'group_by', 'agg', 'measure', 'filters', 'weighted'}
+    if unknown:
+        raise QueryError(f"unknown query fields {sorted(unknown)}")
+    group_by = query.get('group_by') or []
+    if isinstance(group_by, str):
+        group_by = [group_by]
+    if not isinstance(group_by, list) or not all(isinstance(dim, str) for dim in group_by):
+        raise QueryError("group_by is a column name or a list of them")
+    group_by = list(dict.fromkeys(group_by))
+    bad = [dim for dim in group_by if dim not in GROUP_DIMS]
+    if bad:
+        raise QueryError(f"cannot group by {bad}; choose from {GROUP_DIMS}")
+    if len(group_by) > MAX_GROUP_BY:
+        raise QueryError(f"group by at most {MAX_GROUP_BY} columns")
+    agg = query.get('agg') or 'count'
+    if agg not in AGGREGATIONS:
+        raise QueryError(f"unknown aggregation {agg!r}; choose from {AGGREGATIONS}")
+    measure = None
+    if agg != 'count':
+        measure = query.get('measure')
+        if measure not in MEASURES:
+            raise QueryError(f"{agg} needs a measure from {MEASURES}")
+    filters = query.get('filters') or {}
+    if not isinstance(filters, dict) or not all(isinstance(v, list) for v in filters.values()):
+        raise QueryError("filters map a column to a list of values")
+    bad = [dim for dim in filters if dim not in INDEX_DIMS]
+    if bad:
+        raise QueryError(f"cannot filter on {bad}; choose from {INDEX_DIMS}")
+    filters = normalize_selection({dim: [str(v) for v in values] for dim, values in filters.items()})
+    return {'group_by': group_by, 'agg': agg, 'measure': measure, 'filters': filters,
+            'weighted': bool(query.get('weighted'))}
+
+
+_codes = (None, {})
+
+
+def _encoded(df, dim):
+    # encode(df[dim]), remembered for as long as the same frame is passed in
+    global _codes
+    frame, by_dim = _codes
+    if frame is not df:
+        by_dim = {}
+        _codes = (df, by_dim)
+    if dim not in by_dim:
+        by_dim[dim] = encode(df[dim])
+    return by_dim[dim]
+
+
+def forget_codes():
+    global _codes
+    _codes = (None, {})
+
+
+@timed('aggregation')
+def evaluate(data, query):
+    # Answer the normalized `query` on the unweighted dataset `data`:
+    # {'columns': [...], 'data': {column: values}, 'rows': rows matched}
+    data = data.weighted if query['weighted'] else data
+    group_by, agg, measure, filters = query['group_by'], query['agg'], query['measure'], query['filters']
+    if data.df is None and (filters or agg != 'count' or not set(group_by) <= set(CUBE_DIMS)):
+        raise QueryError("this dataset is a summary; it can only count rows, "
+                         f"grouped by {CUBE_DIMS}, without filters")
+    view = view_for(data, filters)
+    if agg == 'count' and set(group_by) <= set(CUBE_DIMS):
+        cube = view.cube
+        if group_by:
+            counts = cube.size(group_by)
+            cells = [counts.index.get_level_values(i) for i in range(len(group_by))]
+            values = counts.to_numpy()
+        else:
+            cells, values = [], np.array([cube.counts.sum()])
+        return _result(group_by, agg, cells, values, view.n_rows)
+
+    rows = None if view is data else view.rows
+    taken = (lambda a: a) if rows is None else (lambda a: a[rows])
+    codes, labels = [], []
+    for dim in group_by:
+        dim_codes, dim_labels = _encoded(data.df, dim)
+        codes.append(taken(dim_codes))
+        labels.append(dim_labels)
+    n = view.n_rows
+    valid = np.logical_and.reduce([c >= 0 for c in codes]) if codes else np.ones(n, dtype=bool)
+    x = taken(data.df[measure].to_numpy()) if measure else None
+    if x is not None and x.dtype.kind == 'f':
+        valid &= ~np.isnan(x)
+    weights = taken(data.df[data.weight].to_numpy()).astype(np.float64) if data.weight else None
+    # counts and sums of integers are integers (bincount adds them up as floats)
+    integral = (x is None or x.dtype.kind in 'iu') and \
+        (weights is None or np.issubdtype(data.df[data.weight].dtype, np.integer))
+    if not valid.all():
+        codes = [c[valid] for c in codes]
+        x = None if x is None else x[valid]
+        weights = None if weights is None else weights[valid]
+
+    shape = tuple(len(level) for level in labels)
+    flat = np.ravel_multi_index(codes, shape) if codes else np.zeros(int(valid.sum()), dtype=np.intp)
+    size = int(np.prod(shape))
+    if size > MAX_CELLS:  # number only the combinations that occur
+        present, flat = np.unique(flat, return_inverse=True)
+        size = len(present)
+    else:
+        present = None
+    counts = np.bincount(flat, minlength=size)
+    cells = np.flatnonzero(counts)
+
+    if agg == 'count':
+        values = counts if weights is None else np.bincount(flat, weights, minlength=size)
+    elif agg in ('sum', 'mean'):
+        x = x.astype(np.float64)
+        values = np.bincount(flat, x if weights is None else x * weights, minlength=size)
+        if agg == 'mean':  # over the cells present only; the others would divide by zero
+            totals = counts if weights is None else np.bincount(flat, weights, minlength=size)
+            values[cells] /= totals[cells]
+    else:
+        order = np.argsort(flat, kind='stable')
+        ufunc = np.minimum if agg == 'min' else np.maximum
+        values = np.zeros(size, dtype=x.dtype)
+        if len(cells):
+            starts = np.concatenate([[0], np.cumsum(counts[cells])[:-1]])
+            values[cells] = ufunc.reduceat(x[order], starts)
+    values = values[cells]
+    if agg in ('count', 'sum') and integral:
+        values = np.rint(values).astype(np.int64)
+
+    if present is not None:
+        cells = present[cells]
+    indices = np.unravel_index(cells, shape) if codes else []
+    return _result(group_by, agg, [level[idx] for level, idx in zip(labels, indices)], values, n)
+
+
+def _result(group_by, agg, cells, values, n_rows):
+    columns = group_by + [agg]
+    data = {dim: np.asarray(level).tolist() for dim, level in zip(group_by, cells)}
+    data[agg] = np.asarray(values).tolist()
+    return {'columns': columns, 'data': data, 'rows': int(n_rows)}
+
+
+class QueryCache:
+    # Results keyed by (dataset version, normalized query), least recently
+    # used dropped first once their JSON exceeds max_bytes in total
+
+    def __init__(self, max_bytes=64 << 20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (result, bytes)
+        self._lock = threading.Lock()
+
+    def get(self, data, query):
+        # (result of `query` on `data`, whether it was cached); QueryError on a bad query
+        query = normalize(query)
+        key = (data.version, json.dumps(query, sort_keys=True))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+        result = dict(evaluate(data, query), query=query, version=data.version)
+        size = len(json.dumps(result))
+        with self._lock:
+            self.misses += 1
+            if size <= self.max_bytes and key not in self._entries:
+                self._entries[key] = (result, size)
+                self.bytes += size
+                while self.bytes > self.max_bytes:
+                    _, (_, dropped) = self._entries.popitem(last=False)
+                    self.bytes -= dropped
+                    self.evictions += 1
+        return result, False
+
+    def invalidate(self, keep_version=None):
+        # Drop every result that does not belong to keep_version (all of them when None)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] != keep_version]:
+                self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'hit_ratio': self.hits / lookups if lookups else 0.0}
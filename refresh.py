@@ -0,0 +1,119 @@
+# refresh.py
+#
+# Picking up a new drop of the data without a restart.  check() compares the
+# dataset being served with the files it was read from:
+#
+#   - rows appended to the CSV: only the new lines are parsed, and what was
+#     precomputed is extended with them instead of recomputed -- the count
+#     cubes of a loaded frame, or every table of a summary (counts, sums,
+#     means, sketches, samples all merge);
+#   - the CSV rewritten, or the summary or columnar store rebuilt: the data
+#     is read afresh;
+#   - otherwise nothing happens.
+#
+# The new version is built to the side while the old one keeps serving, then
+# swapped in with one assignment (dataset.swap), so a request sees one
+# version or the other, never a mix.  Figures are cached by version, so
+# nothing cached for the old one is served after the swap.
+#
+# The app runs check() from POST /admin/refresh (when DASHBOARD_ADMIN_TOKEN is
+# set) and from a polling thread (when DASHBOARD_REFRESH_INTERVAL is set).
+# Under gunicorn each worker refreshes its own copy.
+import logging
+import os
+import threading
+import time
+
+import dataset
+from data_store import appended_rows, dataset_version, store_path_for
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+def disk_version(path):
+    # Version of the data at `path` as a fresh load would report it
+    if os.path.isdir(path):
+        from summary import read_manifest
+        manifest = read_manifest(path)
+        return manifest and manifest['version']
+    if os.path.exists(path):
+        return dataset_version(path)
+    from data_store import read_manifest
+    manifest = read_manifest(store_path_for(path))
+    return manifest and manifest['version']
+
+
+def _refreshed(path, data):
+    # (the data at `path` brought up to date, what was done), or (None, what
+    # was found) when there is nothing newer to serve
+    state = data.source
+    if data.df is None:  # a summary: rebuilt, or the CSV it was folded from grown
+        if disk_version(path) != data.manifest_version:
+            return dataset.load(path), 'reloaded'
+        if state is None or not os.path.exists(state['path']) \
+                or dataset_version(state['path']) == data.version:
+            return None, 'unchanged'
+    else:
+        if disk_version(path) == data.version:
+            return None, 'unchanged'
+        if state is None or os.path.getsize(state['path']) <= state['size']:
+            return dataset.load(path), 'reloaded'
+
+    columns = list(data.df.columns) if data.df is not None else _csv_columns(state['path'])
+    added = appended_rows(state, columns)
+    if added is None and data.df is None:
+        logger.warning("%s was rewritten, not appended to; rebuild the summary with "
+                       "`python summary.py` to serve it", state['path'])
+        data.source = None  # stop looking at it
+        return None, 'source rewritten'
+    if added is None:
+        return dataset.load(path), 'reloaded'
+    rows, state = added
+    if rows.empty:
+        return None, 'unchanged'  # only part of a line so far
+    grown = data.appended(rows, f"{state['size']:x}-{os.stat(state['path']).st_mtime_ns:x}")
+    grown.source = state
+    return grown, f'appended {len(rows):,} rows'
+
+
+def _csv_columns(csv_path):
+    import pandas as pd
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def check(path=None, on_swap=None):
+    # Bring the data served from `path` (dataset.configure's by default) up
+    # to date with its files.  Returns what was done; on_swap(new dataset)
+    # runs after a new version is swapped in.
+    with _lock:
+        path, data = dataset.loaded(path)
+        if data is None:
+            return 'not loaded'  # read fresh on first use anyway
+        start = time.perf_counter()
+        new, done = _refreshed(path, data)
+        if new is None:
+            return done
+        if not dataset.swap(data, new, path):
+            return 'superseded'  # another refresh swapped in a version meanwhile
+        logger.info("data refreshed (%s) in %.2f s: version %s -> %s",
+                    done, time.perf_counter() - start, data.version, new.version)
+    if on_swap is not None:
+        on_swap(new)
+    return done
+
+
+def watch(interval, refresh):
+    # Call refresh() every `interval` seconds from a daemon thread; returns the thread
+    def poll():
+        while True:
+            time.sleep(interval)
+            try:
+                refresh()
+            except Exception:
+                logger.exception("data refresh failed; still serving the previous version")
+
+    thread = threading.Thread(target=poll, name='data-refresh', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,230 @@
+# render.py
+#
+# The static PNG charts in assets/, rendered from the data with matplotlib.
+#
+#   python render.py [--data refined_adult.csv] [--jobs 4] [--force]
+#
+# Each chart is drawn from a small aggregate of the data (counts, box
+# statistics) read off the dataset, never from the rows, so a pre-aggregated
+# summary works as well as the CSV.  The aggregate is hashed together with
+# the source of this module (the drawing functions and the helpers and
+# colours they use); a chart whose hash matches the one recorded in
+# assets/render-manifest.json is skipped, so after a data refresh only the
+# charts whose numbers moved are redrawn, in a process pool.
+#
+# The screenshots in assets/images/ are of the running dashboard and are not
+# rendered here.
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import dataset
+from distributions import box_stats
+
+ASSETS = 'assets'
+MANIFEST = os.path.join(ASSETS, 'render-manifest.json')
+DPI = 100
+BLUE, LIGHT_BLUE = '#1f77b4', '#aec7e8'
+
+
+def _pooled(hists):
+    # One (values, counts) histogram from per-group ones
+    values, inverse = np.unique(np.concatenate([v for v, _ in hists]), return_inverse=True)
+    counts = np.bincount(inverse, np.concatenate([c for _, c in hists]), minlength=len(values))
+    return values, counts
+
+
+def _bxp(stats, label):
+    # distributions.box_stats in the form Axes.bxp takes
+    return {'label': label, 'med': stats['median'], 'q1': stats['q1'], 'q3': stats['q3'],
+            'whislo': stats['lowerfence'], 'whishi': stats['upperfence'],
+            'fliers': np.asarray(stats['outliers'], dtype=float)}
+
+
+# What each chart is drawn from
+
+def age_histogram_inputs(data):
+    values, counts = _pooled(data.histograms('income', 'age')[1])
+    counts, edges = np.histogram(values, bins=np.arange(10, 100, 10), weights=counts)
+    return {'counts': counts.tolist(), 'edges': edges.tolist()}
+
+
+def age_box_inputs(data):
+    return {'box': _bxp(box_stats(*_pooled(data.histograms('income', 'age')[1])), '')}
+
+
+def age_workclass_inputs(data):
+    groups, hists = data.histograms('workclass', 'age')
+    return {'boxes': [_bxp(box_stats(v, c), str(g)) for g, (v, c) in zip(groups, hists) if len(v)]}
+
+
+def stacked_inputs(data, x, stack):
+    table = data.cube.size([x, stack]).unstack(stack, fill_value=0)
+    return {'x': [str(v) for v in table.index],
+            'stacks': {str(col): table[col].tolist() for col in table.columns}}
+
+
+# How each chart is drawn.  These run in the worker processes.
+
+def _axes(title, xlabel, ylabel, size=(7.5, 4.7)):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=size, dpi=DPI)
+    ax.set_title(title, fontweight='bold')
+    ax.set_xlabel(xlabel, fontweight='bold')
+    ax.set_ylabel(ylabel, fontweight='bold')
+    ax.grid(axis='y', color='#dddddd')
+    ax.set_axisbelow(True)
+    for side in ('top', 'right'):
+        ax.spines[side].set_visible(False)
+    return fig, ax
+
+
+def _thousands(ax):
+    from matplotlib.ticker import StrMethodFormatter
+    ax.yaxis.set_major_formatter(StrMethodFormatter('{x:,.0f}'))
+
+
+def draw_age_histogram(inputs):
+    fig, ax = _axes('Histogram of Age', 'Age', 'Count of Records', size=(6.6, 4.6))
+    edges = np.asarray(inputs['edges'])
+    ax.bar(edges[:-1], inputs['counts'], width=np.diff(edges), align='edge',
+           color='#4c78a8', edgecolor='white')
+    ax.set_xticks(edges)
+    _thousands(ax)
+    return fig
+
+
+def draw_age_box(inputs):
+    fig, ax = _axes('Box Plot of Age', '', 'Age', size=(6.4, 4.4))
+    ax.bxp([inputs['box']], widths=0.05, patch_artist=True, showfliers=True,
+           boxprops={'facecolor': '#4c78a8', 'edgecolor': '#4c78a8'},
+           medianprops={'color': 'white'},
+           flierprops={'marker': 'o', 'markerfacecolor': 'none', 'markeredgecolor': '#4c78a8'})
+    ax.set_ylim(bottom=0)
+    ax.set_xticks([])
+    return fig
+
+
+def draw_age_workclass(inputs):
+    fig, ax = _axes('Age Distribution Across Work Classes', 'Work Class', 'Age', size=(5.5, 4.6))
+    boxes = inputs['boxes']
+    parts = ax.bxp(boxes, widths=0.3, patch_artist=True, showfliers=True,
+                   medianprops={'color': 'white'})
+    colors = [f'C{i}' for i in range(len(boxes))]
+    for box, fliers, color in zip(parts['boxes'], parts['fliers'], colors):
+        box.set(facecolor=color, edgecolor=color)
+        fliers.set(marker='o', markerfacecolor='none', markeredgecolor=color)
+    ax.set_ylim(bottom=0)
+    ax.tick_params(axis='x', labelrotation=90)
+    return fig
+
+
+def draw_stacked(inputs, title, xlabel, legend):
+    fig, ax = _axes(title, xlabel, 'Count')
+    bottom = np.zeros(len(inputs['x']))
+    for (label, counts), color in zip(inputs['stacks'].items(), [BLUE, LIGHT_BLUE, 'C1', 'C2']):
+        ax.bar(inputs['x'], counts, bottom=bottom, label=label, color=color)
+        bottom += counts
+    ax.legend(title=legend, frameon=False, loc='upper left', bbox_to_anchor=(1, 1))
+    _thousands(ax)
+    return fig
+
+
+# name -> (inputs from the dataset, drawing function, its extra arguments)
+CHARTS = {
+    'histogram_age': (age_histogram_inputs, draw_age_histogram, ()),
+    'outlier': (age_box_inputs, draw_age_box, ()),
+    'age_workclass': (age_workclass_inputs, draw_age_workclass, ()),
+    'racial_group': (lambda data: stacked_inputs(data, 'race', 'income'), draw_stacked,
+                     ('Income Distribution by Racial Group', 'Racial Group', 'Income Level')),
+    'workclass_gender': (lambda data: stacked_inputs(data, 'workclass', 'sex'), draw_stacked,
+                         ('Distribution of Work Class Across Different Genders', 'Work Class', 'Gender')),
+}
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def chart_hash(name, inputs):
+    # Changes when the chart's numbers or the code drawing it change.  That
+    # is the whole module rather than just `draw`, which would miss an edit
+    # to a helper or a constant it uses.
+    args = CHARTS[name][2]
+    digest = hashlib.sha256()
+    digest.update(json.dumps([_jsonable(inputs), list(args)], sort_keys=True).encode())
+    with open(__file__, 'rb') as f:
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+def render_chart(name, inputs, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    _, draw, args = CHARTS[name]
+    fig = draw(inputs, *args)
+    fig.tight_layout()
+    # no Software/date metadata, so the same inputs give the same bytes
+    fig.savefig(path, dpi=DPI, metadata={'Software': None})
+    plt.close(fig)
+    return name
+
+
+def read_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_all(data_path=dataset.DEFAULT_PATH, jobs=None, force=False, names=None):
+    # Redraw the charts whose inputs changed; returns (rendered, skipped) names
+    dataset.configure(data_path)
+    data = dataset.current()
+    previous = read_manifest()
+    hashes, todo = {}, {}
+    for name in names or CHARTS:
+        inputs = CHARTS[name][0](data)
+        hashes[name] = chart_hash(name, inputs)
+        path = os.path.join(ASSETS, f'{name}.png')
+        if force or previous.get(name) != hashes[name] or not os.path.exists(path):
+            todo[name] = (inputs, path)
+
+    if todo:
+        with ProcessPoolExecutor(min(jobs or os.cpu_count() or 1, len(todo))) as pool:
+            list(pool.map(render_chart, todo, *zip(*todo.values())))
+    manifest = dict(previous, **hashes)
+    tmp = MANIFEST + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, MANIFEST)
+    return list(todo), [name for name in hashes if name not in todo]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('charts', nargs='*', help=f"charts to render (default: all of {', '.join(CHARTS)})")
+    parser.add_argument('--data', default=os.environ.get('DASHBOARD_DATA', dataset.DEFAULT_PATH))
+    parser.add_argument('--jobs', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--force', action='store_true', help='redraw even when the inputs did not change')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    rendered, skipped = render_all(args.data, args.jobs, args.force, args.charts or None)
+    print(f"rendered {len(rendered)} charts ({', '.join(rendered) or 'none'}), "
+          f"{len(skipped)} unchanged, in {time.perf_counter() - start:.1f} s")
@@ -0,0 +1,67 @@
+# scheduler.py
+#
+# Runs a batch of builds on a thread pool, each once everything it needs is
+# done.  Figures are drawn from a few aggregates they share (the count cube,
+# the per-country table, the bitmap index); those are steps of their own that
+# the figures depend on, so each is computed once, before the figures that
+# read it and alongside the figures that do not.  numpy and most of pandas
+# release the GIL while they work, so independent steps overlap.
+#
+# Threads rather than processes: what the steps build (aggregates memoized on
+# the dataset, serialized figures in the caches) has to end up in this
+# process, and forked workers would each compute the shared aggregates again.
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THREADS = min(4, os.cpu_count() or 1)
+
+
+class Step:
+
+    def __init__(self, name, run, needs=()):
+        self.name = name
+        self.run = run  # called with no arguments
+        self.needs = list(needs)  # names of the steps that must finish first
+
+
+def run_steps(steps, threads=DEFAULT_THREADS):
+    # Run every step, dependencies first; returns step name -> seconds it took.
+    # Steps run in the caller's context, so dataset.viewing() carries over.
+    # The first step to fail stops the ones not yet started, and is re-raised
+    # once the running ones are done.
+    steps = {step.name: step for step in steps}
+    for step in steps.values():
+        missing = [name for name in step.needs if name not in steps]
+        if missing:
+            raise ValueError(f"step {step.name!r} needs unknown steps {missing}")
+    waiting = dict(steps)
+    done, timings = set(), {}
+    context = contextvars.copy_context()
+
+    def timed(step):
+        start = time.perf_counter()
+        context.copy().run(step.run)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix='build') as pool:
+        running = {}
+        while waiting or running:
+            for name in [name for name, step in waiting.items() if done.issuperset(step.needs)]:
+                running[pool.submit(timed, waiting.pop(name))] = name
+            if not running:
+                raise ValueError(f"steps {sorted(waiting)} depend on each other")
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    wait(running)
+                    raise error
+                timings[name] = future.result()
+                done.add(name)
+    return timings
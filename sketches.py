@@ -0,0 +1,127 @@
+# sketches.py
+#
+# Mergeable quantile sketch for the distribution charts of the pre-aggregated
+# summary.  It is a merging t-digest: a sorted list of centroids (mean,
+# weight) whose sizes are capped by the k1 scale function, so centroids stay
+# small near the tails and grow towards the median.  Equal values are summed
+# into one centroid first; while there are no more distinct values than the
+# compression, each keeps its own centroid, so low-cardinality columns (age,
+# hours) stay exact, through merges too.  Past that the sketch is approximate.
+#
+# Sketches of two partitions merge into the sketch of their union, and
+# to_dict()/from_dict() round-trip through JSON.  histogram() returns the
+# centroids as (values, counts), the form distributions.py works on.
+import math
+
+import numpy as np
+
+from distributions import quantiles
+
+# Largest rank error of a quantile read off the sketch (at the median; it is
+# smaller towards the tails).  A centroid at rank q spans at most
+# 2*pi*sqrt(q(1-q))/compression of the ranks, so compression = pi / error.
+DEFAULT_ERROR = 0.001
+BUFFER_FACTOR = 5  # centroids buffered, as a multiple of compression, before compressing
+
+
+def compression_for(error):
+    return math.ceil(math.pi / error)
+
+
+def _compress(means, weights, compression):
+    means, inverse = np.unique(means, return_inverse=True)
+    weights = np.bincount(inverse, weights=weights)
+    if len(means) <= compression:
+        return means.astype(float), weights.astype(float)
+    total = weights.sum()
+    scale = compression / (2 * math.pi)
+
+    def limit(done):
+        # largest cumulative weight the centroid starting at `done` may reach
+        k = scale * math.asin(2 * min(done / total, 1.0) - 1) + 1
+        return total if k >= scale * math.pi / 2 else total * (math.sin(k / scale) + 1) / 2
+
+    out_means, out_weights = [], []
+    mean, weight, done = means[0], weights[0], 0.0
+    cap = limit(done)
+    for m, w in zip(means[1:].tolist(), weights[1:].tolist()):
+        if done + weight + w <= cap:
+            weight += w
+            mean += (m - mean) * w / weight
+        else:
+            out_means.append(mean)
+            out_weights.append(weight)
+            done += weight
+            cap = limit(done)
+            mean, weight = m, w
+    out_means.append(mean)
+    out_weights.append(weight)
+    return np.array(out_means, dtype=float), np.array(out_weights, dtype=float)
+
+
+class QuantileSketch:
+
+    def __init__(self, compression=None, means=(), weights=()):
+        self.compression = compression or compression_for(DEFAULT_ERROR)
+        self.means = np.asarray(means, dtype=float)
+        self.weights = np.asarray(weights, dtype=float)
+        self._buffered = 0
+
+    @classmethod
+    def for_error(cls, error):
+        return cls(compression_for(error))
+
+    def add(self, values, weights=None):
+        # Fold in a batch of values (optionally weighted, e.g. by their counts)
+        values = np.asarray(values, dtype=float)
+        weights = np.ones(len(values)) if weights is None else np.asarray(weights, dtype=float)
+        keep = ~np.isnan(values) & (weights > 0)
+        values, inverse = np.unique(values[keep], return_inverse=True)
+        weights = np.bincount(inverse, weights=weights[keep], minlength=len(values))
+        self.means = np.r_[self.means, values]
+        self.weights = np.r_[self.weights, weights]
+        self._buffered += len(values)
+        if self._buffered > BUFFER_FACTOR * self.compression:
+            self.compress()
+        return self
+
+    def merge(self, other):
+        # This sketch becomes the sketch of both inputs
+        self.compression = max(self.compression, other.compression)
+        self.means = np.r_[self.means, other.means]
+        self.weights = np.r_[self.weights, other.weights]
+        return self.compress()
+
+    def compress(self):
+        if len(self.means):
+            self.means, self.weights = _compress(self.means, self.weights, self.compression)
+        self._buffered = 0
+        return self
+
+    @property
+    def count(self):
+        return self.weights.sum()
+
+    def histogram(self):
+        # Centroids as sorted (values, counts)
+        self.compress()
+        return self.means, self.weights
+
+    def quantile(self, qs):
+        return quantiles(*self.histogram(), qs)
+
+    def to_dict(self):
+        means, weights = self.histogram()
+        return {'compression': self.compression, 'means': means.tolist(), 'weights': weights.tolist()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['compression'], data['means'], data['weights'])
+
+
+def merge_all(sketches):
+    sketches = list(sketches)
+    merged = QuantileSketch(max(s.compression for s in sketches),
+                            np.concatenate([s.means for s in sketches]),
+                            np.concatenate([s.weights for s in sketches]))
+    return merged.compress()
@@ -0,0 +1,450 @@
+# summary.py
+#
+# Pre-aggregated dashboard data for extracts too large to load as a frame.
+# `python summary.py big.csv` streams the CSV in chunks and folds every chunk
+# into the tables the charts are drawn from (counts, sums, quantile sketches,
+# a bounded random sample), so memory grows with the number of distinct
+# values, not with the number of rows.  The tables go to a `big.summary/`
+# directory; point the dashboard's data_path at it to serve it.
+#
+# Every table is folded twice: counting rows, and weighted by fnlwgt for the
+# dashboard's population estimates.  The weighted tables go to `weighted/`
+# inside the summary directory.
+#
+# Every table merges, so partitions can be summarized separately (or in
+# parallel with --jobs) and combined:
+#
+#   python summary.py part1.csv part2.csv --out all.summary --jobs 2
+#   python summary.py --merge part1.summary part2.summary --out all.summary
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from aggregation import COUNTRY_MEASURES, CUBE_DIMS, WEIGHT, ContingencyCube, country_table
+from data_store import dataset_version, file_state, version_size
+from metrics import timed
+from sketches import DEFAULT_ERROR, QuantileSketch, merge_all
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SUMMARY_FORMAT = 3
+MANIFEST = 'manifest.json'
+WEIGHTED_DIR = 'weighted'
+CHUNKSIZE = 200_000
+
+# What gets folded.  A chart asking the summary for anything else fails with
+# a message naming the list to extend.
+# Quantile sketches are kept per cell of their columns; a chart grouping by
+# fewer columns merges the cells
+SKETCHES = [(['income', 'workclass'], 'age'), (['income', 'workclass'], 'hours.per.week'),
+            (['native.country'], 'capital.gain'), (['native.country'], 'capital.loss')]
+TOTALS = [(['income', 'occupation'], 'hours.per.week'), (['income', 'workclass'], 'hours.per.week')]
+MEANS = [(['native.country', 'race', 'workclass'], 'capital.gain')]
+LEVELS = [('education', 'education.num')]
+SAMPLES = [('income', 'age')]
+SAMPLE_SIZE = 2000  # rows kept per group; the charts sample at most this many
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float('nan')
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+
+
+def _fold(total, part):
+    # Add two grouped tables; keys new to `total` go at the end, so the
+    # first-appearance order of the rows is kept
+    if total is None:
+        return part
+    new = part.index[~part.index.isin(total.index)]
+    folded = total.add(part, fill_value=0).reindex(total.index.append(new))
+    # aligning on keys missing from one side turns integer counts into floats
+    if isinstance(folded, pd.DataFrame):
+        return folded.astype({col: np.result_type(total[col], part[col]) for col in folded})
+    return folded.astype(np.result_type(total, part))
+
+
+def _bottom_k(rows, group):
+    # Bottom-k by a random key per group: a uniform sample of each group (or
+    # one drawn proportionally to weight, see Folder.add), and the union of
+    # two such samples gives the sample of the union
+    return (rows.sort_values('key', kind='stable')
+            .groupby(group, sort=False).head(SAMPLE_SIZE)
+            .reset_index(drop=True))
+
+
+class Folder:
+    # Accumulates the summary tables over a stream of chunks
+
+    def __init__(self, error=DEFAULT_ERROR, seed=0, weight=None):
+        self.rows = 0
+        self.error = error
+        self.weight = weight  # column the rows are weighted by; None counts rows
+        self.tables = {}  # key tuple, e.g. ('totals', 'income', 'workclass', 'hours.per.week') -> table
+        self._rng = np.random.default_rng(seed)
+
+    def _count(self, chunk, keys, sort=True):
+        # Rows (or their summed weight) per combination of `keys`
+        if self.weight is None:
+            return chunk.groupby(keys, sort=sort).size()
+        return chunk.groupby(keys, sort=sort)[self.weight].sum()
+
+    def add(self, chunk):
+        self.rows += len(chunk)
+        self._add(('counts',), self._count(chunk, CUBE_DIMS))
+        for dims, measure in SKETCHES:
+            self._sketch(dims, measure, chunk)
+        weights = 1 if self.weight is None else chunk[self.weight]
+        for path, measure in TOTALS:
+            values = (chunk[measure] * weights).groupby([chunk[col] for col in path], sort=False).sum()
+            self._add(('totals', *path, measure), values.rename(measure))
+        for dims, measure in MEANS:
+            weighted = pd.DataFrame({'sum': chunk[measure] * weights,
+                                     'count': chunk[measure].notna() * weights})
+            self._add(('means', *dims, measure), weighted.groupby([chunk[dim] for dim in dims]).sum())
+        for dim, by in LEVELS:
+            self._add(('levels', dim, by), chunk.groupby([by, dim]).size())
+        for group, measure in SAMPLES:
+            key = self._rng.random(len(chunk))
+            if self.weight is not None:
+                # exponential keys over the weight: the k smallest are a
+                # weighted sample without replacement (Efraimidis-Spirakis)
+                key = -np.log(key) / chunk[self.weight].to_numpy()
+            rows = chunk[[group, measure]].assign(key=key).dropna(subset=[group])
+            self._add(('sample', group, measure), rows)
+
+    def _add(self, key, part):
+        total = self.tables.get(key)
+        if key[0] == 'sample':
+            part = _bottom_k(part if total is None else pd.concat([total, part], ignore_index=True), key[1])
+        elif key[0] == 'sketch':
+            # cell -> sketch; cells of `part` are folded into the matching ones
+            total = {} if total is None else total
+            for cell, sketch in part.items():
+                total[cell] = merge_all([total[cell], sketch]) if cell in total else sketch
+            part = total
+        else:
+            part = _fold(total, part)
+        self.tables[key] = part
+
+    def _sketch(self, dims, measure, chunk):
+        counts = self._count(chunk, dims + [measure])
+        cells = {}
+        # a scalar level for one column, since pandas is changing what a one-item list yields
+        single = len(dims) == 1
+        for cell, values in counts.groupby(level=0 if single else list(range(len(dims)))):
+            cells[(cell,) if single else cell] = QuantileSketch.for_error(self.error).add(
+                values.index.get_level_values(-1), values.to_numpy())
+        self._add(('sketch', *dims, measure), cells)
+
+    def merge(self, other):
+        # Fold in another partition's tables
+        self.rows += other.rows
+        for key, table in other.tables.items():
+            self._add(key, table)
+        return self
+
+
+def _file_name(key):
+    return '-'.join(key) + ('.json' if key[0] == 'sketch' else '.csv')
+
+
+def write_summary(folder, path, source, version, source_state=None):
+    os.makedirs(path, exist_ok=True)
+    entries = []
+    for key, table in folder.tables.items():
+        # samples are plain rows, sketches are JSON; the other tables are
+        # indexed by their group keys
+        file = os.path.join(path, _file_name(key))
+        if key[0] == 'sketch':
+            index = len(key) - 2
+            with open(file, 'w') as f:
+                json.dump([dict(sketch.to_dict(), cell=list(cell)) for cell, sketch in table.items()], f)
+        else:
+            index = 0 if key[0] == 'sample' else table.index.nlevels
+            table.to_csv(file, index=bool(index))
+        entries.append({'key': list(key), 'file': _file_name(key), 'index': index})
+
+    manifest = {
+        'format': SUMMARY_FORMAT,
+        'source': source,
+        'version': version,
+        'rows': folder.rows,
+        'sketch_error': folder.error,
+        'weight': folder.weight,
+        # size and end checksum of a single source CSV, so rows appended to
+        # it later can be folded in (see refresh.py)
+        'source_state': source_state,
+        'tables': entries,
+    }
+    tmp = os.path.join(path, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+    return manifest
+
+
+def summary_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + '.summary'
+
+
+def write_summaries(folders, path, source, version, source_state=None):
+    # The row-counting tables, and the weighted ones in a subdirectory
+    unweighted, weighted = folders
+    write_summary(weighted, os.path.join(path, WEIGHTED_DIR), source, version)
+    return write_summary(unweighted, path, source, version, source_state)
+
+
+def fold_csv(csv_path, chunksize=CHUNKSIZE, error=DEFAULT_ERROR, progress=None):
+    # Stream one CSV into a (rows, weighted) pair of Folders; only one chunk
+    # of raw rows is in memory at a time.  The samples are seeded by file
+    # name, so partitions draw independent samples.
+    seed = zlib.crc32(os.path.basename(csv_path).encode())
+    folders = (Folder(error, seed), Folder(error, seed + 1, WEIGHT))
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        for folder in folders:
+            folder.add(chunk)
+        if progress:
+            progress(folders[0].rows)
+    return folders
+
+
+def build_summary(csv_paths, summary_path=None, chunksize=CHUNKSIZE, error=DEFAULT_ERROR,
+                  jobs=1, progress=None):
+    # Summarize one CSV or several partitions of the same table into one summary
+    csv_paths = [csv_paths] if isinstance(csv_paths, str) else list(csv_paths)
+    summary_path = summary_path or summary_path_for(csv_paths[0])
+    if jobs > 1 and len(csv_paths) > 1:
+        with ProcessPoolExecutor(min(jobs, len(csv_paths))) as pool:
+            folders = list(pool.map(fold_csv, csv_paths, [chunksize] * len(csv_paths),
+                                    [error] * len(csv_paths)))
+    else:
+        folders = [fold_csv(path, chunksize, error, progress) for path in csv_paths]
+    merged = folders[0]
+    for others in folders[1:]:
+        for folder, other in zip(merged, others):
+            folder.merge(other)
+    version = '+'.join(dataset_version(p) for p in csv_paths)
+    state = None
+    if len(csv_paths) == 1:
+        state = file_state(csv_paths[0], version_size(version))
+        del state['path']  # found next to the summary when loaded
+    return write_summaries(merged, summary_path, [os.path.basename(p) for p in csv_paths],
+                           version, state)
+
+
+def merge_summaries(paths, summary_path):
+    # Combine summaries written separately (one per partition) into one
+    merged = None
+    manifests = []
+    for path in paths:
+        summary = load_summary(path)
+        manifests.append(read_manifest(path))
+        parts = []
+        for part in (summary, summary.weighted):
+            folder = Folder(manifests[-1]['sketch_error'], weight=part.weight)
+            folder.rows, folder.tables = part.n_rows, part.tables
+            parts.append(folder)
+        merged = parts if merged is None else [m.merge(p) for m, p in zip(merged, parts)]
+    return write_summaries(merged, summary_path, [s for m in manifests for s in m['source']],
+                           '+'.join(m['version'] for m in manifests))
+
+
+class Summary:
+    # Answers the same questions as dataset.FrameData, from the folded tables.
+    # There are no rows, so nothing that needs them (cross-filtering, the raw
+    # age violin, the scatter charts) is available.
+    df = None
+    key = None
+    source = None  # data_store.file_state() of the CSV it was folded from, when known
+    manifest_version = None  # version in the manifest it was loaded from
+
+    def __init__(self, tables, n_rows, version, weight=None, error=DEFAULT_ERROR):
+        self.tables = tables  # key tuple -> Series or DataFrame
+        self.n_rows = n_rows
+        self.version = version
+        self.weight = weight
+        self.error = error
+        self.weighted = self.unweighted = self  # linked up by load_summary
+        self._cube = None
+
+    @property
+    def variant(self):
+        return (self.weight, self.key)
+
+    def appended(self, rows, version):
+        # This summary with `rows` folded into every table, weighted and not,
+        # as version `version`.  The tables being served are not touched.
+        parts = []
+        for part in (self.unweighted, self.unweighted.weighted):
+            folder = Folder(part.error, zlib.crc32(version.encode()), part.weight)
+            folder.rows = part.n_rows
+            # _add replaces tables, but merges into a sketch table's dict
+            folder.tables = {key: dict(table) if key[0] == 'sketch' else table
+                             for key, table in part.tables.items()}
+            folder.add(rows)
+            parts.append(Summary(folder.tables, folder.rows, version, part.weight, part.error))
+        grown, grown.weighted = parts
+        grown.weighted.unweighted = grown
+        grown.manifest_version = self.manifest_version
+        return grown
+
+    def _table(self, *key):
+        try:
+            return self.tables[key]
+        except KeyError:
+            raise KeyError(f"the summary has no {' '.join(key)} table; add it to the lists at the top "
+                           f"of summary.py and rebuild the summary") from None
+
+    @property
+    @timed('aggregation')
+    def cube(self):
+        if self._cube is None:
+            counts = self._table('counts')
+            labels, codes = {}, []
+            for i, dim in enumerate(CUBE_DIMS):
+                level = counts.index.get_level_values(i)
+                labels[dim] = pd.Index(sorted(level.unique()))
+                codes.append(labels[dim].get_indexer(level))
+            table = np.zeros(tuple(len(labels[dim]) for dim in CUBE_DIMS), dtype=counts.dtype)
+            table[tuple(codes)] = counts.to_numpy()
+            self._cube = ContingencyCube(table, CUBE_DIMS, labels)
+        return self._cube
+
+    @timed('aggregation')
+    def histograms(self, group, measure):
+        # Centroids of the sketches of `measure`, merged per value of `group`
+        for key, cells in self.tables.items():
+            if key[0] == 'sketch' and key[-1] == measure and group in key[1:-1]:
+                break
+        else:
+            self._table('sketch', group, measure)  # raises
+        axis = key[1:-1].index(group)
+        by_group = {}
+        for cell, sketch in cells.items():
+            by_group.setdefault(cell[axis], []).append(sketch)
+        groups = pd.Index(sorted(by_group))
+        return groups, [merge_all(by_group[g]).histogram() for g in groups]
+
+    @timed('aggregation')
+    def sample(self, group, measure, budget):
+        # Same quotas as distributions.stratified_sample, taken from the
+        # per-group samples folded at ingest
+        groups, hists = self.histograms(group, measure)
+        sizes = np.array([counts.sum() for _, counts in hists])
+        rows = self._table('sample', group, measure)
+        budget = min(budget, SAMPLE_SIZE)
+        if sizes.sum() > budget:
+            quota = np.minimum(sizes, np.maximum(1, np.round(budget * sizes / sizes.sum()).astype(int)))
+        else:
+            quota = sizes
+        return [rows.loc[rows[group] == g, measure].to_numpy()[:int(q)] for g, q in zip(groups, quota)]
+
+    @timed('aggregation')
+    def totals(self, path, measure):
+        return self._table('totals', *path, measure).reset_index().astype({col: str for col in path})
+
+    @timed('aggregation')
+    def group_means(self, dims, measure, fold=None):
+        table = self._table('means', *dims, measure)
+        keys = [table.index.get_level_values(dim) for dim in dims]
+        # rare means seen in fewer than `threshold` rows, weighted or not
+        rows = self.unweighted._table('means', *dims, measure)['count']
+        for dim, threshold in (fold or {}).items():
+            i = dims.index(dim)
+            seen = rows.groupby(level=dim).sum()
+            rare = seen.index[seen < threshold]
+            keys[i] = keys[i].where(~keys[i].isin(rare), 'Other')
+        sums = table.groupby(keys)[['sum', 'count']].sum()
+        return (sums['sum'] / sums['count']).rename(measure).rename_axis(dims).reset_index()
+
+    @timed('aggregation')
+    def country_summary(self):
+        hists = {}
+        for measure in COUNTRY_MEASURES:
+            countries, hists[measure] = self.histograms('native.country', measure)
+        return country_table(countries, hists)
+
+    @timed('aggregation')
+    def ordered_levels(self, dim, by):
+        pairs = self._table('levels', dim, by).index.to_frame(index=False)
+        mapping = dict(zip(pairs[by], pairs[dim]))
+        return [mapping[key] for key in sorted(mapping)]
+
+
+def read_manifest(path):
+    try:
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('format') == SUMMARY_FORMAT else None
+
+
+def _load_tables(path):
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"{path} is not a summary written by `python summary.py`")
+    tables = {}
+    for entry in manifest['tables']:
+        file = os.path.join(path, entry['file'])
+        if entry['key'][0] == 'sketch':
+            with open(file) as f:
+                table = {tuple(cell.pop('cell')): QuantileSketch.from_dict(cell) for cell in json.load(f)}
+        elif entry['index']:
+            table = pd.read_csv(file, index_col=list(range(entry['index'])))
+            if table.shape[1] == 1:
+                table = table.iloc[:, 0]
+        else:
+            table = pd.read_csv(file)
+        tables[tuple(entry['key'])] = table
+    summary = Summary(tables, manifest['rows'], manifest['version'], manifest['weight'],
+                      manifest['sketch_error'])
+    summary.manifest_version = manifest['version']
+    if manifest.get('source_state'):
+        csv_path = os.path.join(os.path.dirname(os.path.abspath(path)), manifest['source'][0])
+        summary.source = dict(manifest['source_state'], path=csv_path)
+    return summary
+
+
+def load_summary(path):
+    summary = _load_tables(path)
+    summary.weighted = _load_tables(os.path.join(path, WEIGHTED_DIR))
+    summary.weighted.unweighted = summary
+    return summary
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('inputs', nargs='*', default=['refined_adult.csv'],
+                        help='CSV partitions of one table (or summaries, with --merge)')
+    parser.add_argument('--out', help='summary directory (default: next to the first input)')
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    parser.add_argument('--error', type=float, default=DEFAULT_ERROR,
+                        help='largest rank error of the quantile sketches')
+    parser.add_argument('--jobs', type=int, default=1, help='partitions summarized in parallel')
+    parser.add_argument('--merge', action='store_true', help='combine existing summaries')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    out = args.out or summary_path_for(args.inputs[0])
+    if args.merge:
+        manifest = merge_summaries(args.inputs, out)
+    else:
+        manifest = build_summary(args.inputs, out, args.chunksize, args.error, args.jobs,
+                                 progress=lambda rows: print(f"  {rows:,} rows, peak RSS {peak_rss_mb():.0f} MB",
+                                                             file=sys.stderr))
+    print(f"wrote {out}: {manifest['rows']:,} rows in "
+          f"{time.perf_counter() - start:.1f} s, peak RSS {peak_rss_mb():.0f} MB")
@@ -0,0 +1,6 @@
+# Lets the tests import the app's top-level modules from any working directory
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
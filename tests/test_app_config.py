@@ -0,0 +1,44 @@
+# Every app made by create_app keeps its own configuration: making a second
+# one must not change what the first serves.
+import os
+
+import app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATUS = {
+    'output': 'crossfilter-status.children',
+    'outputs': {'id': 'crossfilter-status', 'property': 'children'},
+    'inputs': [{'id': 'crossfilter-selection', 'property': 'data', 'value': {}},
+               {'id': 'weighting', 'property': 'value', 'value': 'rows'}],
+    'changedPropIds': [],
+}
+
+
+def status_line(dash_app):
+    client = dash_app.server.test_client()
+    client.get('/')  # Dash registers the callbacks on the first request
+    response = client.post('/_dash-update-component', json=STATUS)
+    assert response.status_code == 200
+    return response.get_json()['response']['crossfilter-status']['children']
+
+
+def test_second_app_does_not_reconfigure_the_first(tmp_path):
+    small = tmp_path / 'small.csv'
+    with open(os.path.join(ROOT, 'refined_adult.csv')) as f:
+        small.write_text(''.join(f.readline() for _ in range(101)))
+    first = app.create_app({'figure_cache_size': 7, 'query_cache_bytes': 1 << 20})
+    first_status = status_line(first)
+    second = app.create_app({'data_path': str(small), 'figure_cache_size': 3,
+                             'query_cache_bytes': 1 << 10})
+
+    assert status_line(second) == 'No filter: all 100 rows.'
+    assert status_line(first) == first_status != 'No filter: all 100 rows.'
+    assert {cache.max_entries for cache in app.dashboard(first).caches.values()} == {7}
+    assert {cache.max_entries for cache in app.dashboard(second).caches.values()} == {3}
+    assert app.dashboard(first).query_cache().max_bytes == 1 << 20
+    assert app.dashboard(second).query_cache().max_bytes == 1 << 10
+
+
+def test_importing_builds_no_app():
+    assert not hasattr(app, 'app') and not hasattr(app, 'server')
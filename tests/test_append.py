@@ -0,0 +1,80 @@
+# Rows appended by a refresh are folded into the aggregates already built;
+# each must come out as if computed over the grown frame from scratch.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import WEIGHT
+from data_store import typed_column
+from dataset import Dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HISTOGRAMS = [('income', 'age'), ('income', 'hours.per.week'), ('workclass', 'age'),
+              ('native.country', 'capital.gain'), ('native.country', 'capital.loss')]
+
+
+@pytest.fixture(scope='module', params=[20003, 20000])
+def datasets(request):
+    # (dataset the rows were appended to, the same frame built from scratch);
+    # 20003 rows leave the last byte of every bitset partly used
+    raw = pd.read_csv(os.path.join(ROOT, 'refined_adult.csv'))
+    start = request.param
+    old = pd.DataFrame({name: typed_column(raw[name].iloc[:start]) for name in raw.columns})
+    rows = raw.iloc[start:].copy()
+    rows.loc[rows.index[:5], 'native.country'] = 'Atlantis'  # a country not seen before
+    data = Dataset(old, 'old')
+    for part in (data, data.weighted):
+        part.cube
+        part.country_summary()
+        for group, measure in HISTOGRAMS:
+            part.histograms(group, measure)
+    data.bitmaps
+    grown = data.appended(rows, 'new')
+    return grown, Dataset(grown.df, 'new')
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_cube(datasets, weighted):
+    grown, fresh = (d.weighted if weighted else d for d in datasets)
+    assert grown.__dict__['cube'] is not None
+    np.testing.assert_array_equal(grown.cube.counts, fresh.cube.counts)
+    for dim in grown.cube.dims:
+        pd.testing.assert_index_equal(grown.cube.labels[dim], fresh.cube.labels[dim])
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+@pytest.mark.parametrize('group, measure', HISTOGRAMS)
+def test_histograms(datasets, weighted, group, measure):
+    grown, fresh = (d.weighted if weighted else d for d in datasets)
+    assert (group, measure) in grown._histograms
+    groups, hists = grown.histograms(group, measure)
+    expected_groups, expected = fresh.histograms(group, measure)
+    pd.testing.assert_index_equal(groups, expected_groups)
+    for (values, counts), (expected_values, expected_counts) in zip(hists, expected):
+        np.testing.assert_array_equal(values, expected_values)
+        np.testing.assert_array_equal(counts, expected_counts)
+
+
+@pytest.mark.parametrize('weighted', [False, True])
+def test_country_summary(datasets, weighted):
+    grown, fresh = (d.weighted if weighted else d for d in datasets)
+    table = grown.country_summary()
+    assert 'Atlantis' in set(table['native.country'])
+    pd.testing.assert_frame_equal(table, fresh.country_summary())
+
+
+def test_bitmaps(datasets):
+    grown, fresh = datasets
+    assert 'bitmaps' in grown.__dict__
+    assert grown.bitmaps.n_rows == fresh.bitmaps.n_rows
+    for dim, bits in fresh.bitmaps.bitsets.items():
+        pd.testing.assert_index_equal(grown.bitmaps.labels[dim], fresh.bitmaps.labels[dim])
+        np.testing.assert_array_equal(grown.bitmaps.bitsets[dim], bits)
+
+
+def test_weighting_is_kept(datasets):
+    grown, _ = datasets
+    assert grown.weighted.weight == WEIGHT
+    assert grown.weighted.unweighted is grown
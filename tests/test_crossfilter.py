@@ -0,0 +1,31 @@
+# A cross-filter selection comes from the client; columns the bitmap index
+# does not cover are ignored rather than failing the request.
+import pytest
+
+import app
+from crossfilter import normalize, view_for
+
+
+@pytest.mark.parametrize('selection', [{'age': ['30']}, {'fnlwgt': ['1']}, {'sex': 'Female'},
+                                       {'no.such.column': ['x']}])
+def test_unknown_columns_are_dropped(selection):
+    assert normalize(selection) == {}
+    data = app.weighted_data('rows')
+    assert view_for(data, selection) is data
+    for name in app.dashboard().caches['analysis'].builders:
+        assert app.filtered_figure('analysis', name, selection)
+
+
+def test_known_columns_are_kept():
+    selection = {'age': ['30'], 'sex': ['Male', 'Female']}
+    assert normalize(selection) == {'sex': ['Female', 'Male']}
+    assert view_for(app.weighted_data('rows'), selection).selection == {'sex': ['Female', 'Male']}
+
+
+def test_status_line():
+    assert app.show_selection({'age': ['30']}, 'rows').startswith('No filter')
+
+
+def test_drill_down_ignores_unknown_columns():
+    fig = app.update_query(['sex'], 'hours.per.week', 'mean', {'age': ['30']}, 'rows')
+    assert fig['data'] and fig['data'][0]['type'] == 'bar'
@@ -0,0 +1,62 @@
+# An app reads only the data at its data_path: no figure falls back to the
+# default CSV, wherever the app was started from.
+import os
+
+import pytest
+
+import app
+import dataset
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def update(client, output, outputs, inputs):
+    response = client.post('/_dash-update-component', json={
+        'output': output, 'outputs': outputs, 'changedPropIds': [],
+        'inputs': [{'id': id, 'property': prop, 'value': value} for id, prop, value in inputs],
+    })
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()['response']
+
+
+@pytest.fixture
+def small_app(tmp_path, monkeypatch):
+    small = tmp_path / 'small.csv'
+    with open(os.path.join(ROOT, 'refined_adult.csv')) as f:
+        small.write_text(''.join(f.readline() for _ in range(301)))
+    monkeypatch.chdir(tmp_path)  # where refined_adult.csv does not exist
+    before = set(dataset._loaded)
+    yield app.create_app({'data_path': str(small)})
+    assert set(dataset._loaded) - before <= {str(small)}
+
+
+def test_every_figure_is_drawn_from_the_data_path(small_app):
+    state = app.dashboard(small_app)
+    with small_app.server.app_context():
+        for weighting in ('rows', 'weighted'):
+            for cache in state.caches.values():
+                for name in state.figure_names(cache):
+                    assert app.filtered_figure(cache.name, name, None, weighting)
+                    assert app.filtered_figure(cache.name, name, {'sex': ['Female']}, weighting)
+        state.warm_caches()
+
+
+def test_callbacks_read_the_data_path(small_app):
+    client = small_app.server.test_client()
+    client.get('/')  # Dash registers the callbacks on the first request
+    response = update(client, '..question-output.children...graph-output.figure...insights-output.children..',
+                      [{'id': id, 'property': prop} for id, prop in [
+                          ('question-output', 'children'), ('graph-output', 'figure'),
+                          ('insights-output', 'children')]],
+                      [('analysis-options', 'value', 'education_level'),
+                       ('crossfilter-selection', 'data', {}), ('weighting', 'value', 'rows')])
+    assert response['graph-output']['figure']['data']
+    response = update(client, 'occupation-graph.figure', {'id': 'occupation-graph', 'property': 'figure'},
+                      [('occupation-page', 'data', 1), ('crossfilter-selection', 'data', {}),
+                       ('weighting', 'value', 'rows')])
+    assert response['occupation-graph']['figure']['data']
+
+
+def test_no_default_data_outside_viewing():
+    with pytest.raises(LookupError):
+        dataset.current_view()
@@ -0,0 +1,97 @@
+# distributions.py reads quartiles and whiskers off per-group histograms; they
+# must match what pandas computes from the rows themselves.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from distributions import box_stats, group_histograms, quantiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QS = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1]
+
+
+def histogram(series):
+    values, counts = np.unique(series.to_numpy(), return_counts=True)
+    return values, counts
+
+
+def expected_box(series):
+    q1, median, q3 = series.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = series.between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+    return {'q1': q1, 'median': median, 'q3': q3,
+            'lowerfence': series[inside].min(), 'upperfence': series[inside].max(),
+            'outliers': np.unique(series[~inside]),
+            'outlier_counts': series[~inside].value_counts().sort_index().to_numpy()}
+
+
+def assert_box_matches(stats, series):
+    expected = expected_box(series)
+    for key in ('q1', 'median', 'q3', 'lowerfence', 'upperfence'):
+        assert stats[key] == pytest.approx(expected[key]), key
+    np.testing.assert_array_equal(stats['outliers'], expected['outliers'])
+    np.testing.assert_array_equal(stats['outlier_counts'], expected['outlier_counts'])
+
+
+@pytest.fixture(scope='module')
+def census():
+    return pd.read_csv(os.path.join(ROOT, 'refined_adult.csv'))
+
+
+@pytest.mark.parametrize('measure', ['age', 'hours.per.week', 'capital.gain', 'education.num'])
+def test_census_columns(census, measure):
+    series = census[measure]
+    values, counts = histogram(series)
+    np.testing.assert_allclose(quantiles(values, counts, QS), series.quantile(QS).to_numpy())
+    assert_box_matches(box_stats(values, counts), series)
+
+
+@pytest.mark.parametrize('measure', ['age', 'hours.per.week'])
+def test_census_groups(census, measure):
+    codes, labels = pd.factorize(census['occupation'])
+    histograms = group_histograms(codes, census[measure].to_numpy(), len(labels))
+    for label, (values, counts) in zip(labels, histograms):
+        series = census.loc[census['occupation'] == label, measure]
+        np.testing.assert_allclose(quantiles(values, counts, QS), series.quantile(QS).to_numpy())
+        assert_box_matches(box_stats(values, counts), series)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_integers_with_ties(seed):
+    # few distinct values among many rows, so most order statistics are ties
+    rng = np.random.default_rng(seed)
+    n_groups = 6
+    codes = rng.integers(0, n_groups, 500)
+    values = rng.integers(0, 12, 500) ** 2
+    for g, (vals, counts) in enumerate(group_histograms(codes, values, n_groups)):
+        series = pd.Series(values[codes == g])
+        np.testing.assert_allclose(quantiles(vals, counts, QS), series.quantile(QS).to_numpy())
+        assert_box_matches(box_stats(vals, counts), series)
+
+
+def test_wide_integer_range():
+    # a range too wide for the bincount path, so the histograms are sorted runs
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 3, 2000)
+    values = rng.integers(-10**9, 10**9, 2000)
+    values[:200] = 7
+    for g, (vals, counts) in enumerate(group_histograms(codes, values, 3)):
+        series = pd.Series(values[codes == g])
+        np.testing.assert_allclose(quantiles(vals, counts, QS), series.quantile(QS).to_numpy())
+        assert_box_matches(box_stats(vals, counts), series)
+
+
+@pytest.mark.parametrize('rows', [1, 5])
+def test_single_value_groups(rows):
+    codes = np.array([0] * rows + [1, 1, 2])
+    values = np.array([42] * rows + [3, 9, 5])
+    histograms = group_histograms(codes, values, 3)
+    for g, (vals, counts) in enumerate(histograms):
+        series = pd.Series(values[codes == g])
+        np.testing.assert_allclose(quantiles(vals, counts, QS), series.quantile(QS).to_numpy())
+        assert_box_matches(box_stats(vals, counts), series)
+    stats = box_stats(*histograms[0])
+    assert stats['q1'] == stats['median'] == stats['q3'] == stats['lowerfence'] == stats['upperfence'] == 42
+    assert len(stats['outliers']) == 0
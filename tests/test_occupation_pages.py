@@ -0,0 +1,22 @@
+# The occupation chart's page comes from the client; only the pages there are
+# may reach the figure cache.
+import pytest
+
+import app
+
+
+@pytest.mark.parametrize('sent', [-1, 5, 1000, '1', None, 2.5])
+def test_pages_are_clamped(sent):
+    state = app.dashboard()
+    pages = state.figure_names(state.caches['occupation'])
+    app.update_occupation(sent, {}, 'rows')
+    assert set(state.caches['occupation'].builders) <= set(pages)
+
+
+def test_unknown_page_is_not_built():
+    state = app.dashboard()
+    builders = state.caches['occupation'].builders
+    with pytest.raises(KeyError):
+        builders[len(state.figure_names(state.caches['occupation']))]
+    with pytest.raises(KeyError):
+        builders[-1]
@@ -0,0 +1,62 @@
+# Drill-down queries against the same breakdown computed with pandas.
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import WEIGHT
+from dataset import Dataset
+from query import QueryError, evaluate, normalize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def data():
+    return Dataset(pd.read_csv(os.path.join(ROOT, 'refined_adult.csv')), 'test')
+
+
+def answer(data, **query):
+    result = evaluate(data, normalize(query))
+    return pd.DataFrame(result['data']).set_index(result['columns'][:-1])[result['columns'][-1]]
+
+
+@pytest.mark.parametrize('group_by', [['occupation', 'education', 'income'], ['native.country', 'race'],
+                                      ['sex']])
+@pytest.mark.parametrize('agg', ['sum', 'mean', 'min', 'max'])
+def test_against_pandas(data, group_by, agg):
+    df = data.df[data.df['sex'] == 'Female']
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')  # most combinations are empty; none may divide by zero
+        got = answer(data, group_by=group_by, agg=agg, measure='hours.per.week',
+                     filters={'sex': ['Female']})
+    expected = df.groupby(group_by)['hours.per.week'].agg(agg)
+    pd.testing.assert_series_equal(got.sort_index(), expected.sort_index(), check_names=False,
+                                   check_dtype=False, check_index_type=False)
+
+
+def test_weighted_mean(data):
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        got = answer(data, group_by=['occupation', 'race'], agg='mean', measure='age', weighted=True)
+    expected = data.df.groupby(['occupation', 'race'])[['age', WEIGHT]].apply(
+        lambda rows: np.average(rows['age'], weights=rows[WEIGHT]))
+    pd.testing.assert_series_equal(got.sort_index(), expected.sort_index(), check_names=False,
+                                   check_index_type=False)
+
+
+@pytest.mark.parametrize('group_by', [5, [['sex']], [{'a': 1}], {'sex': 1}, ['sex', 3]])
+def test_bad_group_by(group_by):
+    with pytest.raises(QueryError):
+        normalize({'group_by': group_by})
+
+
+@pytest.mark.parametrize('group_by', [5, [['sex']]])
+def test_bad_group_by_is_a_bad_request(group_by):
+    import app
+    client = app.create_app().server.test_client()
+    response = client.post('/api/query', json={'group_by': group_by})
+    assert response.status_code == 400
+    assert 'group_by' in response.get_json()['error']
@@ -0,0 +1,27 @@
+# A chart is redrawn when the code drawing it changes, helpers included.
+import pytest
+
+import render
+
+INPUTS = {'counts': [1, 2], 'edges': [0, 10, 20]}
+
+
+@pytest.mark.parametrize('edit', [
+    ("StrMethodFormatter('{x:,.0f}')", "StrMethodFormatter('{x:.0f}')"),  # in _thousands
+    ("size=(7.5, 4.7)", "size=(8, 5)"),  # in _axes
+    ("BLUE, LIGHT_BLUE = '#1f77b4'", "BLUE, LIGHT_BLUE = '#000000'"),
+])
+def test_helpers_change_the_hash(tmp_path, monkeypatch, edit):
+    with open(render.__file__) as f:
+        source = f.read()
+    assert edit[0] in source
+    before = render.chart_hash('histogram_age', INPUTS)
+    edited = tmp_path / 'render.py'
+    edited.write_text(source.replace(*edit))
+    monkeypatch.setattr(render, '__file__', str(edited))
+    assert render.chart_hash('histogram_age', INPUTS) != before
+
+
+def test_same_inputs_same_hash():
+    assert render.chart_hash('histogram_age', INPUTS) == render.chart_hash('histogram_age', dict(INPUTS))
+    assert render.chart_hash('histogram_age', INPUTS) != render.chart_hash('histogram_age', {**INPUTS, 'counts': [1, 3]})
@@ -0,0 +1,34 @@
+# The summary's quantile sketches: exact for columns with few distinct
+# values, within the error bound otherwise.
+import numpy as np
+
+from sketches import DEFAULT_ERROR, QuantileSketch, merge_all
+
+
+def test_low_cardinality_stays_exact():
+    rng = np.random.default_rng(0)
+    values = rng.integers(17, 91, 200000)  # ages
+    parts = []
+    for chunk in np.array_split(values, 7):
+        sketch = QuantileSketch()
+        for batch in np.array_split(chunk, 50):  # enough batches to compress on the way
+            sketch.add(batch)
+        parts.append(sketch)
+    merged = merge_all(parts)
+    expected_values, expected_counts = np.unique(values, return_counts=True)
+    got_values, got_counts = merged.histogram()
+    np.testing.assert_array_equal(got_values, expected_values)
+    np.testing.assert_array_equal(got_counts, expected_counts)
+
+
+def test_high_cardinality_within_error():
+    rng = np.random.default_rng(1)
+    values = rng.lognormal(8, 2, 300000)
+    sketch = QuantileSketch()
+    for batch in np.array_split(values, 30):
+        sketch.add(batch)
+    sketch.compress()
+    assert len(sketch.means) <= sketch.compression
+    qs = np.linspace(0.01, 0.99, 25)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(qs)) / len(values)
+    assert np.abs(ranks - qs).max() <= 2 * DEFAULT_ERROR
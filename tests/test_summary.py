@@ -0,0 +1,25 @@
+# Folding a table into sketches, one per combination of the group columns.
+import os
+import warnings
+
+import pandas as pd
+import pytest
+
+from summary import Folder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('dims', [['income'], ['income', 'workclass']])
+def test_sketch_cells(dims):
+    chunk = pd.read_csv(os.path.join(ROOT, 'refined_adult.csv'))
+    folder = Folder()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        folder._sketch(dims, 'age', chunk)
+    cells = folder.tables[('sketch', *dims, 'age')]
+    expected = chunk.groupby(dims).size()
+    assert sorted(cells) == sorted(idx if len(dims) > 1 else (idx,) for idx in expected.index)
+    for cell, sketch in cells.items():
+        values, counts = sketch.histogram()
+        assert counts.sum() == expected[cell if len(dims) > 1 else cell[0]]
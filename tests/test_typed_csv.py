@@ -0,0 +1,48 @@
+# The app reads the columnar store, or data_store.read_csv when the store is
+# missing; every figure must come out the same from either, and the same as
+# from pandas' own read of the CSV.
+import os
+
+import pandas as pd
+import pytest
+
+import app
+import dataset
+from data_store import ingest, load_store, read_csv, read_manifest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV = os.path.join(ROOT, 'refined_adult.csv')
+
+
+@pytest.fixture(scope='module')
+def frames(tmp_path_factory):
+    # the typed CSV first, then what it is compared with
+    store = str(tmp_path_factory.mktemp('store'))
+    ingest(CSV, store)
+    return {'csv': dataset.Dataset(read_csv(CSV), 'csv'),
+            'pandas': dataset.Dataset(pd.read_csv(CSV), 'pandas'),
+            'store': dataset.Dataset(load_store(store, read_manifest(store)), 'store')}
+
+
+def figures():
+    # (weighting, cache, figure name) of every cached figure
+    state = app.dashboard()
+    with dataset.viewing(dataset.Dataset(read_csv(CSV), 'names')):
+        return [(weighting, cache.name, name) for weighting in ('rows', 'weighted')
+                for cache in state.caches.values() for name in state.figure_names(cache)]
+
+
+@pytest.mark.parametrize('weighting, cache, name', figures())
+def test_same_figures(frames, weighting, cache, name):
+    drawn = {}
+    for source, data in frames.items():
+        with dataset.viewing(data.weighted if weighting == 'weighted' else data):
+            drawn[source] = app.dashboard().caches[cache].builders[name]().to_json()
+    assert drawn['csv'] == drawn['pandas']
+    assert drawn['csv'] == drawn['store']
+
+
+def test_typed_columns_are_smaller():
+    before, after = pd.read_csv(CSV), read_csv(CSV)
+    pd.testing.assert_frame_equal(after.astype(before.dtypes.to_dict()), before)
+    assert after.memory_usage(deep=True).sum() < before.memory_usage(deep=True).sum() / 4
@@ -0,0 +1,83 @@
+# The population-estimate toggle weights every aggregate by fnlwgt; each must
+# match the same aggregate computed directly from the weighted rows.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import COUNTRY_MEASURES, CUBE_DIMS, WEIGHT, country_summary
+from dataset import Dataset
+from distributions import quantiles
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QS = [0, 0.1, 0.25, 0.5, 0.75, 0.9, 1]
+
+
+@pytest.fixture(scope='module')
+def census():
+    return pd.read_csv(os.path.join(ROOT, 'refined_adult.csv'))
+
+
+@pytest.fixture(scope='module')
+def small_weights(census):
+    # fnlwgt scaled down to a few units, so np.repeat can expand the rows
+    return census.assign(**{WEIGHT: census[WEIGHT] // 100000 + 1})
+
+
+def test_weighted_cube(census):
+    cube = Dataset(census, 'test').weighted.cube
+    for dims in (CUBE_DIMS, ['sex', 'income'], ['occupation']):
+        expected = census.groupby(dims)[WEIGHT].sum()
+        expected = expected[expected > 0]
+        got = cube.size(dims)
+        pd.testing.assert_series_equal(got, expected, check_names=False, check_dtype=False)
+
+
+@pytest.mark.parametrize('group, measure', [('income', 'age'), ('sex', 'hours.per.week'),
+                                            ('race', 'education.num')])
+def test_weighted_quantiles(small_weights, group, measure):
+    groups, hists = Dataset(small_weights, 'test').weighted.histograms(group, measure)
+    for label, (values, counts) in zip(groups, hists):
+        rows = small_weights[small_weights[group] == label]
+        expanded = np.repeat(rows[measure].to_numpy(), rows[WEIGHT].to_numpy())
+        np.testing.assert_allclose(quantiles(values, counts, QS), np.quantile(expanded, QS))
+
+
+def test_weighted_quantiles_random():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'group': rng.choice(['a', 'b', 'c'], 400),
+                       'value': rng.integers(0, 20, 400),
+                       WEIGHT: rng.integers(1, 9, 400)})
+    groups, hists = Dataset(df, 'test').weighted.histograms('group', 'value')
+    for label, (values, counts) in zip(groups, hists):
+        rows = df[df['group'] == label]
+        expanded = np.repeat(rows['value'].to_numpy(), rows[WEIGHT].to_numpy())
+        np.testing.assert_allclose(quantiles(values, counts, QS), np.quantile(expanded, QS))
+
+
+def test_weighted_country_means(census):
+    table = country_summary(census, weight=WEIGHT).set_index('native.country')
+    for country, rows in census.groupby('native.country'):
+        assert table.loc[country, 'count'] == pytest.approx(rows[WEIGHT].sum())
+        for measure in COUNTRY_MEASURES:
+            mean = np.average(rows[measure], weights=rows[WEIGHT])
+            assert table.loc[country, f'{measure}_mean'] == pytest.approx(mean)
+
+
+def test_weighted_country_medians(small_weights):
+    table = country_summary(small_weights, weight=WEIGHT).set_index('native.country')
+    for country, rows in small_weights.groupby('native.country'):
+        for measure in COUNTRY_MEASURES:
+            median = np.median(np.repeat(rows[measure].to_numpy(), rows[WEIGHT].to_numpy()))
+            assert table.loc[country, f'{measure}_median'] == pytest.approx(median)
+
+
+def test_weighted_map_hover_says_estimated_population(census):
+    import dataset
+    import figures
+    data = Dataset(census, 'test')
+    for view, label in ((data, 'count='), (data.weighted, 'estimated population=')):
+        with dataset.viewing(view):
+            hover = figures.country_capital_map('capital.gain').data[0].hovertemplate
+        assert label in hover and ('count=' in hover) == (view.weight is None)
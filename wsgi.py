@@ -0,0 +1,31 @@
+# wsgi.py
+#
+# Production entry point:
+#
+#   gunicorn -c gunicorn.conf.py
+#
+# gunicorn imports this module once in the master process (preload_app), so the
+# dataset, its aggregates and every cached figure are built before the workers
+# are forked.  The workers then share those pages copy-on-write instead of each
+# holding its own copy; when the columnar store is present the column data is
+# additionally a read-only memory map shared through the page cache.
+import gc
+import logging
+import os
+
+# the app's own messages (figures warmed, page sizes, refreshes) next to gunicorn's
+logging.basicConfig(level=os.environ.get('DASHBOARD_LOG_LEVEL', 'INFO'),
+                    format='[%(asctime)s] [%(process)d] [%(levelname)s] %(name)s: %(message)s')
+
+from app import create_app, dashboard
+
+app = create_app()
+dashboard(app).warm_caches()
+# Dash finishes registering its callbacks while handling the first request.
+# Do that here, once, instead of racing on it in every worker's threads.
+app.server.test_client().get('/')
+# Move everything built so far out of the collector's reach, so the workers'
+# garbage collections do not write to (and so un-share) those pages
+gc.freeze()
+
+server = app.server